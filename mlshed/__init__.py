@@ -1,5 +1,14 @@
 from .model import Model  # noqa: F401
+from .prefetch import prefetch  # noqa: F401
 
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+
+def __getattr__(name):
+    # versioneer's get_versions() can spawn git subprocesses in a source
+    # checkout, so the version is only computed when actually requested
+    if name == '__version__':
+        from ._version import get_versions
+        version = get_versions()['version']
+        globals()['__version__'] = version
+        return version
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
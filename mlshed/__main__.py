@@ -0,0 +1,9 @@
+"""Allows running the mlshed command-line interface with python -m mlshed."""
+
+import sys
+
+from .cli import main
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
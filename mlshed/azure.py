@@ -1,26 +1,71 @@
 """Remote model storage on Azure."""
 
+import io
 import os
+import json
+import mmap
 import ntpath
+import uuid
+import shutil
+import hashlib
+import collections
 import warnings
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from decore import lazy_property
 try:
-    from azure.storage.blob import BlockBlobService
+    from azure.common import (
+        AzureHttpError,
+        AzureMissingResourceHttpError,
+    )
+    from azure.storage.blob import (
+        BlobBlock,
+        BlockBlobService,
+    )
 except ImportError:
     warnings.warn(
         "Importing azure Python package failed. "
         "Azure-based remote model stores are disabled.")
 
+from . import catalog
+from . import negcache
 from .cfg import (
     SHED_CFG,
     _snail_case,
+    _replace_dir,
+    _partial_fpath,
 )
 from .exceptions import (
     MissingRemoteModelError,
+    ModelCopyError,
+    ModelIndexConflictError,
+    ModelIntegrityError,
 )
 
 
+INDEX_FNAME = '.mlshed_index.json'
+INDEX_UPDATE_RETRIES = 10
+# the blob "sub-folder" of a model holding its alias pointer blobs
+ALIASES_DIRNAME = '.aliases'
+DEFAULT_BLOCK_SIZE = 4 * 2 ** 20  # 4MB
+DEFAULT_MAX_CONNECTIONS = 4
+# the blob metadata key holding the BLAKE2b hex digest of uploaded blobs
+DIGEST_METADATA_KEY = 'blake2b'
+# the blob "sub-folder" holding pack blobs; see mlshed.pack
+PACKS_DIRNAME = '.packs'
+# the service returns a Content-MD5 only for ranges of up to 4MB
+MAX_VALIDATED_RANGE = 4 * 2 ** 20
+# instances larger than this are uploaded as shards; see upload_model
+DEFAULT_SHARD_SIZE = 2 ** 30  # 1GB
+SHARD_RETRIES = 3
+# the number of seconds between polls of pending server-side copies
+COPY_POLL_INTERVAL = 1
+# the blob metadata key marking shard manifests, holding the shard count
+SHARDS_METADATA_KEY = 'mlshed_shards'
+
+
 @lazy_property
 def _blob_service():
     return BlockBlobService(
@@ -36,7 +81,7 @@ def _subfolder_name(model_name):
     return t
 
 
-def _blob_name(model_name, file_name, task=None, model_attributes=None):
+def _blob_prefix(model_name, task=None, model_attributes=None):
     path_prefix = 'mlshed'
     if task:
         path_prefix += '/{}'.format(_snail_case(task))
@@ -45,13 +90,45 @@ def _blob_name(model_name, file_name, task=None, model_attributes=None):
             path_prefix += '/{}_{}'.format(_snail_case(k), _snail_case(v))
     subfolder = _subfolder_name(model_name=model_name)
     path_prefix += '/{}'.format(subfolder)
+    return path_prefix
+
+
+def _blob_name(model_name, file_name, task=None, model_attributes=None):
+    path_prefix = _blob_prefix(
+        model_name=model_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
     return '{}/{}'.format(path_prefix, file_name)
 
 
-def upload_model(
-        model_name, file_path, task=None, model_attributes=None, **kwargs):
+def _shard_size():
+    return int(SHED_CFG.get('shard_size', DEFAULT_SHARD_SIZE))
+
+
+def upload_model(model_name, file_path, task=None, model_attributes=None,
+                 shard_size=None, delete_previous=True, **kwargs):
     """Uploads the given file to model store.
 
+    The file is read once, in blocks which are uploaded concurrently, and
+    hashed as it is read. Its BLAKE2b digest is stored in the metadata of
+    the blob, and recorded in the local catalog; see mlshed.catalog.
+
+    Files larger than shard_size bytes are split into shards of shard_size
+    bytes, each uploaded to a blob of its own - and retried on its own on
+    failure - under '<file name>.shards/'. The blob of the file itself then
+    holds a JSON manifest listing the shards, with their sizes and digests,
+    and is written last, so a sharded instance becomes visible only once
+    all of its shards are in place. Readers of the blob, e.g. BlobReader and
+    download_model, resolve shard manifests transparently.
+
+    The shard blobs of a replaced sharded instance are deleted once the new
+    instance is written, unless delete_previous is False; readers still
+    downloading the replaced instance then fail with
+    MissingRemoteModelError. Only shards under the '<file name>.shards/'
+    prefix are deleted, as only those are owned by the manifest; see
+    copy_model_blob.
+
     Parameters
     ----------
     model_name : str
@@ -68,14 +145,54 @@ def upload_model(
         matches lexicographical order of keyword argument names, so 'lang=en'
         and 'animal=dog' will result in a path such as
         'task_name/animal_dog/lang_en/svm.pkl'.
+    shard_size : int, optional
+        The size, in bytes, above which files are sharded, and of each
+        shard. Defaults to the 'shard_size' key of the mlshed configuration,
+        or to DEFAULT_SHARD_SIZE. If 0, files are never sharded.
+    delete_previous : bool, default True
+        If set to False, the shard blobs of a replaced instance are kept.
     **kwargs : extra keyword arguments
-        Extra keyword arguments are forwarded to
-        azure.storage.blob.BlockBlobService.create_blob_from_path.
+        Extra keyword arguments are forwarded to BlockBlobWriter; e.g.
+        block_size, max_connections and metadata, or keyword arguments of
+        azure.storage.blob.BlockBlobService.put_block_list, such as
+        content_settings. As files are no longer uploaded with
+        create_blob_from_path, its other keyword arguments - e.g.
+        progress_callback - are not supported, and raise TypeError.
 
     Returns
     -------
     blob_name : str
         The name of the blob the model was uploaded to.
+
+    See Also
+    --------
+    upload_model_with_digest : Also returns the digest of the uploaded file.
+    """
+    return upload_model_with_digest(
+        model_name=model_name,
+        file_path=file_path,
+        task=task,
+        model_attributes=model_attributes,
+        shard_size=shard_size,
+        delete_previous=delete_previous,
+        **kwargs,
+    )[0]
+
+
+def upload_model_with_digest(
+        model_name, file_path, task=None, model_attributes=None,
+        shard_size=None, delete_previous=True, **kwargs):
+    """Uploads the given file to model store, as upload_model does.
+
+    See upload_model for the parameters.
+
+    Returns
+    -------
+    blob_name : str
+        The name of the blob the model was uploaded to.
+    digest : str
+        The BLAKE2b hex digest of the uploaded file, as computed while it
+        was uploaded.
     """
     fname = ntpath.basename(file_path)
     blob_name = _blob_name(
@@ -84,13 +201,90 @@ def upload_model(
         task=task,
         model_attributes=model_attributes,
     )
-    _blob_service().create_blob_from_path(
-        container_name=SHED_CFG['azure']['container_name'],
-        blob_name=blob_name,
-        file_path=file_path,
-        **kwargs,
-    )
-    return blob_name
+    if shard_size is None:
+        shard_size = _shard_size()
+    previous_shards = _owned_shards(blob_name) if delete_previous else []
+    size = os.path.getsize(file_path)
+    if shard_size and size > shard_size:
+        digest = _upload_sharded(
+            blob_name, file_path, size, shard_size, **kwargs)
+    else:
+        with open(file_path, 'rb') as source:
+            with BlockBlobWriter(blob_name=blob_name, **kwargs) as writer:
+                shutil.copyfileobj(source, writer, writer.block_size)
+        digest = writer.hexdigest()
+    _delete_blobs(previous_shards)
+    catalog.record(file_path, digest)
+    return blob_name, digest
+
+
+def _owned_shards(blob_name):
+    """Returns the names of the shard blobs owned by a shard manifest blob.
+
+    These are the shards listed by the manifest and named under its own
+    '<file name>.shards/' prefix, or none if the blob is missing or is not a
+    shard manifest.
+    """
+    try:
+        layout = _blob_layout(blob_name)
+    except MissingRemoteModelError:
+        return []
+    if not layout.sharded:
+        return []
+    return [
+        segment[0] for segment in layout.segments
+        if segment[0].startswith(blob_name + '.shards/')
+    ]
+
+
+def _upload_sharded(blob_name, file_path, size, shard_size, **kwargs):
+    """Uploads a file as shards plus a shard manifest; returns its digest."""
+    upload_id = uuid.uuid4().hex
+    whole_digest = hashlib.blake2b()
+    shards = []
+    with open(file_path, 'rb') as source:
+        for index, start in enumerate(range(0, size, shard_size)):
+            length = min(shard_size, size - start)
+            shard_name = '{}.shards/{}/{:05d}'.format(
+                blob_name, upload_id, index)
+            for attempt in range(SHARD_RETRIES):
+                # the file digest is only advanced by the successful attempt
+                attempt_digest = whole_digest.copy()
+                try:
+                    source.seek(start)
+                    with BlockBlobWriter(shard_name, **kwargs) as writer:
+                        remaining = length
+                        while remaining:
+                            data = source.read(
+                                min(writer.block_size, remaining))
+                            if not data:
+                                raise IOError(
+                                    "{} was truncated while being "
+                                    "uploaded.".format(file_path))
+                            attempt_digest.update(data)
+                            writer.write(data)
+                            remaining -= len(data)
+                    break
+                except Exception:
+                    if attempt == SHARD_RETRIES - 1:
+                        raise
+            whole_digest = attempt_digest
+            shards.append({
+                'blob': shard_name,
+                'size': length,
+                'hash': 'blake2b:{}'.format(writer.hexdigest()),
+            })
+    manifest = {
+        'size': size,
+        'hash': 'blake2b:{}'.format(whole_digest.hexdigest()),
+        'shards': shards,
+    }
+    kwargs['metadata'] = dict(
+        kwargs.get('metadata') or {},
+        **{SHARDS_METADATA_KEY: str(len(shards))})
+    with BlockBlobWriter(blob_name=blob_name, **kwargs) as writer:
+        writer.write(json.dumps(manifest).encode('utf-8'))
+    return whole_digest.hexdigest()
 
 
 # def extension_by_file_prefix(
@@ -130,6 +324,15 @@ def download_model(
         model_name, file_path, task=None, model_attributes=None, **kwargs):
     """Downloads the given model from model store.
 
+    The blob is hashed as it is downloaded, and verified against the digest
+    stored in its metadata on upload, if any, before it is moved into place.
+    Its digest is then recorded in the local catalog; see mlshed.catalog.
+
+    The shards of a sharded instance (see upload_model) are downloaded
+    concurrently, each written directly to its position in the target file
+    and verified against its own digest. A shard failing to download, or to
+    verify, is retried on its own, up to SHARD_RETRIES times.
+
     Parameters
     ----------
     model_name : str
@@ -147,8 +350,7 @@ def download_model(
         and 'animal=dog' will result in a path such as
         'task_name/animal_dof/lang_en/dset.csv'.
     **kwargs : extra keyword arguments
-        Extra keyword arguments are forwarded to
-        azure.storage.blob.BlockBlobService.get_blob_to_path.
+        Extra keyword arguments are forwarded to BlobReader.
     """
     fname = ntpath.basename(file_path)
     blob_name = _blob_name(
@@ -157,16 +359,1537 @@ def download_model(
         task=task,
         model_attributes=model_attributes,
     )
-    # print("Downloading blob: {}".format(blob_name))
+    # both paths write next to the target and move it into place once
+    # complete and verified, so processes memory-mapping the previous file
+    # are never affected
+    try:
+        layout = _blob_layout(blob_name)
+        if layout.sharded:
+            _download_sharded(blob_name, layout, file_path, **kwargs)
+        else:
+            BlobReader(blob_name, tee_path=file_path, **kwargs).close()
+    except ModelIntegrityError:
+        raise
+    except Exception as e:
+        raise MissingRemoteModelError(
+            "With blob {}.".format(blob_name)) from e
+
+
+def _write_at(fobj, data, offset, lock):
+    if hasattr(os, 'pwrite'):
+        os.pwrite(fobj.fileno(), data, offset)
+        return
+    # pwrite is unavailable on Windows
+    with lock:
+        fobj.seek(offset)
+        fobj.write(data)
+
+
+def _download_sharded(blob_name, layout, file_path, chunk_size=None,
+                      max_connections=None, expected_digest=None,
+                      verify=True, record_digest=True):
+    """Downloads the shards of a sharded blob in parallel into a file."""
+    chunk_size = chunk_size or DEFAULT_BLOCK_SIZE
+    if verify and expected_digest is not None and \
+            expected_digest != layout.digest:
+        raise ModelIntegrityError(
+            "Blob {} has BLAKE2b digest {}, expected {}.".format(
+                blob_name, layout.digest, expected_digest))
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    partial_fpath = _partial_fpath(file_path)
+    lock = threading.Lock()
+
+    def _download_shard(segment):
+        shard_name, offset, size, etag, expected = segment
+        for attempt in range(SHARD_RETRIES):
+            digest = hashlib.blake2b()
+            try:
+                for start in range(0, size, chunk_size):
+                    end = min(start + chunk_size, size)
+                    data = _get_blob_range(shard_name, start, end, etag=etag)
+                    digest.update(data)
+                    _write_at(pfile, data, offset + start, lock)
+                if verify and expected is not None and \
+                        digest.hexdigest() != expected:
+                    raise ModelIntegrityError(
+                        "Shard blob {} has BLAKE2b digest {}, expected "
+                        "{}.".format(shard_name, digest.hexdigest(),
+                                     expected))
+                return
+            except Exception:
+                if attempt == SHARD_RETRIES - 1:
+                    raise
+
+    try:
+        with open(partial_fpath, 'wb') as pfile:
+            pfile.truncate(layout.size)
+            with ThreadPoolExecutor(
+                    max_workers=max_connections or DEFAULT_MAX_CONNECTIONS
+            ) as executor:
+                list(executor.map(_download_shard, layout.segments))
+        os.replace(partial_fpath, file_path)
+    except BaseException:
+        if os.path.isfile(partial_fpath):
+            os.remove(partial_fpath)
+        raise
+    if record_digest and verify and layout.digest is not None:
+        # each shard was verified, so the file digest recorded on upload
+        # holds for the reassembled file
+        catalog.record(file_path, layout.digest)
+
+
+def _dir_files(dir_path):
+    """Returns the '/'-separated relative paths of all files under dir_path."""
+    relpaths = []
+    for dirpath, _, fnames in os.walk(dir_path):
+        for fname in fnames:
+            relpath = os.path.relpath(os.path.join(dirpath, fname), dir_path)
+            relpaths.append(relpath.replace(os.sep, '/'))
+    return sorted(relpaths)
+
+
+def _read_dir_manifest(blob_name):
+    """Returns a (manifest, etag) tuple for a directory manifest blob."""
+    blob = _head_blob(blob_name)
+    etag = blob.properties.etag
+    manifest = _get_blob_range(
+        blob_name, 0, blob.properties.content_length, etag=etag)
+    return json.loads(manifest.decode('utf-8')), etag
+
+
+def _owned_dir_blobs(dname, **blob_kwargs):
+    """Returns the names of the file blobs owned by a directory manifest.
+
+    These are the file blobs listed by the manifest and named under its own
+    '<directory name>.files/' prefix, or none if there is no manifest.
+    """
+    try:
+        manifest, _ = _read_dir_manifest(
+            _blob_name(file_name=dname, **blob_kwargs))
+    except MissingRemoteModelError:
+        return []
+    return [
+        _blob_name(file_name=entry['blob'], **blob_kwargs)
+        for entry in manifest['files'].values()
+        if entry['blob'].startswith(dname + '.files/')
+    ]
+
+
+def _delete_blobs(blob_names):
+    for blob_name in blob_names:
+        try:
+            _blob_service().delete_blob(
+                container_name=SHED_CFG['azure']['container_name'],
+                blob_name=blob_name,
+            )
+        except AzureMissingResourceHttpError:
+            pass
+
+
+def upload_model_dir(model_name, dir_path, task=None, model_attributes=None,
+                     max_workers=None, delete_previous=True, **kwargs):
+    """Uploads all files under a directory as a single model instance.
+
+    Files are uploaded concurrently, each to its own blob, under a prefix
+    unique to this upload. A manifest listing them is then written to the
+    blob named after the directory. As that single write publishes the new
+    instance, readers observe either the previous complete instance or the
+    new one, never a mix of the two.
+
+    The file blobs of a replaced instance are then deleted, unless
+    delete_previous is False; readers still downloading the replaced
+    instance then fail with MissingRemoteModelError. Only blobs under the
+    '<directory name>.files/' prefix are deleted, as only those are owned by
+    the manifest; see copy_model_dir.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model to upload.
+    dir_path : str
+        The full path to the directory to upload.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+    max_workers : int, optional
+        The maximum number of files uploaded concurrently. Defaults to
+        DEFAULT_MAX_CONNECTIONS.
+    delete_previous : bool, default True
+        If set to False, the file blobs of a replaced instance are kept.
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to BlockBlobWriter.
+
+    Returns
+    -------
+    tuple
+        A (size, digest) tuple, holding the size and BLAKE2b hex digest of
+        the manifest blob.
+    """
+    dname = ntpath.basename(dir_path.rstrip('/\\'))
+    files_prefix = '{}.files/{}'.format(dname, uuid.uuid4().hex)
+    previous_blobs = []
+    if delete_previous:
+        previous_blobs = _owned_dir_blobs(
+            dname, model_name=model_name, task=task,
+            model_attributes=model_attributes)
+
+    def _upload_file(relpath):
+        file_name = '{}/{}'.format(files_prefix, relpath)
+        fpath = os.path.join(dir_path, *relpath.split('/'))
+        with open(fpath, 'rb') as source:
+            with model_blob_writer(
+                    model_name=model_name,
+                    file_name=file_name,
+                    task=task,
+                    model_attributes=model_attributes,
+                    **kwargs
+            ) as writer:
+                shutil.copyfileobj(source, writer, writer.block_size)
+        catalog.record(fpath, writer.hexdigest())
+        return relpath, {
+            'blob': file_name,
+            'size': writer.tell(),
+            'hash': '{}:{}'.format(catalog.HASH_ALGORITHM, writer.hexdigest()),
+        }
+    with ThreadPoolExecutor(
+            max_workers=max_workers or DEFAULT_MAX_CONNECTIONS) as executor:
+        files = dict(executor.map(_upload_file, _dir_files(dir_path)))
+    manifest = json.dumps({'files': files}, sort_keys=True).encode('utf-8')
+    with model_blob_writer(
+            model_name=model_name,
+            file_name=dname,
+            task=task,
+            model_attributes=model_attributes,
+    ) as writer:
+        writer.write(manifest)
+    _delete_blobs(previous_blobs)
+    return writer.tell(), writer.hexdigest()
+
+
+def download_model_dir(model_name, dir_path, task=None,
+                       model_attributes=None, max_workers=None,
+                       expected_digest=None, verify=True, **kwargs):
+    """Downloads a directory model instance from model store.
+
+    The manifest of the instance is read first, and all files it lists are
+    then downloaded concurrently into a hidden directory next to dir_path,
+    each verified against its hash in the manifest. The directory is moved
+    into place only once all files were downloaded.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    dir_path : str
+        The full path of the local directory of the instance.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+    max_workers : int, optional
+        The maximum number of files downloaded concurrently. Defaults to
+        DEFAULT_MAX_CONNECTIONS.
+    expected_digest : str, optional
+        The BLAKE2b hex digest the manifest blob is expected to have.
+    verify : bool, default True
+        If set to True, the manifest and all files are verified while they
+        are downloaded.
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to BlobReader.
+    """
+    dname = ntpath.basename(dir_path.rstrip('/\\'))
+    manifest_blob_name = _blob_name(
+        model_name=model_name,
+        file_name=dname,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    with BlobReader(manifest_blob_name, expected_digest=expected_digest,
+                    verify=verify) as reader:
+        files = json.loads(reader.readall().decode('utf-8'))['files']
+    partial_dpath = _partial_fpath(dir_path)
+
+    def _download_file(relpath):
+        entry = files[relpath]
+        algorithm, _, digest = entry['hash'].partition(':')
+        tee_path = os.path.join(partial_dpath, *relpath.split('/'))
+        os.makedirs(os.path.dirname(tee_path), exist_ok=True)
+        reader = BlobReader(
+            _blob_name(
+                model_name=model_name,
+                file_name=entry['blob'],
+                task=task,
+                model_attributes=model_attributes,
+            ),
+            tee_path=tee_path,
+            expected_digest=digest if algorithm == catalog.HASH_ALGORITHM
+            else None,
+            verify=verify,
+            record_digest=False,
+            **kwargs
+        )
+        reader.close()
+        return relpath, reader.hexdigest()
+    try:
+        os.makedirs(partial_dpath)
+        with ThreadPoolExecutor(
+                max_workers=max_workers or DEFAULT_MAX_CONNECTIONS
+        ) as executor:
+            digests = dict(executor.map(_download_file, sorted(files)))
+        if os.path.isdir(dir_path):
+            catalog.forget(dir_path)
+        _replace_dir(partial_dpath, dir_path)
+    finally:
+        if os.path.isdir(partial_dpath):
+            shutil.rmtree(partial_dpath, ignore_errors=True)
+    for relpath, digest in digests.items():
+        catalog.record(os.path.join(dir_path, *relpath.split('/')), digest)
+
+
+def _copy_blob(source_blob_name, blob_name, source_etag=None,
+               poll_interval=None, timeout=None):
+    """Copies a blob server-side, polling until the copy completes.
+
+    If a source_etag is given, the copy fails if the source blob has changed
+    since. A copy still pending after timeout seconds is aborted.
+    """
+    service = _blob_service()
+    container_name = SHED_CFG['azure']['container_name']
+    started = time.monotonic()
+    copy = service.copy_blob(
+        container_name=container_name,
+        blob_name=blob_name,
+        copy_source=service.make_blob_url(container_name, source_blob_name),
+        source_if_match=source_etag,
+    )
+    negcache.discard(blob_name)
+    while copy.status == 'pending':
+        if timeout is not None and time.monotonic() - started > timeout:
+            service.abort_copy_blob(
+                container_name=container_name,
+                blob_name=blob_name,
+                copy_id=copy.id,
+            )
+            raise ModelCopyError(
+                "Copying blob {} to {} did not complete within {} "
+                "seconds.".format(source_blob_name, blob_name, timeout))
+        time.sleep(COPY_POLL_INTERVAL if poll_interval is None
+                   else poll_interval)
+        copy = service.get_blob_properties(
+            container_name=container_name,
+            blob_name=blob_name,
+        ).properties.copy
+    if copy.status != 'success':
+        raise ModelCopyError(
+            "Copying blob {} to {} {}: {}".format(
+                source_blob_name, blob_name, copy.status,
+                copy.status_description))
+
+
+def copy_model_blob(
+        model_name, file_name, target_model_name, target_file_name,
+        task=None, model_attributes=None, target_task=None,
+        target_model_attributes=None, poll_interval=None, timeout=None):
+    """Copies the blob of a model instance to that of another, server-side.
+
+    The blob service copies the blob - including its metadata - on its own,
+    so no content is transferred through this machine. The copy is made
+    from the blob as it was when first looked up, and polled for completion.
+
+    The shards of a sharded instance are copied the same way, under a prefix
+    unique to this copy, and a manifest listing them is written last. Copies
+    thus never share shard blobs with their source, and each can be replaced
+    - deleting its shards, as is done for a replaced target here -
+    independently; see upload_model.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model to copy an instance of.
+    file_name : str
+        The file name of the instance to copy.
+    target_model_name : str
+        The name of the model to copy the instance to.
+    target_file_name : str
+        The file name of the copy.
+    task : str, optional
+        The task of the model to copy an instance of.
+    model_attributes : dict, optional
+        Additional attributes of the model to copy an instance of.
+    target_task : str, optional
+        The task of the model to copy the instance to.
+    target_model_attributes : dict, optional
+        Additional attributes of the model to copy the instance to.
+    poll_interval : float, optional
+        The number of seconds between polls of a pending copy. Defaults to
+        COPY_POLL_INTERVAL.
+    timeout : float, optional
+        If given, a copy still pending after this many seconds is aborted,
+        and ModelCopyError is raised.
+
+    Returns
+    -------
+    tuple
+        A (size, digest) tuple, as returned by model_blob_checksum, of the
+        copied instance.
+    """
+    source_blob_name = _blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    blob_name = _blob_name(
+        model_name=target_model_name,
+        file_name=target_file_name,
+        task=target_task,
+        model_attributes=target_model_attributes,
+    )
+    layout = _blob_layout(source_blob_name)
+    previous_shards = _owned_shards(blob_name)
+    if layout.sharded:
+        _copy_shards(blob_name, layout, poll_interval, timeout)
+    else:
+        _copy_blob(
+            source_blob_name=source_blob_name,
+            blob_name=blob_name,
+            source_etag=layout.etag,
+            poll_interval=poll_interval,
+            timeout=timeout,
+        )
+    _delete_blobs(previous_shards)
+    return layout.size, layout.digest
+
+
+def _copy_shards(blob_name, layout, poll_interval, timeout):
+    """Copies the shards of a sharded layout, then writes their manifest."""
+    upload_id = uuid.uuid4().hex
+    shards = []
+    for index, (shard_blob, _, size, _, digest) in enumerate(
+            layout.segments):
+        target_shard = '{}.shards/{}/{:05d}'.format(
+            blob_name, upload_id, index)
+        _copy_blob(
+            source_blob_name=shard_blob,
+            blob_name=target_shard,
+            poll_interval=poll_interval,
+            timeout=timeout,
+        )
+        shards.append({
+            'blob': target_shard,
+            'size': size,
+            'hash': 'blake2b:{}'.format(digest) if digest else None,
+        })
+    manifest = {
+        'size': layout.size,
+        'hash': 'blake2b:{}'.format(layout.digest) if layout.digest else None,
+        'shards': shards,
+    }
+    metadata = {SHARDS_METADATA_KEY: str(len(shards))}
+    with BlockBlobWriter(blob_name=blob_name, metadata=metadata) as writer:
+        writer.write(json.dumps(manifest).encode('utf-8'))
+
+
+def copy_model_dir(
+        model_name, file_name, target_model_name, target_file_name,
+        task=None, model_attributes=None, target_task=None,
+        target_model_attributes=None, poll_interval=None, timeout=None,
+        max_workers=None):
+    """Copies a directory instance of a model to another, server-side.
+
+    The blobs of all files in the directory are copied concurrently, under
+    a prefix unique to this copy, and a manifest listing them is written
+    last, so the copy becomes visible only once complete. Copies thus never
+    share file blobs with their source, and each can be replaced - deleting
+    its file blobs, as is done for a replaced target here - independently.
+    See copy_model_blob for the parameters, and upload_model_dir.
+
+    Returns
+    -------
+    tuple
+        A (size, digest) tuple, holding the size and BLAKE2b hex digest of
+        the manifest blob.
+    """
+    source_kwargs = dict(
+        model_name=model_name, task=task, model_attributes=model_attributes)
+    target_kwargs = dict(
+        model_name=target_model_name, task=target_task,
+        model_attributes=target_model_attributes)
+    manifest, _ = _read_dir_manifest(
+        _blob_name(file_name=file_name, **source_kwargs))
+    previous_blobs = _owned_dir_blobs(target_file_name, **target_kwargs)
+    files_prefix = '{}.files/{}'.format(target_file_name, uuid.uuid4().hex)
+
+    def _copy_file(item):
+        relpath, entry = item
+        target_entry = dict(
+            entry, blob='{}/{}'.format(files_prefix, relpath))
+        _copy_blob(
+            source_blob_name=_blob_name(
+                file_name=entry['blob'], **source_kwargs),
+            blob_name=_blob_name(
+                file_name=target_entry['blob'], **target_kwargs),
+            poll_interval=poll_interval,
+            timeout=timeout,
+        )
+        return relpath, target_entry
+    with ThreadPoolExecutor(
+            max_workers=max_workers or DEFAULT_MAX_CONNECTIONS) as executor:
+        files = dict(executor.map(_copy_file, manifest['files'].items()))
+    with model_blob_writer(file_name=target_file_name, **target_kwargs) as \
+            writer:
+        writer.write(json.dumps(
+            {'files': files}, sort_keys=True).encode('utf-8'))
+    _delete_blobs(previous_blobs)
+    return writer.tell(), writer.hexdigest()
+
+
+def model_blob_properties(
+        model_name, file_name, task=None, model_attributes=None):
+    """Returns the properties of the blob of the given model instance.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    file_name : str
+        The file name of the model instance.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+
+    Returns
+    -------
+    azure.storage.blob.models.BlobProperties
+        The properties of the corresponding blob; e.g. content_length, etag
+        and last_modified.
+    """
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    return _blob_properties(blob_name)
+
+
+def model_blob_checksum(
+        model_name, file_name, task=None, model_attributes=None):
+    """Returns the size and digest of the blob of the given model instance.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    file_name : str
+        The file name of the model instance.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the models.
+
+    Returns
+    -------
+    tuple
+        A (size, digest) tuple, where digest is the BLAKE2b hex digest stored
+        in the blob's metadata - or shard manifest - on upload, or None for
+        blobs uploaded without one.
+    """
+    layout = _blob_layout(_blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    ))
+    return layout.size, layout.digest
+
+
+def _head_blob(blob_name):
+    """Returns the given blob, with its properties and metadata only.
+
+    Blobs found missing are recorded in the negative cache, and lookups of
+    blobs recorded there fail without a request; see mlshed.negcache.
+    """
+    if negcache.is_missing(blob_name):
+        raise MissingRemoteModelError(
+            "With blob {}: known to be missing.".format(blob_name))
     try:
-        _blob_service().get_blob_to_path(
+        return _blob_service().get_blob_properties(
             container_name=SHED_CFG['azure']['container_name'],
             blob_name=blob_name,
-            file_path=file_path,
-            **kwargs,
         )
+    except AzureMissingResourceHttpError as e:
+        negcache.add(blob_name)
+        raise MissingRemoteModelError(
+            "With blob {}.".format(blob_name)) from e
     except Exception as e:
-        if os.path.isfile(file_path):
-            os.remove(file_path)
         raise MissingRemoteModelError(
             "With blob {}.".format(blob_name)) from e
+
+
+def _blob_properties(blob_name):
+    return _head_blob(blob_name).properties
+
+
+def _recorded_digest(blob):
+    """Returns the BLAKE2b hex digest stored in blob metadata, if any."""
+    return (getattr(blob, 'metadata', None) or {}).get(DIGEST_METADATA_KEY)
+
+
+BlobLayout = collections.namedtuple(
+    'BlobLayout', ['size', 'segments', 'digest', 'sharded', 'etag'])
+BlobLayout.__doc__ = """The blobs making up the contents of a blob.
+
+A plain blob is made of a single segment: itself. The contents of a shard
+manifest blob are the concatenation of its shards. Each segment is a
+(blob_name, offset, size, etag, digest) tuple, where offset is the position
+of the segment in the contents, etag - if not None - conditions reads of the
+segment's blob, and digest is the segment's BLAKE2b hex digest, if known.
+The etag field holds the ETag of the blob itself.
+"""
+
+
+def _hash_value(hash_str):
+    """Returns the hex digest of a '<algorithm>:<digest>' BLAKE2b hash."""
+    algorithm, _, digest = (hash_str or '').partition(':')
+    return digest if algorithm == 'blake2b' and digest else None
+
+
+def _blob_layout(blob_name):
+    """Returns the BlobLayout of the given blob, resolving shard manifests."""
+    blob = _head_blob(blob_name)
+    properties = blob.properties
+    if SHARDS_METADATA_KEY not in (getattr(blob, 'metadata', None) or {}):
+        digest = _recorded_digest(blob)
+        return BlobLayout(
+            size=properties.content_length,
+            segments=[(blob_name, 0, properties.content_length,
+                       properties.etag, digest)],
+            digest=digest,
+            sharded=False,
+            etag=properties.etag,
+        )
+    try:
+        manifest = json.loads(_get_blob_range(
+            blob_name, 0, properties.content_length,
+            etag=properties.etag).decode('utf-8'))
+    except Exception as e:
+        raise MissingRemoteModelError(
+            "With shard manifest blob {}.".format(blob_name)) from e
+    segments = []
+    offset = 0
+    for shard in manifest['shards']:
+        # shard blobs are named uniquely per upload and never overwritten
+        segments.append((shard['blob'], offset, shard['size'], None,
+                         _hash_value(shard.get('hash'))))
+        offset += shard['size']
+    return BlobLayout(
+        size=manifest['size'],
+        segments=segments,
+        digest=_hash_value(manifest.get('hash')),
+        sharded=True,
+        etag=properties.etag,
+    )
+
+
+def _segment_chunks(segments, chunk_size):
+    """Yields (blob_name, start, end, etag, offset) ranged reads covering
+    the given segments in order, none longer than chunk_size bytes."""
+    for blob_name, offset, size, etag, _ in segments:
+        for start in range(0, size, chunk_size):
+            end = min(start + chunk_size, size)
+            yield blob_name, start, end, etag, offset + start
+
+
+def list_model_blobs(model_name, task=None, model_attributes=None):
+    """Lists the blobs of all instances of the given model in model store.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+
+    Returns
+    -------
+    list of dict
+        A dict for each blob directly under the model's blob "folder", with
+        'name' (the file name), 'size', 'etag' and 'last_modified' (an ISO
+        formatted string) keys.
+    """
+    return _list_blobs(_blob_prefix(
+        model_name=model_name,
+        task=task,
+        model_attributes=model_attributes,
+    ) + '/')
+
+
+def _list_blobs(path_prefix):
+    blobs = []
+    # list_blobs transparently follows continuation markers
+    for blob in _blob_service().list_blobs(
+            container_name=SHED_CFG['azure']['container_name'],
+            prefix=path_prefix,
+            delimiter='/',
+    ):
+        properties = getattr(blob, 'properties', None)
+        if properties is None:  # a BlobPrefix, i.e. a "sub-folder"
+            continue
+        blobs.append({
+            'name': blob.name[len(path_prefix):],
+            'size': properties.content_length,
+            'etag': properties.etag,
+            'last_modified': properties.last_modified.isoformat(),
+        })
+    negcache.add_listing(path_prefix, [blob['name'] for blob in blobs])
+    return blobs
+
+
+def read_model_index(model_name, task=None, model_attributes=None):
+    """Reads the index blob of the given model from model store.
+
+    The index of a model maps the file name of each of its instances to a
+    dict of instance properties, such as 'version', 'tags', 'ext', 'size',
+    'hash' and 'uploaded_at'. It is maintained by upload_model_index_entry.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the models.
+
+    Returns
+    -------
+    index : dict or None
+        The index of the model, or None if the model has no index blob.
+    etag : str or None
+        The ETag of the index blob, or None if the model has no index blob.
+    """
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=INDEX_FNAME,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    if negcache.is_missing(blob_name):
+        return None, None
+    try:
+        blob = _blob_service().get_blob_to_text(
+            container_name=SHED_CFG['azure']['container_name'],
+            blob_name=blob_name,
+        )
+    except AzureMissingResourceHttpError:
+        negcache.add(blob_name)
+        return None, None
+    return json.loads(blob.content), blob.properties.etag
+
+
+def upload_model_index_entry(
+        model_name, file_name, entry, task=None, model_attributes=None):
+    """Adds or replaces an entry in the index blob of the given model.
+
+    Concurrent updates are handled with ETag-based optimistic concurrency:
+    the index is re-read and the update retried whenever the index blob was
+    changed since it was read.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    file_name : str
+        The file name of the indexed model instance.
+    entry : dict
+        The properties of the model instance. If None, the entry for the given
+        file name is removed from the index.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the models.
+
+    Returns
+    -------
+    dict
+        The updated index.
+    """
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=INDEX_FNAME,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    for _ in range(INDEX_UPDATE_RETRIES):
+        index, etag = read_model_index(
+            model_name=model_name,
+            task=task,
+            model_attributes=model_attributes,
+        )
+        if index is None:
+            index = {'instances': {}}
+        if entry is None:
+            index['instances'].pop(file_name, None)
+        else:
+            index['instances'][file_name] = entry
+        # only create the index if absent, or replace the version we read
+        condition = {'if_match': etag} if etag else {'if_none_match': '*'}
+        try:
+            _blob_service().create_blob_from_text(
+                container_name=SHED_CFG['azure']['container_name'],
+                blob_name=blob_name,
+                text=json.dumps(index, sort_keys=True),
+                **condition,
+            )
+            negcache.discard(blob_name)
+            return index
+        except AzureHttpError as e:
+            if e.status_code not in (409, 412):
+                raise
+            # the index may have been created since found missing
+            negcache.discard(blob_name)
+    raise ModelIndexConflictError(
+        "Failed updating index blob {} after {} attempts.".format(
+            blob_name, INDEX_UPDATE_RETRIES))
+
+
+def _alias_blob_name(model_name, alias, task=None, model_attributes=None):
+    return _blob_name(
+        model_name=model_name,
+        file_name='{}/{}.json'.format(ALIASES_DIRNAME, alias),
+        task=task,
+        model_attributes=model_attributes,
+    )
+
+
+def read_model_alias(model_name, alias, task=None, model_attributes=None):
+    """Reads the pointer blob of an alias of the given model.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    alias : str
+        The name of the alias; e.g. 'prod'.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the models.
+
+    Returns
+    -------
+    dict or None
+        The pointer of the alias, with 'version', 'tags', 'ext' and 'fname'
+        keys identifying the instance the alias points at, or None if the
+        model has no such alias.
+    """
+    try:
+        blob = _blob_service().get_blob_to_text(
+            container_name=SHED_CFG['azure']['container_name'],
+            blob_name=_alias_blob_name(
+                model_name=model_name,
+                alias=alias,
+                task=task,
+                model_attributes=model_attributes,
+            ),
+        )
+    except AzureMissingResourceHttpError:
+        return None
+    return json.loads(blob.content)
+
+
+def upload_model_alias(
+        model_name, alias, pointer, task=None, model_attributes=None):
+    """Writes the pointer blob of an alias of the given model.
+
+    The pointer blob is replaced with a single request, so readers always
+    see either the previous or the new pointer.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    alias : str
+        The name of the alias; e.g. 'prod'.
+    pointer : dict
+        The pointer of the alias; see read_model_alias. If None, the alias is
+        removed.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the models.
+    """
+    blob_name = _alias_blob_name(
+        model_name=model_name,
+        alias=alias,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    if pointer is None:
+        try:
+            _blob_service().delete_blob(
+                container_name=SHED_CFG['azure']['container_name'],
+                blob_name=blob_name,
+            )
+        except AzureMissingResourceHttpError:
+            pass
+        return
+    _blob_service().create_blob_from_text(
+        container_name=SHED_CFG['azure']['container_name'],
+        blob_name=blob_name,
+        text=json.dumps(pointer, sort_keys=True),
+    )
+
+
+class BlockBlobWriter(object):
+    """A write-only file object uploading to a block blob as it is written.
+
+    Written bytes are cut into blocks of block_size bytes, and each block is
+    uploaded with put_block as soon as it fills up, with at most
+    max_connections blocks in flight. Memory use is thus bounded by about
+    (max_connections + 1) * block_size bytes, regardless of blob size. The
+    blob is committed with put_block_list - and only then becomes visible -
+    when the writer is closed without error.
+
+    Written bytes are hashed as they are written, and the BLAKE2b digest is
+    stored in the metadata of the committed blob. Blocks are uploaded with
+    a Content-MD5 header, so the service rejects blocks corrupted in
+    transit.
+
+    Parameters
+    ----------
+    blob_name : str
+        The name of the blob to write.
+    block_size : int, optional
+        The size of uploaded blocks, in bytes. As a blob is made of at most
+        50,000 blocks, this bounds blob size. Defaults to DEFAULT_BLOCK_SIZE.
+    max_connections : int, optional
+        The maximum number of blocks uploaded concurrently. Defaults to
+        DEFAULT_MAX_CONNECTIONS.
+    tee_path : str, optional
+        If given, all written bytes are also written to this local path,
+        which is moved into place only if the blob is committed, and recorded
+        in the local catalog.
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to
+        azure.storage.blob.BlockBlobService.put_block_list.
+    """
+
+    def __init__(self, blob_name, block_size=None, max_connections=None,
+                 tee_path=None, **kwargs):
+        if block_size is None:
+            block_size = DEFAULT_BLOCK_SIZE
+        if max_connections is None:
+            max_connections = DEFAULT_MAX_CONNECTIONS
+        self.blob_name = blob_name
+        self.block_size = block_size
+        self.closed = False
+        self._kwargs = kwargs
+        self._buffer = bytearray()
+        self._position = 0
+        self._digest = hashlib.blake2b()
+        self._block_ids = []
+        self._futures = []
+        self._error = None
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._executor = ThreadPoolExecutor(max_workers=max_connections)
+        self._tee_path = tee_path
+        self._tee = None
+        if tee_path:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(tee_path)), exist_ok=True)
+            self._tee = open(_partial_fpath(tee_path), 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def hexdigest(self):
+        """Returns the BLAKE2b hex digest of all bytes written so far."""
+        return self._digest.hexdigest()
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed BlockBlobWriter")
+        if self._error is not None:
+            raise self._error
+        view = memoryview(data).cast('B')
+        nbytes = len(view)
+        self._digest.update(view)
+        if self._tee is not None:
+            self._tee.write(view)
+        self._position += nbytes
+        while view:
+            take = min(self.block_size - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) == self.block_size:
+                self._put_block()
+        return nbytes
+
+    def _put_block(self):
+        block, self._buffer = self._buffer, bytearray()
+        # block ids must all be of the same length
+        block_id = '{:010d}'.format(len(self._block_ids))
+        self._block_ids.append(block_id)
+        self._slots.acquire()
+        future = self._executor.submit(self._upload_block, block, block_id)
+        future.add_done_callback(self._block_done)
+        self._futures.append(future)
+
+    def _upload_block(self, block, block_id):
+        _blob_service().put_block(
+            container_name=SHED_CFG['azure']['container_name'],
+            blob_name=self.blob_name,
+            block=bytes(block),
+            block_id=block_id,
+            validate_content=True,
+        )
+
+    def _block_done(self, future):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self._error = future.exception()
+
+    def close(self):
+        """Uploads any remaining bytes and commits the blob."""
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._put_block()
+            for future in self._futures:
+                future.result()
+            kwargs = dict(self._kwargs)
+            kwargs['metadata'] = dict(
+                kwargs.get('metadata') or {},
+                **{DIGEST_METADATA_KEY: self.hexdigest()})
+            _blob_service().put_block_list(
+                container_name=SHED_CFG['azure']['container_name'],
+                blob_name=self.blob_name,
+                block_list=[BlobBlock(id=block_id)
+                            for block_id in self._block_ids],
+                **kwargs,
+            )
+            negcache.discard(self.blob_name)
+        except BaseException:
+            self.abort()
+            raise
+        self.closed = True
+        self._executor.shutdown()
+        if self._tee is not None:
+            self._tee.close()
+            os.replace(self._tee.name, self._tee_path)
+            catalog.record(self._tee_path, self.hexdigest())
+
+    def abort(self):
+        """Discards everything written; the blob is left unchanged.
+
+        Uploaded but uncommitted blocks are garbage collected by the blob
+        service.
+        """
+        self.closed = True
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown()
+        if self._tee is not None:
+            self._tee.close()
+            if os.path.isfile(self._tee.name):
+                os.remove(self._tee.name)
+
+
+def model_blob_writer(model_name, file_name, task=None, model_attributes=None,
+                      **kwargs):
+    """Opens a file object streaming into the blob of a model instance.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model to upload.
+    file_name : str
+        The file name of the model instance.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to BlockBlobWriter.
+
+    Returns
+    -------
+    BlockBlobWriter
+        A write-only file object. The blob is committed when it is closed.
+    """
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    return BlockBlobWriter(blob_name=blob_name, **kwargs)
+
+
+def read_model_blob_range(model_name, file_name, start, end, task=None,
+                          model_attributes=None, etag=None):
+    """Downloads a byte range of the blob of a model instance.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    file_name : str
+        The file name of the model instance.
+    start : int
+        The offset of the first byte to download.
+    end : int
+        The offset following the last byte to download.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the models.
+    etag : str, optional
+        If given, the download fails if the blob no longer has this ETag.
+
+    Returns
+    -------
+    bytes
+        The bytes in the range [start, end) of the blob.
+    """
+    if end <= start:
+        return b''
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    try:
+        return _get_blob_range(blob_name, start, end, etag=etag)
+    except Exception as e:
+        raise MissingRemoteModelError(
+            "With blob {}.".format(blob_name)) from e
+
+
+def _packs_prefix(task=None):
+    path_prefix = 'mlshed'
+    if task:
+        path_prefix += '/{}'.format(_snail_case(task))
+    return '{}/{}/'.format(path_prefix, PACKS_DIRNAME)
+
+
+def pack_blob_writer(pack_fname, task=None, **kwargs):
+    """Opens a file object streaming into a pack blob.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The file name of the pack.
+    task : str, optional
+        The task under which the pack is stored. If not given, the pack is
+        stored in the task-agnostic pack directory.
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to BlockBlobWriter.
+
+    Returns
+    -------
+    BlockBlobWriter
+        A write-only file object. The blob is committed when it is closed.
+    """
+    return BlockBlobWriter(
+        blob_name=_packs_prefix(task) + pack_fname, **kwargs)
+
+
+def list_pack_blobs(task=None):
+    """Lists the pack blobs stored under the given task.
+
+    Parameters
+    ----------
+    task : str, optional
+        The task under which packs are stored.
+
+    Returns
+    -------
+    list of dict
+        A dict for each pack blob, with 'name' (the file name), 'size',
+        'etag' and 'last_modified' (an ISO formatted string) keys.
+    """
+    return _list_blobs(_packs_prefix(task))
+
+
+def read_pack_blob_range(pack_fname, start, end, task=None, etag=None):
+    """Downloads a byte range of a pack blob.
+
+    Parameters
+    ----------
+    pack_fname : str
+        The file name of the pack.
+    start : int
+        The offset of the first byte to download.
+    end : int
+        The offset following the last byte to download.
+    task : str, optional
+        The task under which the pack is stored.
+    etag : str, optional
+        If given, the download fails if the blob no longer has this ETag.
+
+    Returns
+    -------
+    bytes
+        The bytes in the range [start, end) of the blob.
+    """
+    if end <= start:
+        return b''
+    blob_name = _packs_prefix(task) + pack_fname
+    try:
+        return _get_blob_range(blob_name, start, end, etag=etag)
+    except Exception as e:
+        raise MissingRemoteModelError(
+            "With blob {}.".format(blob_name)) from e
+
+
+def _get_blob_range(blob_name, start, end, etag=None):
+    """Downloads bytes [start, end) of the given blob.
+
+    If an etag is given, the download fails if the blob has changed since.
+    Ranges of up to MAX_VALIDATED_RANGE bytes are checked against the
+    Content-MD5 the service computes for them.
+    """
+    return _blob_service().get_blob_to_bytes(
+        container_name=SHED_CFG['azure']['container_name'],
+        blob_name=blob_name,
+        start_range=start,
+        end_range=end - 1,
+        max_connections=1,
+        if_match=etag,
+        validate_content=end - start <= MAX_VALIDATED_RANGE,
+    ).content
+
+
+class BlobReader(io.RawIOBase):
+    """A read-only file object reading a blob with pipelined ranged downloads.
+
+    Up to max_connections chunks ahead of the current read position are
+    downloaded concurrently, so a deserializer consuming this reader works
+    on one chunk while the following ones are still in transfer. Consumed
+    chunks are hashed on arrival, and optionally written to a local file,
+    so verification and persistence overlap the transfer as well.
+
+    All ranged downloads are conditioned on the ETag the blob had when the
+    reader was opened, so a blob replaced mid-read results in an error
+    rather than in a mix of two instances. Shard manifest blobs are read as
+    the concatenation of their shards; see upload_model.
+
+    The blob is verified and persisted once read to its end, which close
+    does for readers not read that far. Readers of a with statement exited
+    by an exception are aborted instead; see abort.
+
+    Parameters
+    ----------
+    blob_name : str
+        The name of the blob to read.
+    chunk_size : int, optional
+        The size, in bytes, of each ranged download. Defaults to
+        DEFAULT_BLOCK_SIZE.
+    max_connections : int, optional
+        The maximum number of chunks downloaded concurrently. Defaults to
+        DEFAULT_MAX_CONNECTIONS.
+    tee_path : str, optional
+        If given, the blob is also written to this local path, which is moved
+        into place only once the whole blob was read (and verified), and
+        recorded in the local catalog.
+    expected_digest : str, optional
+        The BLAKE2b hex digest the blob is expected to have. If not given,
+        the digest stored in the blob's metadata on upload is used, if any.
+    verify : bool, default True
+        If set to True, the BLAKE2b digest of the blob is compared to the
+        expected one once the whole blob was read, raising
+        ModelIntegrityError on a mismatch.
+    record_digest : bool, default True
+        If set to True, the digest of the file written to tee_path is
+        recorded in the local catalog.
+    """
+
+    def __init__(self, blob_name, chunk_size=None, max_connections=None,
+                 tee_path=None, expected_digest=None, verify=True,
+                 record_digest=True):
+        super().__init__()
+        layout = _blob_layout(blob_name)
+        if not verify:
+            expected_digest = None
+        elif expected_digest is None:
+            expected_digest = layout.digest
+        self.blob_name = blob_name
+        self.size = layout.size
+        self.chunk_size = chunk_size or DEFAULT_BLOCK_SIZE
+        self._max_ahead = max_connections or DEFAULT_MAX_CONNECTIONS
+        self._executor = ThreadPoolExecutor(max_workers=self._max_ahead)
+        self._pending = collections.deque()
+        self._chunks = _segment_chunks(layout.segments, self.chunk_size)
+        self._current = memoryview(b'')
+        self._position = 0
+        self._digest = hashlib.blake2b()
+        self._expected_digest = expected_digest
+        self._tee_path = tee_path
+        self._record_digest = record_digest
+        self._tee = None
+        if tee_path:
+            os.makedirs(
+                os.path.dirname(os.path.abspath(tee_path)), exist_ok=True)
+            self._tee = open(_partial_fpath(tee_path), 'wb')
+        self._fill()
+
+    def _fill(self):
+        while len(self._pending) < self._max_ahead:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return
+            blob_name, start, end, etag, _ = chunk
+            self._pending.append(self._executor.submit(
+                _get_blob_range, blob_name, start, end, etag))
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def hexdigest(self):
+        """Returns the BLAKE2b hex digest of all bytes read so far."""
+        return self._digest.hexdigest()
+
+    def readinto(self, buffer):
+        if not self._current:
+            if not self._pending:
+                self._finish()
+                return 0
+            chunk = self._pending.popleft().result()
+            self._fill()
+            self._digest.update(chunk)
+            if self._tee is not None:
+                self._tee.write(chunk)
+            self._current = memoryview(chunk)
+        nbytes = min(len(buffer), len(self._current))
+        memoryview(buffer).cast('B')[:nbytes] = self._current[:nbytes]
+        self._current = self._current[nbytes:]
+        self._position += nbytes
+        return nbytes
+
+    def _finish(self):
+        """Verifies and persists the blob once it was fully read."""
+        if self._expected_digest is not None and \
+                self.hexdigest() != self._expected_digest:
+            self._discard_tee()
+            raise ModelIntegrityError(
+                "Blob {} has BLAKE2b digest {}, expected {}.".format(
+                    self.blob_name, self.hexdigest(), self._expected_digest))
+        if self._tee is not None:
+            self._tee.close()
+            os.replace(self._tee.name, self._tee_path)
+            self._tee = None
+            if self._record_digest:
+                catalog.record(self._tee_path, self.hexdigest())
+
+    def _discard_tee(self):
+        if self._tee is not None:
+            self._tee.close()
+            if os.path.isfile(self._tee.name):
+                os.remove(self._tee.name)
+            self._tee = None
+
+    def close(self):
+        """Reads the rest of the blob, verifying and persisting it, and closes.
+
+        Closing the reader through a with statement exited by an exception
+        calls abort instead.
+        """
+        if self.closed:
+            return
+        try:
+            if self._expected_digest is not None or self._tee is not None:
+                # deserializers may stop short of the end of the blob, but
+                # verifying and persisting it requires all of it
+                while self.readinto(bytearray(self.chunk_size)):
+                    pass
+        except BaseException:
+            self.abort()
+            raise
+        self.abort()
+
+    def abort(self):
+        """Closes the reader without reading the rest of the blob.
+
+        Pending downloads are cancelled, and the partially written local
+        file, if any, is removed; nothing is verified or persisted.
+        """
+        if self.closed:
+            return
+        self._discard_tee()
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown()
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __del__(self):
+        # never download the rest of a blob on garbage collection
+        if hasattr(self, '_executor'):
+            self.abort()
+
+
+class _BlobStream(io.BufferedReader):
+    """A buffered BlobReader, aborting it when a with statement fails."""
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.raw.abort()
+
+
+def open_model_blob(model_name, file_name, task=None, model_attributes=None,
+                    **kwargs):
+    """Opens a file object streaming the blob of a model instance.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    file_name : str
+        The file name of the model instance.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to BlobReader.
+
+    Returns
+    -------
+    io.BufferedReader
+        A buffered, read-only and non-seekable file object. Closing it reads
+        the rest of the blob, to verify and persist it, unless it is closed
+        by a with statement exited by an exception.
+    """
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    reader = BlobReader(blob_name, **kwargs)
+    return _BlobStream(reader, buffer_size=reader.chunk_size)
+
+
+def download_model_to_buffer(
+        model_name, file_name, task=None, model_attributes=None,
+        chunk_size=None, max_connections=None, expected_digest=None,
+        verify=True):
+    """Downloads the blob of a model instance into anonymous memory.
+
+    Chunks of the blob are downloaded concurrently with ranged requests and
+    written directly into place in a page-aligned anonymous memory map.
+    Chunks are hashed in order as they arrive, overlapping verification with
+    the download of later chunks.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    file_name : str
+        The file name of the model instance.
+    task : str, optional
+        The task for which the given model is used for. If not given, a path
+        for the corresponding task-agnostic directory is used.
+    model_attributes : dict, optional
+        Additional attributes of the models. Used to generate additional
+        sub-folders on the blob "path".
+    chunk_size : int, optional
+        The size, in bytes, of each ranged download. Defaults to
+        DEFAULT_BLOCK_SIZE.
+    max_connections : int, optional
+        The maximum number of concurrent ranged downloads. Defaults to
+        DEFAULT_MAX_CONNECTIONS.
+    expected_digest : str, optional
+        The BLAKE2b hex digest the blob is expected to have. If not given,
+        the digest stored in the blob's metadata on upload is used, if any.
+    verify : bool, default True
+        If set to True, the BLAKE2b digest of the blob is compared to the
+        expected one, raising ModelIntegrityError on a mismatch.
+
+    Returns
+    -------
+    memoryview
+        A view over the downloaded contents of the blob.
+    """
+    chunk_size = chunk_size or DEFAULT_BLOCK_SIZE
+    blob_name = _blob_name(
+        model_name=model_name,
+        file_name=file_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    layout = _blob_layout(blob_name)
+    if not verify:
+        expected_digest = None
+    elif expected_digest is None:
+        expected_digest = layout.digest
+    size = layout.size
+    # anonymous maps cannot be empty
+    buffer = memoryview(mmap.mmap(-1, max(size, 1)))[:size]
+    digest = hashlib.blake2b()
+
+    def _download_chunk(chunk):
+        name, start, end, etag, offset = chunk
+        buffer[offset:offset + end - start] = _get_blob_range(
+            name, start, end, etag=etag)
+        return offset, offset + end - start
+    with ThreadPoolExecutor(
+            max_workers=max_connections or DEFAULT_MAX_CONNECTIONS
+    ) as executor:
+        # map yields in order, so chunks are hashed as soon as all chunks
+        # preceding them have arrived
+        for start, end in executor.map(
+                _download_chunk,
+                _segment_chunks(layout.segments, chunk_size)):
+            digest.update(buffer[start:end])
+    if expected_digest is not None and digest.hexdigest() != expected_digest:
+        raise ModelIntegrityError(
+            "Blob {} has BLAKE2b digest {}, expected {}.".format(
+                blob_name, digest.hexdigest(), expected_digest))
+    return buffer
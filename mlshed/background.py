@@ -0,0 +1,117 @@
+"""Background loading of model instances.
+
+Loads submitted through Model.load_async run on a single, shared and
+bounded thread pool, whose size is given by the 'max_workers' configuration
+key (or the MLSHED_MAX_WORKERS environment variable). Every submitted load
+is tracked by name, so that readiness probes can report which models are
+still loading.
+"""
+
+import threading
+import collections
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    wait,
+)
+
+from .cfg import SHED_CFG
+
+
+DEFAULT_MAX_WORKERS = 8
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+_LOCK = threading.Lock()
+_EXECUTOR = None
+_LOADS = collections.OrderedDict()
+
+
+def shared_executor():
+    """Returns the thread pool executor shared by all background loads."""
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=int(
+                    SHED_CFG.get('max_workers', DEFAULT_MAX_WORKERS)),
+                thread_name_prefix='mlshed',
+            )
+        return _EXECUTOR
+
+
+def submit(name, func, *args, **kwargs):
+    """Runs func in the shared executor, tracking it under the given name.
+
+    Parameters
+    ----------
+    name : str
+        The name to track the call under. A later submission with the same
+        name replaces the earlier one in status reports.
+    func : callable
+        The callable to run.
+    *args, **kwargs
+        Arguments func is called with.
+
+    Returns
+    -------
+    concurrent.futures.Future
+        A future for the result of the call.
+    """
+    future = shared_executor().submit(func, *args, **kwargs)
+    with _LOCK:
+        _LOADS.pop(name, None)
+        _LOADS[name] = future
+    return future
+
+
+def _status(future):
+    if not future.done():
+        return LOADING
+    if future.cancelled() or future.exception() is not None:
+        return FAILED
+    return READY
+
+
+def status():
+    """Returns the status of all background loads.
+
+    Returns
+    -------
+    dict
+        Maps the name of each submitted load to its status: 'loading',
+        'ready' or 'failed', in order of submission.
+    """
+    with _LOCK:
+        loads = list(_LOADS.items())
+    return collections.OrderedDict(
+        (name, _status(future)) for name, future in loads)
+
+
+def loading():
+    """Returns the names of background loads that are not done yet."""
+    return [name for name, stat in status().items() if stat == LOADING]
+
+
+def all_ready():
+    """Returns True if all background loads completed successfully."""
+    return all(stat == READY for stat in status().values())
+
+
+def wait_all(timeout=None):
+    """Blocks until all background loads submitted so far are done.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        The maximum number of seconds to wait.
+
+    Returns
+    -------
+    bool
+        True if all loads are done, False if the timeout expired first.
+    """
+    with _LOCK:
+        futures = list(_LOADS.values())
+    _, not_done = wait(futures, timeout=timeout)
+    return not not_done
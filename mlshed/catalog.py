@@ -0,0 +1,163 @@
+"""A catalog of hashes of model instance files in local store.
+
+Files are hashed as they stream through uploads and downloads, and their
+hashes recorded in the catalog, so that verifying a local instance never
+requires an extra pass just to hash it. Each record also holds the size and
+modification time the file had when hashed, and is ignored once the file
+no longer matches them.
+"""
+
+import os
+import json
+import hashlib
+
+from .cfg import (
+    cache_dirpath,
+    _partial_fpath,
+)
+
+
+HASH_ALGORITHM = 'blake2b'
+READ_SIZE = 8 * 2 ** 20  # 8MB
+
+
+def _record_fpath(fpath):
+    key = hashlib.sha1(os.path.abspath(fpath).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dirpath('catalog'), '{}.json'.format(key))
+
+
+def _stat_key(fpath):
+    stat = os.stat(fpath)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def record(fpath, digest):
+    """Records the BLAKE2b hex digest of a file in local store.
+
+    Parameters
+    ----------
+    fpath : str
+        The path of the hashed file.
+    digest : str
+        The BLAKE2b hex digest of the file's contents.
+    """
+    size, mtime_ns = _stat_key(fpath)
+    record_fpath = _record_fpath(fpath)
+    partial_fpath = _partial_fpath(record_fpath)
+    with open(partial_fpath, 'w') as cfile:
+        json.dump({
+            'fpath': os.path.abspath(fpath),
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'hash': '{}:{}'.format(HASH_ALGORITHM, digest),
+        }, cfile)
+    os.replace(partial_fpath, record_fpath)
+
+
+def recorded(fpath):
+    """Returns the record of a file in local store, even if it has changed.
+
+    Parameters
+    ----------
+    fpath : str
+        The path of the file.
+
+    Returns
+    -------
+    tuple or None
+        A (size, mtime_ns, digest) tuple, holding the size, modification
+        time and BLAKE2b hex digest the file had when recorded, or None if
+        the file was never recorded.
+    """
+    try:
+        with open(_record_fpath(fpath), 'r') as cfile:
+            entry = json.load(cfile)
+    except (OSError, ValueError):
+        return None
+    algorithm, _, digest = entry.get('hash', '').partition(':')
+    if entry.get('fpath') != os.path.abspath(fpath) or \
+            algorithm != HASH_ALGORITHM or not digest:
+        return None
+    return entry['size'], entry['mtime_ns'], digest
+
+
+def lookup(fpath):
+    """Returns the recorded BLAKE2b hex digest of a file in local store.
+
+    Parameters
+    ----------
+    fpath : str
+        The path of the file.
+
+    Returns
+    -------
+    str or None
+        The recorded digest, or None if the file was not recorded, or has
+        changed since it was.
+    """
+    entry = recorded(fpath)
+    try:
+        stat_key = _stat_key(fpath)
+    except OSError:
+        return None
+    if entry is None or entry[:2] != stat_key:
+        return None
+    return entry[2]
+
+
+def _fadvise(fd, offset, length, advice):
+    # posix_fadvise is unavailable on some platforms, e.g. Windows and macOS
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, offset, length, getattr(os, advice))
+
+
+def hash_file(fpath, read_size=None):
+    """Returns the BLAKE2b hex digest of a file.
+
+    The file is read sequentially in large chunks into a single reused
+    buffer. The OS is advised that the file is read sequentially, so it reads
+    ahead aggressively, and that hashed chunks are not needed again, so that
+    hashing a whole store does not evict other files from the page cache.
+
+    Parameters
+    ----------
+    fpath : str
+        The path of the file to hash.
+    read_size : int, optional
+        The size, in bytes, of each read. Defaults to READ_SIZE.
+
+    Returns
+    -------
+    str
+        The BLAKE2b hex digest of the file's contents.
+    """
+    digest = hashlib.blake2b()
+    buffer = memoryview(bytearray(read_size or READ_SIZE))
+    offset = 0
+    with open(fpath, 'rb', buffering=0) as bfile:
+        fd = bfile.fileno()
+        _fadvise(fd, 0, 0, 'POSIX_FADV_SEQUENTIAL')
+        while True:
+            nbytes = bfile.readinto(buffer)
+            if not nbytes:
+                break
+            digest.update(buffer[:nbytes])
+            _fadvise(fd, offset, nbytes, 'POSIX_FADV_DONTNEED')
+            offset += nbytes
+    return digest.hexdigest()
+
+
+def forget(fpath):
+    """Drops the record of a file in local store, if any.
+
+    If fpath is a directory, the records of all files under it are dropped.
+    """
+    if os.path.isdir(fpath):
+        for dirpath, _, fnames in os.walk(fpath):
+            for fname in fnames:
+                forget(os.path.join(dirpath, fname))
+        return
+    try:
+        os.remove(_record_fpath(fpath))
+    except FileNotFoundError:
+        pass
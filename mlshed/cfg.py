@@ -1,12 +1,24 @@
 """Barn configuration."""
 
 import os
+import re
+import shutil
+import hashlib
+import threading
 
 from birch import Birch
 
 
 SHED_CFG = Birch('mlshed')
 
+# instance files are kept directly in model directories
+LAYOUT_V1 = 1
+# instance files are fanned out into sub-directories of model directories,
+# named by the first FANOUT_PREFIX_LEN hex digits of the file name's SHA-1
+LAYOUT_V2 = 2
+FANOUT_PREFIX_LEN = 2
+_FANOUT_DNAME_PATTERN = re.compile('[0-9a-f]{{{}}}'.format(FANOUT_PREFIX_LEN))
+
 
 def _base_dir():
     dpath = SHED_CFG['base_dir']
@@ -15,6 +27,116 @@ def _base_dir():
     return dpath
 
 
+def cache_dirpath(*subdirs):
+    """Get the path of an mlshed cache directory.
+
+    Caches are kept in a hidden '.cache' directory under the mlshed base
+    directory, so they are never mistaken for model instances.
+
+    Parameters
+    ----------
+    *subdirs : str
+        Names of nested sub-directories of the cache directory.
+
+    Returns
+    -------
+    str
+        The path to the desired cache directory.
+    """
+    path = os.path.join(_base_dir(), '.cache', *subdirs)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _partial_fpath(fpath):
+    """A hidden temporary path next to fpath, for writing it atomically.
+
+    Files are written to the returned path and then moved to fpath with
+    os.replace, so that readers - including processes holding a memory map
+    of the previous file - never observe a partially written file.
+    """
+    dpath, fname = os.path.split(fpath)
+    return os.path.join(dpath, '.{}.{}.{}.part'.format(
+        fname, os.getpid(), threading.get_ident()))
+
+
+def _replace_dir(partial_dpath, dpath):
+    """Moves a fully written directory into place, replacing dpath.
+
+    Directories cannot be atomically replaced, so a previous directory at
+    dpath is first moved aside, and removed once the new one is in place.
+    """
+    previous_dpath = None
+    if os.path.isdir(dpath):
+        previous_dpath = _partial_fpath(dpath) + '.old'
+        os.replace(dpath, previous_dpath)
+    os.replace(partial_dpath, dpath)
+    if previous_dpath is not None:
+        shutil.rmtree(previous_dpath, ignore_errors=True)
+
+
+def local_layout():
+    """Returns the layout new files are written with in local store.
+
+    Set with the 'local_layout' configuration key; 1 (the default) for
+    LAYOUT_V1, or 2 for LAYOUT_V2. Files are read in either layout
+    regardless; see model_filepath. Existing files are moved between layouts
+    with mlshed.layout.migrate_layout.
+    """
+    layout = int(SHED_CFG.get('local_layout', LAYOUT_V1))
+    if layout not in (LAYOUT_V1, LAYOUT_V2):
+        raise ValueError("Unknown local layout {}.".format(layout))
+    return layout
+
+
+def fanout_dirname(filename):
+    """Returns the name of the LAYOUT_V2 sub-directory of a file name."""
+    return hashlib.sha1(
+        filename.encode('utf-8')).hexdigest()[:FANOUT_PREFIX_LEN]
+
+
+def is_fanout_dirname(dirname):
+    """Returns True if dirname can name a LAYOUT_V2 sub-directory."""
+    return _FANOUT_DNAME_PATTERN.fullmatch(dirname) is not None
+
+
+def layout_filepath(dirpath, filename, layout):
+    """Returns the path of a file in a model directory in the given layout."""
+    if layout == LAYOUT_V2:
+        return os.path.join(dirpath, fanout_dirname(filename), filename)
+    return os.path.join(dirpath, filename)
+
+
+def dir_filepaths(dirpath):
+    """Maps the names of all files in a model directory to their paths.
+
+    Files are looked up in both layouts. A file found in both is mapped to
+    its path in the current layout.
+
+    Parameters
+    ----------
+    dirpath : str
+        The path of the model directory.
+
+    Returns
+    -------
+    dict
+        Maps file names - including the names of directory instances - to
+        their paths.
+    """
+    flat, fanned = {}, {}
+    for entry in os.scandir(dirpath):
+        if entry.is_dir() and is_fanout_dirname(entry.name):
+            for sub_entry in os.scandir(entry.path):
+                if fanout_dirname(sub_entry.name) == entry.name:
+                    fanned[sub_entry.name] = sub_entry.path
+        else:
+            flat[entry.name] = entry.path
+    if local_layout() == LAYOUT_V2:
+        return dict(flat, **fanned)
+    return dict(fanned, **flat)
+
+
 def _snail_case(s):
     s = s.lower()
     return s.replace(' ', '_')
@@ -43,13 +165,19 @@ def resource_dirpath(task=None, **kwargs):
     str
         The path to the desired dir.
     """
+    path = _resource_dirpath(task=task, **kwargs)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _resource_dirpath(task=None, **kwargs):
+    """The path resource_dirpath returns, without creating the directory."""
     path = _base_dir()
     if task:
         path = os.path.join(path, _snail_case(task))
     for k, v in sorted(kwargs.items()):
         subdir_name = '{}_{}'.format(_snail_case(k), _snail_case(v))
         path = os.path.join(path, subdir_name)
-    os.makedirs(path, exist_ok=True)
     return path
 
 
@@ -115,8 +243,19 @@ def model_filepath(filename, model_name=None, task=None, **kwargs):
     Returns
     -------
     str
-        The path to the desired model file.
+        The path to the desired model file. This is its path in the current
+        local layout - see local_layout - unless the file exists only in the
+        other layout, in which case its existing path is returned, so files
+        are always found in either layout. The LAYOUT_V2 sub-directory of the
+        file is not created; writers of the file create it.
     """
     model_dir_path = model_dirpath(
         model_name=model_name, task=task, **kwargs)
-    return os.path.join(model_dir_path, filename)
+    layout = local_layout()
+    fpath = layout_filepath(model_dir_path, filename, layout)
+    if not os.path.lexists(fpath):
+        other_layout = LAYOUT_V1 if layout == LAYOUT_V2 else LAYOUT_V2
+        other_fpath = layout_filepath(model_dir_path, filename, other_layout)
+        if os.path.lexists(other_fpath):
+            return other_fpath
+    return fpath
@@ -0,0 +1,433 @@
+"""Command-line interface for mlshed."""
+
+import os
+import sys
+import shutil
+import argparse
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    as_completed,
+)
+
+from .cfg import _resource_dirpath
+from .model import Model
+from .exceptions import MissingLocalModelError
+
+
+DEFAULT_JOBS = 8
+
+
+def _parse_attributes(attributes):
+    model_attributes = {}
+    for attribute in attributes or []:
+        key, sep, value = attribute.partition('=')
+        if not sep or not key:
+            raise argparse.ArgumentTypeError(
+                "Model attributes must be given as key=value, "
+                "not {}".format(attribute))
+        model_attributes[key] = value
+    return model_attributes
+
+
+def _models(args):
+    attributes = _parse_attributes(args.attr)
+    return [
+        Model(
+            name=name,
+            task=args.task,
+            default_ext=args.ext,
+            singleton=args.singleton,
+            **attributes
+        )
+        for name in args.models
+    ]
+
+
+def _instances(args):
+    """Returns a (model, version, tags) tuple for every selected instance."""
+    return [
+        (model, version, args.tag)
+        for model in _models(args)
+        for version in args.version or [None]
+    ]
+
+
+def _describe(model, version, tags):
+    return model.fname(version=version, tags=tags)
+
+
+def _human_size(nbytes):
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if nbytes < 1024 or unit == 'TB':
+            break
+        nbytes /= 1024
+    return '{:.1f}{}'.format(nbytes, unit)
+
+
+def _run_parallel(func, items, jobs, describe):
+    """Runs func on all items in a thread pool, reporting progress.
+
+    If func returns a string, it is reported as the status of the item.
+
+    Returns
+    -------
+    int
+        The number of items for which func raised an exception.
+    """
+    failures = 0
+    total = len(items)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                status = future.result() or 'done'
+            except Exception as e:
+                failures += 1
+                status = 'failed ({}: {})'.format(type(e).__name__, e)
+            print('[{}/{}] {} {}'.format(
+                i, total, describe(futures[future]), status), file=sys.stderr)
+    return failures
+
+
+def _pull(args):
+    def _pull_instance(instance):
+        model, version, tags = instance
+        model.download(
+            overwrite=args.overwrite, version=version, tags=tags, ext=args.ext)
+    failures = _run_parallel(
+        func=_pull_instance,
+        items=_instances(args),
+        jobs=args.jobs,
+        describe=lambda instance: _describe(*instance),
+    )
+    return 1 if failures else 0
+
+
+def _push(args):
+    def _push_instance(instance):
+        model, version, tags = instance
+        model.upload(version=version, tags=tags, ext=args.ext)
+    failures = _run_parallel(
+        func=_push_instance,
+        items=_instances(args),
+        jobs=args.jobs,
+        describe=lambda instance: _describe(*instance),
+    )
+    return 1 if failures else 0
+
+
+def _selected_local_instances(args):
+    """Returns a (model, ModelInstance) tuple for each selected local file."""
+    selected = []
+    for model in _models(args):
+        for version in args.version or [None]:
+            for instance in model.local_instances(
+                    version=version, tags=args.tag, ext=args.ext):
+                selected.append((model, instance))
+    return selected
+
+
+def _walk_files(dpath):
+    fpaths = []
+    for dirpath, dirnames, fnames in os.walk(dpath):
+        # skip hidden directories and files, such as the listings cache and
+        # partially written files
+        dirnames[:] = [dname for dname in dirnames
+                       if not dname.startswith('.')]
+        fpaths.extend(os.path.join(dirpath, fname) for fname in fnames
+                      if not fname.startswith('.'))
+    return sorted(fpaths)
+
+
+def _instance_fpaths(fpath):
+    """Returns the paths of all files of a file or directory instance."""
+    if os.path.isdir(fpath):
+        return _walk_files(fpath)
+    return [fpath]
+
+
+def _selected_dirpath(args):
+    """Returns the existing local store directory selected by args."""
+    dpath = _resource_dirpath(task=args.task, **_parse_attributes(args.attr))
+    if not os.path.isdir(dpath):
+        raise MissingLocalModelError(
+            "No such directory in local store: {}".format(dpath))
+    return dpath
+
+
+def _local_fpaths(args):
+    if args.models:
+        return [fpath
+                for _, instance in _selected_local_instances(args)
+                for fpath in _instance_fpaths(instance.fpath)]
+    return _walk_files(_selected_dirpath(args))
+
+
+def _ls_remote(args):
+    if not args.models:
+        raise argparse.ArgumentTypeError(
+            "Listing model store requires at least one model name.")
+    for model in _models(args):
+        for version in args.version or [None]:
+            for instance in model.remote_instances(
+                    version=version, tags=args.tag, ext=args.ext,
+                    refresh=args.refresh):
+                print('{}\t{}\t{}'.format(
+                    _human_size(instance.size), instance.last_modified,
+                    instance.fname))
+    return 0
+
+
+def _ls(args):
+    if args.remote:
+        return _ls_remote(args)
+    for fpath in _local_fpaths(args):
+        print('{}\t{}'.format(
+            _human_size(os.path.getsize(fpath)), fpath))
+    return 0
+
+
+def _du(args):
+    total = sum(os.path.getsize(fpath) for fpath in _local_fpaths(args))
+    print('{}\ttotal'.format(_human_size(total)))
+    return 0
+
+
+def _prune(args):
+    by_model = {}
+    for model, instance in _selected_local_instances(args):
+        by_model.setdefault(model.name, []).append(instance)
+    for instances in by_model.values():
+        instances.sort(key=lambda i: os.path.getmtime(i.fpath), reverse=True)
+        for instance in instances[args.keep:]:
+            print('{}removing {}'.format(
+                '(dry run) ' if args.dry_run else '', instance.fpath))
+            if args.dry_run:
+                continue
+            if os.path.isdir(instance.fpath):
+                shutil.rmtree(instance.fpath)
+            else:
+                os.remove(instance.fpath)
+    return 0
+
+
+def _expected_checksum(model, fpath):
+    """Returns the expected (size, digest) of a local file, if known.
+
+    Checksums recorded in the local catalog are used if available. Otherwise,
+    if the file's model is known, the checksum stored in model store is used.
+    """
+    from .catalog import recorded
+    from .azure import model_blob_checksum
+    record = recorded(fpath)
+    if record is not None:
+        return record[0], record[2]
+    if model is None:
+        return None
+    return model_blob_checksum(
+        model_name=model.name,
+        file_name=os.path.basename(fpath),
+        task=model.task,
+        model_attributes=model.kwargs,
+    )
+
+
+def _verify(args):
+    from .catalog import hash_file
+    from .exceptions import ModelIntegrityError
+    if args.models:
+        # files of directory instances are verified one by one, but each
+        # instance is repaired at most once, by downloading all of it
+        selected = [(model, instance.fpath, _instance_fpaths(instance.fpath))
+                    for model, instance in _selected_local_instances(args)]
+    elif args.repair:
+        raise argparse.ArgumentTypeError(
+            "Repairing local store requires at least one model name.")
+    else:
+        selected = [(None, fpath, [fpath]) for fpath in _local_fpaths(args)]
+
+    def _check_file(model, fpath, instance_fpath):
+        """Returns a (problem, status) tuple; problem is None if ok."""
+        expected = _expected_checksum(
+            model if fpath == instance_fpath else None, fpath)
+        if expected is None:
+            return None, 'skipped (no recorded checksum)'
+        size, digest = expected
+        local_size = os.path.getsize(fpath)
+        if local_size < size:
+            return 'truncated ({} < {} bytes)'.format(local_size, size), None
+        if local_size > size:
+            return 'size mismatch ({} > {} bytes)'.format(
+                local_size, size), None
+        if digest is not None and hash_file(fpath) != digest:
+            return 'corrupted (hash mismatch)', None
+        return None, 'ok' if digest is not None else 'ok (size only)'
+
+    def _verify_instance(selected_instance):
+        model, instance_fpath, fpaths = selected_instance
+        problems, statuses = [], set()
+        for fpath in fpaths:
+            problem, status = _check_file(model, fpath, instance_fpath)
+            if problem is None:
+                statuses.add(status)
+            elif fpath == instance_fpath:
+                problems.append(problem)
+            else:
+                problems.append('{}: {}'.format(
+                    os.path.relpath(fpath, instance_fpath), problem))
+        if not problems:
+            return ', '.join(sorted(statuses)) or 'ok'
+        problem = '; '.join(problems)
+        if not args.repair:
+            raise ModelIntegrityError(problem)
+        version, tags, ext = model.parse_fname(
+            os.path.basename(instance_fpath))
+        model.download(overwrite=True, version=version, tags=tags, ext=ext)
+        return '{}, repaired'.format(problem)
+    failures = _run_parallel(
+        func=_verify_instance,
+        items=selected,
+        jobs=args.jobs,
+        describe=lambda selected_instance: selected_instance[1],
+    )
+    return 1 if failures else 0
+
+
+def _migrate_layout(args):
+    from .layout import migrate_layout
+    moves = migrate_layout(
+        layout=args.to,
+        dpath=_selected_dirpath(args),
+        dry_run=args.dry_run,
+    )
+    for src, dst in moves:
+        print('{}moving {} to {}'.format(
+            '(dry run) ' if args.dry_run else '', src, dst))
+    return 0
+
+
+def _build_parser():
+    selectors = argparse.ArgumentParser(add_help=False)
+    selectors.add_argument(
+        '--task', help="The task the selected models serve.")
+    selectors.add_argument(
+        '-a', '--attr', action='append', metavar='KEY=VALUE',
+        help="A model attribute, e.g. lang=en. Can be repeated.")
+    selectors.add_argument(
+        '-v', '--version', action='append',
+        help="A model instance version. Can be repeated.")
+    selectors.add_argument(
+        '-t', '--tag', action='append',
+        help="A model instance tag. Can be repeated.")
+    selectors.add_argument(
+        '--ext', help="The file extension of selected model instances.")
+    selectors.add_argument(
+        '--singleton', action='store_true',
+        help="Selected models are singletons, with no model sub-directory.")
+    parallel = argparse.ArgumentParser(add_help=False)
+    parallel.add_argument(
+        '-j', '--jobs', type=int, default=DEFAULT_JOBS,
+        help="The number of concurrent transfers. Defaults to {}.".format(
+            DEFAULT_JOBS))
+
+    parser = argparse.ArgumentParser(
+        prog='mlshed',
+        description='Simple local/remote machine learning model store.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    pull = subparsers.add_parser(
+        'pull', parents=[selectors, parallel],
+        help="Download model instances into the local store.")
+    pull.add_argument('models', nargs='+', metavar='MODEL')
+    pull.add_argument(
+        '--overwrite', action='store_true',
+        help="Download instances even if they exist in the local store.")
+    pull.set_defaults(func=_pull)
+
+    push = subparsers.add_parser(
+        'push', parents=[selectors, parallel],
+        help="Upload model instances from the local store.")
+    push.add_argument('models', nargs='+', metavar='MODEL')
+    push.set_defaults(func=_push)
+
+    ls = subparsers.add_parser(
+        'ls', parents=[selectors],
+        help="List model instances in the local store or model store.")
+    ls.add_argument('models', nargs='*', metavar='MODEL')
+    ls.add_argument(
+        '-r', '--remote', action='store_true',
+        help="List model instances in model store instead.")
+    ls.add_argument(
+        '--refresh', action='store_true',
+        help="Ignore cached listings of model store.")
+    ls.set_defaults(func=_ls)
+
+    du = subparsers.add_parser(
+        'du', parents=[selectors],
+        help="Report disk usage of model instances in the local store.")
+    du.add_argument('models', nargs='*', metavar='MODEL')
+    du.set_defaults(func=_du)
+
+    prune = subparsers.add_parser(
+        'prune', parents=[selectors],
+        help="Remove all but the most recent local model instances.")
+    prune.add_argument('models', nargs='+', metavar='MODEL')
+    prune.add_argument(
+        '--keep', type=int, default=1,
+        help="The number of most recent instances to keep per model.")
+    prune.add_argument(
+        '-n', '--dry-run', action='store_true',
+        help="Only print the instances that would be removed.")
+    prune.set_defaults(func=_prune)
+
+    verify = subparsers.add_parser(
+        'verify', parents=[selectors, parallel],
+        help="Verify local model instances against recorded checksums.")
+    verify.add_argument('models', nargs='*', metavar='MODEL')
+    verify.add_argument(
+        '--repair', action='store_true',
+        help="Download corrupted or truncated instances again.")
+    verify.set_defaults(func=_verify)
+
+    migrate = subparsers.add_parser(
+        'migrate-layout',
+        help="Move local model instances into another local layout.")
+    migrate.add_argument(
+        '--task', help="Only migrate instances of models of this task.")
+    migrate.add_argument(
+        '-a', '--attr', action='append', metavar='KEY=VALUE',
+        help="Only migrate instances of models with this attribute.")
+    migrate.add_argument(
+        '--to', type=int, choices=[1, 2], required=True,
+        help="The layout to migrate to; 2 fans instances out into "
+             "hash-prefixed sub-directories.")
+    migrate.add_argument(
+        '-n', '--dry-run', action='store_true',
+        help="Only print the instances that would be moved.")
+    migrate.set_defaults(func=_migrate_layout)
+    return parser
+
+
+def main(argv=None):
+    """Runs the mlshed command-line interface.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        The command-line arguments to parse. If not given, sys.argv is used.
+
+    Returns
+    -------
+    int
+        The exit code of the invoked command.
+    """
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    except MissingLocalModelError as e:
+        print(e, file=sys.stderr)
+        return 1
@@ -7,3 +7,23 @@ class MissingLocalModelError(Exception):
 
 class MissingRemoteModelError(Exception):
     pass
+
+
+class InvalidManifestError(Exception):
+    pass
+
+
+class ModelIndexConflictError(Exception):
+    pass
+
+
+class UnsupportedFormatError(Exception):
+    pass
+
+
+class ModelIntegrityError(Exception):
+    pass
+
+
+class ModelCopyError(Exception):
+    pass
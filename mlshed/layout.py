@@ -0,0 +1,123 @@
+"""Migration of local store between layouts.
+
+In LAYOUT_V1, instance files are kept directly in model directories. In
+LAYOUT_V2, they are fanned out into up to 256 sub-directories of model
+directories, named by the first hex digits of the SHA-1 of each file name,
+so that directories holding tens of thousands of instances remain fast to
+list and to look files up in. New files are written in the layout set by the
+'local_layout' configuration key, while existing files are found in either;
+see mlshed.cfg.local_layout.
+"""
+
+import os
+
+from . import catalog
+from .cfg import (
+    LAYOUT_V1,
+    LAYOUT_V2,
+    fanout_dirname,
+    is_fanout_dirname,
+    layout_filepath,
+    resource_dirpath,
+)
+from .model import DIRECTORY_EXT
+
+
+def _is_instance(entry):
+    return entry.is_file() or entry.name.endswith('.' + DIRECTORY_EXT)
+
+
+def _is_fanout_dir(entry):
+    """Returns True for a LAYOUT_V2 sub-directory of a model directory.
+
+    Task, model and attribute directories can be named like such
+    sub-directories - e.g. '10' or 'ab' - so only directories holding files
+    that all hash to their name are taken for them.
+    """
+    if not (entry.is_dir() and is_fanout_dirname(entry.name)):
+        return False
+    names = [
+        name for name in os.listdir(entry.path) if not name.startswith('.')]
+    return bool(names) and all(
+        fanout_dirname(name) == entry.name for name in names)
+
+
+def _collect_moves(dirpath, layout, moves):
+    for entry in sorted(os.scandir(dirpath), key=lambda e: e.name):
+        # skips caches, partially written files and bundle members
+        if entry.name.startswith('.'):
+            continue
+        if _is_fanout_dir(entry):
+            if layout == LAYOUT_V2:
+                continue
+            for sub_entry in sorted(
+                    os.scandir(entry.path), key=lambda e: e.name):
+                if not sub_entry.name.startswith('.'):
+                    moves.append((sub_entry.path, layout_filepath(
+                        dirpath, sub_entry.name, LAYOUT_V1)))
+        elif not _is_instance(entry):
+            # a model, task or attribute directory
+            _collect_moves(entry.path, layout, moves)
+        elif layout == LAYOUT_V2:
+            moves.append((entry.path, layout_filepath(
+                dirpath, entry.name, LAYOUT_V2)))
+
+
+def _move(src, dst):
+    """Moves a file or directory instance, along with its catalog records."""
+    if os.path.isdir(src):
+        fpath_pairs = [
+            (os.path.join(dpath, fname), os.path.join(
+                dst, os.path.relpath(os.path.join(dpath, fname), src)))
+            for dpath, _, fnames in os.walk(src)
+            for fname in fnames
+        ]
+    else:
+        fpath_pairs = [(src, dst)]
+    digests = [catalog.lookup(old_fpath) for old_fpath, _ in fpath_pairs]
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.rename(src, dst)
+    for (old_fpath, new_fpath), digest in zip(fpath_pairs, digests):
+        catalog.forget(old_fpath)
+        if digest is not None:
+            catalog.record(new_fpath, digest)
+
+
+def migrate_layout(layout, dpath=None, dry_run=False):
+    """Moves instances in local store into the given layout.
+
+    Each instance is moved with a single rename, and its records in the
+    local catalog are moved along with it, so no file is copied or hashed
+    again. Instances found in both layouts are left in place. Emptied
+    fan-out directories are removed.
+
+    Parameters
+    ----------
+    layout : int
+        The layout to migrate to; either LAYOUT_V1 or LAYOUT_V2.
+    dpath : str, optional
+        The directory to migrate all instances under; e.g. the directory of
+        a task. Defaults to the mlshed base directory.
+    dry_run : bool, default False
+        If set to True, no instance is moved.
+
+    Returns
+    -------
+    list of tuple
+        A (source, destination) path tuple for each moved instance.
+    """
+    if layout not in (LAYOUT_V1, LAYOUT_V2):
+        raise ValueError("Unknown local layout {}.".format(layout))
+    moves = []
+    _collect_moves(dpath or resource_dirpath(), layout, moves)
+    moves = [(src, dst) for src, dst in moves if not os.path.lexists(dst)]
+    if dry_run:
+        return moves
+    for src, dst in moves:
+        _move(src, dst)
+        if layout == LAYOUT_V1:
+            try:
+                os.rmdir(os.path.dirname(src))
+            except OSError:  # not empty yet
+                pass
+    return moves
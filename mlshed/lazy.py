@@ -0,0 +1,134 @@
+"""Lazy proxies deferring model loading until first use."""
+
+import operator
+import threading
+
+
+class LazyModel(object):
+    """A transparent proxy for a model object loaded on first use.
+
+    The first attribute access, call or operator use of the proxy - be it
+    an arithmetic, comparison or container operator, or a builtin such as
+    len or bool - loads the model object, and is then delegated to it, as
+    are all later ones.
+    Loading is thread-safe and happens exactly once; if it fails, the error
+    is raised to the caller and loading is retried on the next use.
+
+    Parameters
+    ----------
+    loader : callable
+        A callable taking no arguments and returning the model object.
+    description : str, optional
+        A description of the model object, used in the proxy's repr before
+        the object is loaded.
+    """
+
+    __slots__ = ('_loader', '_description', '_lock', '_obj', '_loaded',
+                 '__weakref__')
+
+    def __init__(self, loader, description=None):
+        object.__setattr__(self, '_loader', loader)
+        object.__setattr__(self, '_description', description)
+        object.__setattr__(self, '_lock', threading.Lock())
+        object.__setattr__(self, '_obj', None)
+        object.__setattr__(self, '_loaded', False)
+
+    def _resolve(self):
+        if object.__getattribute__(self, '_loaded'):
+            return object.__getattribute__(self, '_obj')
+        with object.__getattribute__(self, '_lock'):
+            if not object.__getattribute__(self, '_loaded'):
+                obj = object.__getattribute__(self, '_loader')()
+                object.__setattr__(self, '_obj', obj)
+                object.__setattr__(self, '_loaded', True)
+                # release whatever the loader holds on to
+                object.__setattr__(self, '_loader', None)
+        return object.__getattribute__(self, '_obj')
+
+    def __getattr__(self, name):
+        return getattr(LazyModel._resolve(self), name)
+
+    def __setattr__(self, name, value):
+        setattr(LazyModel._resolve(self), name, value)
+
+    def __delattr__(self, name):
+        delattr(LazyModel._resolve(self), name)
+
+    def __call__(self, *args, **kwargs):
+        return LazyModel._resolve(self)(*args, **kwargs)
+
+    def __repr__(self):
+        if object.__getattribute__(self, '_loaded'):
+            return repr(object.__getattribute__(self, '_obj'))
+        return '<LazyModel: {} (not loaded)>'.format(
+            object.__getattribute__(self, '_description') or 'model')
+
+    def __dir__(self):
+        return dir(LazyModel._resolve(self))
+
+
+def _delegate(method_name):
+    def _method(self, *args, **kwargs):
+        return getattr(LazyModel._resolve(self), method_name)(*args, **kwargs)
+    _method.__name__ = method_name
+    return _method
+
+
+def _delegate_function(method_name, func):
+    """Delegates a special method through the builtin using it, e.g. len.
+
+    Builtins fall back as Python does - e.g. bool on objects without
+    __bool__ - and so behave on the proxy as on its object.
+    """
+    def _method(self, *args):
+        return func(LazyModel._resolve(self), *args)
+    _method.__name__ = method_name
+    return _method
+
+
+def _delegate_reflected(method_name, func):
+    def _method(self, other):
+        return func(other, LazyModel._resolve(self))
+    _method.__name__ = method_name
+    return _method
+
+
+# special methods are looked up on the type, bypassing __getattr__
+for _method_name in [
+        '__str__', '__bytes__', '__format__', '__hash__',
+        '__getitem__', '__setitem__', '__delitem__',
+        '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__',
+        '__enter__', '__exit__', '__array__', '__round__']:
+    setattr(LazyModel, _method_name, _delegate(_method_name))
+for _method_name, _func in [
+        ('__bool__', bool), ('__len__', len), ('__iter__', iter),
+        ('__reversed__', reversed), ('__contains__', operator.contains),
+        ('__neg__', operator.neg), ('__pos__', operator.pos),
+        ('__abs__', operator.abs), ('__invert__', operator.invert),
+        ('__int__', int), ('__float__', float), ('__complex__', complex),
+        ('__index__', operator.index)]:
+    setattr(LazyModel, _method_name, _delegate_function(_method_name, _func))
+# binary operators are delegated through the operator module, so that the
+# reflected method of the other operand is still tried when needed
+for _name, _func in [
+        ('add', operator.add), ('sub', operator.sub), ('mul', operator.mul),
+        ('matmul', operator.matmul), ('truediv', operator.truediv),
+        ('floordiv', operator.floordiv), ('mod', operator.mod),
+        ('divmod', divmod), ('pow', operator.pow),
+        ('lshift', operator.lshift), ('rshift', operator.rshift),
+        ('and', operator.and_), ('xor', operator.xor), ('or', operator.or_)]:
+    setattr(LazyModel, '__{}__'.format(_name),
+            _delegate_function('__{}__'.format(_name), _func))
+    setattr(LazyModel, '__r{}__'.format(_name),
+            _delegate_reflected('__r{}__'.format(_name), _func))
+del _method_name, _name, _func
+
+
+def is_loaded(proxy):
+    """Returns True if the given LazyModel proxy has loaded its object."""
+    return object.__getattribute__(proxy, '_loaded')
+
+
+def resolve(proxy):
+    """Loads, if needed, and returns the object behind a LazyModel proxy."""
+    return LazyModel._resolve(proxy)
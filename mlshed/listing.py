@@ -0,0 +1,127 @@
+"""Cached listings of model instances in remote model store.
+
+Listings are cached both in memory and on disk, under the local store, for
+a configurable time-to-live given in seconds by the 'listing_ttl'
+configuration key (or the MLSHED_LISTING_TTL environment variable).
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from .cfg import (
+    SHED_CFG,
+    cache_dirpath,
+    _partial_fpath,
+)
+from .azure import (
+    _blob_prefix,
+    list_model_blobs,
+)
+
+
+DEFAULT_LISTING_TTL = 300  # in seconds
+
+_MEMORY_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def _listing_ttl():
+    return float(SHED_CFG.get('listing_ttl', DEFAULT_LISTING_TTL))
+
+
+def _cache_fpath(prefix):
+    digest = hashlib.sha1(prefix.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dirpath('listings'), '{}.json'.format(digest))
+
+
+def _read_disk_cache(prefix):
+    try:
+        with open(_cache_fpath(prefix), 'r') as cfile:
+            listing = json.load(cfile)
+    except (OSError, ValueError):
+        return None
+    if listing.get('prefix') != prefix:
+        return None
+    return listing
+
+
+def _write_disk_cache(prefix, listing):
+    fpath = _cache_fpath(prefix)
+    partial_fpath = _partial_fpath(fpath)
+    with open(partial_fpath, 'w') as cfile:
+        json.dump(listing, cfile)
+    os.replace(partial_fpath, fpath)
+
+
+def list_remote(model_name, task=None, model_attributes=None, ttl=None,
+                refresh=False):
+    """Lists all instances of the given model in model store.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+    task : str, optional
+        The task for which the given model is used for.
+    model_attributes : dict, optional
+        Additional attributes of the model.
+    ttl : float, optional
+        The maximum age, in seconds, of a cached listing to use. If not given,
+        the configured listing time-to-live is used.
+    refresh : bool, default False
+        If set to True, cached listings are ignored and replaced.
+
+    Returns
+    -------
+    list of dict
+        A dict for each blob of the model, as returned by
+        mlshed.azure.list_model_blobs.
+    """
+    if ttl is None:
+        ttl = _listing_ttl()
+    prefix = _blob_prefix(
+        model_name=model_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    now = time.time()
+    if not refresh:
+        with _LOCK:
+            listing = _MEMORY_CACHE.get(prefix)
+        if listing is None:
+            listing = _read_disk_cache(prefix)
+        if listing is not None and now - listing['fetched_at'] < ttl:
+            with _LOCK:
+                _MEMORY_CACHE[prefix] = listing
+            return listing['blobs']
+    listing = {
+        'prefix': prefix,
+        'fetched_at': now,
+        'blobs': list_model_blobs(
+            model_name=model_name,
+            task=task,
+            model_attributes=model_attributes,
+        ),
+    }
+    with _LOCK:
+        _MEMORY_CACHE[prefix] = listing
+    _write_disk_cache(prefix, listing)
+    return listing['blobs']
+
+
+def invalidate(model_name, task=None, model_attributes=None):
+    """Drops any cached listing of the given model."""
+    prefix = _blob_prefix(
+        model_name=model_name,
+        task=task,
+        model_attributes=model_attributes,
+    )
+    with _LOCK:
+        _MEMORY_CACHE.pop(prefix, None)
+    try:
+        os.remove(_cache_fpath(prefix))
+    except FileNotFoundError:
+        pass
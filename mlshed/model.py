@@ -1,21 +1,68 @@
 """Model objects."""
 
 import os
-# import re
+import re
+import errno
 import shutil
+import hashlib
+import datetime
+import collections
 
+from .catalog import forget
 from .cfg import (
     _snail_case,
-    # model_dirpath,
+    _replace_dir,
+    _partial_fpath,
+    dir_filepaths,
+    model_dirpath,
     model_filepath,
 )
 from .exceptions import (
     MissingLocalModelError,
+    MissingRemoteModelError,
+    ModelIntegrityError,
+    UnsupportedFormatError,
 )
-from .azure import (
-    upload_model,
-    download_model,
-)
+
+
+ModelInstance = collections.namedtuple(
+    'ModelInstance', ['version', 'tags', 'ext', 'fpath'])
+RemoteModelInstance = collections.namedtuple(
+    'RemoteModelInstance',
+    ['version', 'tags', 'ext', 'fname', 'size', 'last_modified'])
+
+LATEST = 'latest'
+LOCAL = 'local'
+REMOTE = 'remote'
+AUTO = 'auto'
+DIRECTORY_EXT = 'dir'
+# the hidden sub-directory of a model directory holding alias symlinks
+ALIASES_DIRNAME = '.aliases'
+# errors raised by os.symlink where symlinks are unavailable, e.g. for
+# unprivileged Windows users or on file systems without symlinks
+_SYMLINK_UNSUPPORTED_ERRNOS = (errno.EPERM, errno.EOPNOTSUPP, errno.ENOSYS)
+
+
+def _version_key(version):
+    """A sort key ordering versions naturally; e.g. 'v2' < '10' < '10.1'."""
+    key = []
+    for part in re.split(r'(\d+)', version.lower().lstrip('v')):
+        if part.isdigit():
+            key.append((1, int(part), ''))
+        elif part:
+            key.append((0, 0, part))
+    return key
+
+
+def _instance_matches(parsed, version=None, tags=None, ext=None):
+    i_version, i_tags, i_ext = parsed
+    if version is not None and str(version) != i_version:
+        return False
+    if tags is not None and sorted(tags) != (i_tags or []):
+        return False
+    if ext is not None and ext != i_ext:
+        return False
+    return True
 
 
 class Model(object):
@@ -43,6 +90,8 @@ class Model(object):
     """
 
     EXT_PATTERN = r'\.([a-z]+)'
+    VERSION_PATTERN = r'v?\d[0-9a-z.\-]*'
+    ALIAS_PATTERN = r'[a-z0-9][a-z0-9_.\-]*'
 
     def __init__(self, name, task=None, default_ext=None, fname_base=None,
                  singleton=False, **kwargs):
@@ -123,13 +172,205 @@ class Model(object):
             **self.kwargs,
         )
 
+    def parse_fname(self, fname):
+        """Parses a filename of an instance of this model.
+
+        As both tags and versions are joined to the file name base with
+        underscores, the last underscore-separated segment is considered a
+        version only if it matches VERSION_PATTERN (e.g. '3', 'v17' or
+        '1.0.2'); all other segments are considered tags.
+
+        Parameters
+        ----------
+        fname : str
+            The file name to parse. E.g. 'dog_detect_prod_v3.pkl'.
+
+        Returns
+        -------
+        tuple or None
+            A (version, tags, ext) tuple, or None if the given file name
+            does not name an instance of this model.
+        """
+        base, dot, ext = fname.rpartition('.')
+        if not dot:
+            return None
+        if base != self.fname_base and not base.startswith(
+                self.fname_base + '_'):
+            return None
+        segments = [seg for seg in base[len(self.fname_base):].split('_')
+                    if seg]
+        version = None
+        if segments and re.fullmatch(
+                self.VERSION_PATTERN, segments[-1], flags=re.IGNORECASE):
+            version = segments.pop()
+        return version, sorted(segments) or None, ext
+
+    def dirpath(self):
+        """Returns the path of the local directory of this model.
+
+        Returns
+        -------
+        str
+            The path of the local directory holding instances of this model.
+        """
+        if self.singleton:
+            return model_dirpath(task=self.task, **self.kwargs)
+        return model_dirpath(
+            model_name=self.name, task=self.task, **self.kwargs)
+
+    def local_instances(self, version=None, tags=None, ext=None):
+        """Lists instances of this model found in the local store.
+
+        Parameters
+        ----------
+        version: str, optional
+            If given, only instances of this version are listed.
+        tags : list of str, optional
+            If given, only instances with exactly these tags are listed.
+        ext : str, optional
+            If given, only instances with this file extension are listed.
+
+        Returns
+        -------
+        list of ModelInstance
+            ModelInstance namedtuples with version, tags, ext and fpath
+            fields, sorted by file name.
+        """
+        fpaths = dir_filepaths(self.dirpath())
+        instances = []
+        for fname, fpath in sorted(fpaths.items()):
+            parsed = self.parse_fname(fname)
+            if parsed is None or not os.path.exists(fpath):
+                continue
+            if _instance_matches(parsed, version=version, tags=tags, ext=ext):
+                instances.append(ModelInstance(*parsed, fpath))
+        return instances
+
+    def remote_instances(self, version=None, tags=None, ext=None,
+                         refresh=False):
+        """Lists instances of this model found in remote model store.
+
+        Listings are cached locally for a configurable time-to-live; see
+        mlshed.listing for details.
+
+        Parameters
+        ----------
+        version: str, optional
+            If given, only instances of this version are listed.
+        tags : list of str, optional
+            If given, only instances with exactly these tags are listed.
+        ext : str, optional
+            If given, only instances with this file extension are listed.
+        refresh : bool, default False
+            If set to True, any cached listing is ignored and replaced.
+
+        Returns
+        -------
+        list of RemoteModelInstance
+            RemoteModelInstance namedtuples with version, tags, ext, fname,
+            size and last_modified fields, sorted by file name.
+        """
+        from .listing import list_remote
+        blobs = list_remote(
+            model_name=self.name,
+            task=self.task,
+            model_attributes=self.kwargs,
+            refresh=refresh,
+        )
+        instances = []
+        for blob in sorted(blobs, key=lambda blob: blob['name']):
+            parsed = self.parse_fname(blob['name'])
+            if parsed is None:
+                continue
+            if _instance_matches(parsed, version=version, tags=tags, ext=ext):
+                instances.append(RemoteModelInstance(
+                    *parsed, blob['name'], blob['size'],
+                    blob['last_modified']))
+        return instances
+
+    def latest_version(self, tags=None, ext=None, refresh=False,
+                       include_unindexed=False):
+        """Returns the latest version of this model in remote model store.
+
+        Versions are ordered naturally, so that 'v2' < 'v10'. If the model
+        has an index blob, the latest version is resolved with a single read
+        of the index; otherwise, a (cached) listing of model store is used.
+        Instances uploaded without indexing - see upload - are thus only
+        considered for models without an index, unless include_unindexed is
+        set.
+
+        Parameters
+        ----------
+        tags : list of str, optional
+            Only versions of instances with exactly these tags are considered.
+            If not given, only untagged instances are considered.
+        ext : str, optional
+            Only versions of instances with this file extension are
+            considered. If not given, the default extension is used.
+        refresh : bool, default False
+            If set to True, any cached listing is ignored and replaced.
+        include_unindexed : bool, default False
+            If set to True, versions found in a (cached) listing of model
+            store are merged with those in the index, at the cost of a
+            listing of all instances of this model.
+
+        Returns
+        -------
+        str
+            The latest version.
+        """
+        tags = tags or []
+        ext = ext or self.default_ext
+        versions = set()
+        index = self.remote_index()
+        if index is not None:
+            versions.update(
+                entry['version'] for entry in index['instances'].values()
+                if entry['version'] is not None and _instance_matches(
+                    (entry['version'], entry['tags'], entry['ext']),
+                    tags=tags, ext=ext))
+        if index is None or include_unindexed:
+            versions.update(
+                instance.version
+                for instance in self.remote_instances(
+                    tags=tags, ext=ext, refresh=refresh)
+                if instance.version is not None)
+        if not versions:
+            raise MissingRemoteModelError(
+                "No versioned instance of model {} with tags={} in model "
+                "store!".format(self.name, tags))
+        return max(versions, key=_version_key)
+
+    def remote_index(self):
+        """Reads the index of this model from remote model store.
+
+        The index is maintained by upload, and maps the file name of each
+        uploaded instance to its version, tags, ext, size, hash and
+        uploaded_at properties.
+
+        Returns
+        -------
+        dict or None
+            The index of this model, with an 'instances' key, or None if no
+            instance of this model was uploaded with indexing.
+        """
+        from .azure import read_model_index
+        index, _ = read_model_index(
+            model_name=self.name,
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+        return index
+
     def add_local(self, source_fpath, version=None, tags=None):
         """Copies a given file into local store as an instance of this model.
 
         Parameters
         ----------
         source_fpath : str
-            The full path for the source file to use.
+            The full path for the source file to use. If it is a directory,
+            the whole directory is copied as a single instance, with the
+            'dir' extension.
         version: str, optional
             The version of the instance of this model.
         tags : list of str, optional
@@ -140,10 +381,26 @@ class Model(object):
         ext : str
             The extension of the added file.
         """
+        if os.path.isdir(source_fpath):
+            ext = DIRECTORY_EXT
+            dpath = self.fpath(version=version, tags=tags, ext=ext)
+            partial_dpath = _partial_fpath(dpath)
+            try:
+                shutil.copytree(src=source_fpath, dst=partial_dpath)
+                forget(dpath)
+                _replace_dir(partial_dpath, dpath)
+            finally:
+                if os.path.isdir(partial_dpath):
+                    shutil.rmtree(partial_dpath, ignore_errors=True)
+            return ext
         ext = os.path.splitext(source_fpath)[1]
         ext = ext[1:]  # we dont need the dot
         fpath = self.fpath(version=version, tags=tags, ext=ext)
-        shutil.copyfile(src=source_fpath, dst=fpath)
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        partial_fpath = _partial_fpath(fpath)
+        shutil.copyfile(src=source_fpath, dst=partial_fpath)
+        os.replace(partial_fpath, fpath)
+        forget(fpath)
         return ext
 
     # to add normal extension discovery on azure:
@@ -173,7 +430,7 @@ class Model(object):
     #     return None
 
     def upload(self, version=None, tags=None, ext=None, source_fpath=None,
-               **kwargs):
+               update_index=True, **kwargs):
         """Uploads the given instance of this model to model store.
 
         Parameters
@@ -188,15 +445,26 @@ class Model(object):
         source_fpath : str, optional
             The full path for the source file to use. If given, the file is
             copied from the given path to the local storage path before
-            uploading.
+            uploading. Can be a directory; see add_local.
+        update_index : bool, default True
+            If set to True, the uploaded instance is added to the index blob
+            of this model, enabling fast resolution of latest versions. Once
+            a model has an index, instances uploaded without indexing are
+            not considered by latest_version; see its include_unindexed
+            parameter.
         **kwargs : extra keyword arguments
             Extra keyword arguments are forwarded to
-            azure.storage.blob.BlockBlobService.create_blob_from_path.
+            mlshed.azure.upload_model; e.g. shard_size, above which instances
+            are uploaded as shards.
         """
         if source_fpath:
             ext = self.add_local(
                 source_fpath=source_fpath, version=version, tags=tags)
         fpath = self.fpath(version=version, tags=tags, ext=ext)
+        if os.path.isdir(fpath):
+            return self._upload_dir(
+                dpath=fpath, version=version, tags=tags, ext=ext,
+                update_index=update_index, **kwargs)
         if not os.path.isfile(fpath):
             attribs = "{}{}ext={}".format(
                 "version={} and ".format(version) if version else "",
@@ -206,16 +474,444 @@ class Model(object):
             raise MissingLocalModelError(
                 "No model with {} in local store! (path={})".format(
                     attribs, fpath))
-        upload_model(
+        # the azure SDK is slow to import, so remote backends are only
+        # imported once a remote operation actually takes place
+        from .azure import upload_model_with_digest
+        from .serialization import (
+            BundleFormat,
+            SerializationFormat,
+        )
+        try:
+            fmt = SerializationFormat.by_name(ext or self.default_ext)
+        except UnsupportedFormatError:
+            fmt = None
+        if isinstance(fmt, BundleFormat):
+            # members of bundles are fetched with range reads of their blob,
+            # so bundles are never sharded
+            kwargs.setdefault('shard_size', 0)
+        # hashed while uploading
+        _, digest = upload_model_with_digest(
             model_name=self.name,
             file_path=fpath,
             task=self.task,
             model_attributes=self.kwargs,
             **kwargs,
         )
+        self._uploaded(
+            fname=os.path.basename(fpath),
+            version=version,
+            tags=tags,
+            ext=ext,
+            size=os.path.getsize(fpath),
+            digest=digest,
+            update_index=update_index,
+        )
+
+    def _upload_dir(self, dpath, version, tags, ext, update_index,
+                    **kwargs):
+        from .azure import upload_model_dir
+        size, digest = upload_model_dir(
+            model_name=self.name,
+            dir_path=dpath,
+            task=self.task,
+            model_attributes=self.kwargs,
+            **kwargs,
+        )
+        self._uploaded(
+            fname=os.path.basename(dpath),
+            version=version,
+            tags=tags,
+            ext=ext,
+            size=size,
+            digest=digest,
+            update_index=update_index,
+        )
+
+    def _uploaded(self, fname, version, tags, ext, size, digest,
+                  update_index):
+        """Updates the index blob and listing cache after an upload.
+
+        The digest may be None - e.g. for copies of blobs uploaded without
+        one - in which case the instance is indexed without a hash.
+        """
+        from .azure import upload_model_index_entry
+        from .listing import invalidate
+        if update_index:
+            upload_model_index_entry(
+                model_name=self.name,
+                file_name=fname,
+                entry={
+                    'version': None if version is None else str(version),
+                    'tags': sorted(tags) if tags else None,
+                    'ext': ext or self.default_ext,
+                    'size': size,
+                    'hash': None if digest is None
+                    else 'blake2b:{}'.format(digest),
+                    'uploaded_at': datetime.datetime.now(
+                        datetime.timezone.utc).isoformat(),
+                },
+                task=self.task,
+                model_attributes=self.kwargs,
+            )
+        invalidate(
+            model_name=self.name,
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+
+    def _copy_instance(self, model, version, tags, ext, target_version,
+                       target_tags, update_index, **kwargs):
+        from .azure import (
+            copy_model_dir,
+            copy_model_blob,
+        )
+        ext = ext or self.default_ext
+        if version == LATEST:
+            version = self.latest_version(tags=tags, ext=ext)
+            if target_version == LATEST:
+                target_version = version
+        copy = copy_model_dir if ext == DIRECTORY_EXT else copy_model_blob
+        target_fname = model.fname(
+            version=target_version, tags=target_tags, ext=ext)
+        size, digest = copy(
+            model_name=self.name,
+            file_name=self.fname(version=version, tags=tags, ext=ext),
+            target_model_name=model.name,
+            target_file_name=target_fname,
+            task=self.task,
+            model_attributes=self.kwargs,
+            target_task=model.task,
+            target_model_attributes=model.kwargs,
+            **kwargs,
+        )
+        model._uploaded(
+            fname=target_fname,
+            version=target_version,
+            tags=target_tags,
+            ext=ext,
+            size=size,
+            digest=digest,
+            update_index=update_index,
+        )
+        return target_fname
+
+    def copy_to(self, model, version=None, tags=None, ext=None,
+                update_index=True, **kwargs):
+        """Copies an instance of this model to another model, server-side.
+
+        The blob service copies the instance's blob on its own, so no content
+        is transferred through this machine, regardless of instance size. The
+        copy keeps the version, tags and extension of the copied instance, and
+        is added to the index blob of the target model.
+
+        Parameters
+        ----------
+        model : mlshed.Model
+            The model to copy the instance to; e.g. this model under another
+            task, or with other attributes.
+        version: str, optional
+            The version of the instance to copy. Can be 'latest'.
+        tags : list of str, optional
+            The tags associated with the instance to copy.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        update_index : bool, default True
+            If set to True, the copy is added to the index blob of the target
+            model.
+        **kwargs : extra keyword arguments
+            Extra keyword arguments are forwarded to
+            mlshed.azure.copy_model_blob; e.g. timeout.
+
+        Returns
+        -------
+        str
+            The file name of the copy.
+        """
+        return self._copy_instance(
+            model=model, version=version, tags=tags, ext=ext,
+            target_version=version, target_tags=tags,
+            update_index=update_index, **kwargs)
+
+    def promote(self, target_tags, version=None, tags=None, ext=None,
+                keep_version=False, update_index=True, **kwargs):
+        """Copies an instance of this model to a retagged one, server-side.
+
+        For example, model.promote(['prod'], version='v17') copies the blob of
+        instance 'v17' to that of the instance tagged 'prod', without
+        transferring it through this machine; see copy_to.
+
+        Parameters
+        ----------
+        target_tags : list of str
+            The tags of the promoted instance.
+        version: str, optional
+            The version of the instance to promote. Can be 'latest'.
+        tags : list of str, optional
+            The tags associated with the instance to promote.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        keep_version : bool, default False
+            If set to True, the promoted instance keeps the version of the
+            instance it was copied from. Otherwise, it has no version.
+        update_index : bool, default True
+            If set to True, the promoted instance is added to the index blob
+            of this model.
+        **kwargs : extra keyword arguments
+            Extra keyword arguments are forwarded to
+            mlshed.azure.copy_model_blob; e.g. timeout.
+
+        Returns
+        -------
+        str
+            The file name of the promoted instance.
+        """
+        return self._copy_instance(
+            model=self, version=version, tags=tags, ext=ext,
+            target_version=version if keep_version else None,
+            target_tags=target_tags, update_index=update_index, **kwargs)
+
+    def _alias_fpath(self, alias):
+        if not re.fullmatch(self.ALIAS_PATTERN, alias, flags=re.IGNORECASE):
+            raise ValueError("Invalid alias name {}.".format(alias))
+        # singleton models of a task share a directory, so links are kept
+        # per file name base
+        return os.path.join(
+            self.dirpath(), ALIASES_DIRNAME, self.fname_base, alias)
+
+    def _link_alias(self, alias, fpath):
+        """Points the local symlink of an alias at a file, atomically."""
+        link_fpath = self._alias_fpath(alias)
+        os.makedirs(os.path.dirname(link_fpath), exist_ok=True)
+        partial_fpath = _partial_fpath(link_fpath)
+        # left behind by an interrupted call
+        if os.path.lexists(partial_fpath):
+            os.remove(partial_fpath)
+        try:
+            os.symlink(os.path.relpath(
+                fpath, os.path.dirname(link_fpath)), partial_fpath)
+        except NotImplementedError:
+            self._unlink_alias(alias)
+            return
+        except OSError as e:
+            if e.errno not in _SYMLINK_UNSUPPORTED_ERRNOS:
+                raise
+            # aliases are then only resolved through model store
+            self._unlink_alias(alias)
+            return
+        os.replace(partial_fpath, link_fpath)
+
+    def _unlink_alias(self, alias):
+        """Removes the local symlink of an alias, if there is one."""
+        link_fpath = self._alias_fpath(alias)
+        if os.path.lexists(link_fpath):
+            os.remove(link_fpath)
+
+    def set_alias(self, alias, version=None, tags=None, ext=None):
+        """Points a named alias of this model at one of its instances.
+
+        The alias - e.g. 'prod', 'staging' or 'canary' - is stored as a tiny
+        pointer blob in model store, so pointing it at another instance is a
+        single atomic write rather than a copy of the instance. If the
+        instance is in local store, the alias is also pointed at it by a
+        local symlink; otherwise, any local symlink of the alias is removed,
+        so that it is not resolved locally to its previous instance.
+
+        Parameters
+        ----------
+        alias : str
+            The name of the alias.
+        version: str, optional
+            The version of the instance to point the alias at. Can be
+            'latest'.
+        tags : list of str, optional
+            The tags associated with the instance to point the alias at.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+
+        Returns
+        -------
+        dict
+            The pointer of the alias; see mlshed.azure.read_model_alias.
+        """
+        from .azure import (
+            model_blob_properties,
+            upload_model_alias,
+        )
+        self._alias_fpath(alias)
+        ext = ext or self.default_ext
+        if version == LATEST:
+            version = self.latest_version(tags=tags, ext=ext)
+        fname = self.fname(version=version, tags=tags, ext=ext)
+        # never point an alias at a missing instance
+        model_blob_properties(
+            model_name=self.name,
+            file_name=fname,
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+        pointer = {
+            'version': None if version is None else str(version),
+            'tags': sorted(tags) if tags else None,
+            'ext': ext,
+            'fname': fname,
+            'updated_at': datetime.datetime.now(
+                datetime.timezone.utc).isoformat(),
+        }
+        upload_model_alias(
+            model_name=self.name,
+            alias=alias,
+            pointer=pointer,
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+        fpath = self.fpath(version=version, tags=tags, ext=ext)
+        if os.path.exists(fpath):
+            self._link_alias(alias, fpath)
+        else:
+            self._unlink_alias(alias)
+        return pointer
+
+    def resolve_alias(self, alias, source=REMOTE):
+        """Returns the instance a named alias of this model points at.
+
+        Parameters
+        ----------
+        alias : str
+            The name of the alias; see set_alias.
+        source : str, default 'remote'
+            If 'remote', the alias is resolved through its pointer blob in
+            model store, with a single small request. If 'local', it is
+            resolved through its local symlink, which points at the instance
+            the alias pointed at when last set or downloaded through.
+
+        Returns
+        -------
+        tuple
+            A (version, tags, ext) tuple.
+        """
+        if source == LOCAL:
+            link_fpath = self._alias_fpath(alias)
+            try:
+                fname = os.path.basename(os.readlink(link_fpath))
+            except OSError:
+                raise MissingLocalModelError(
+                    "No alias {} of model {} in local store! "
+                    "(path={})".format(alias, self.name, link_fpath))
+            parsed = self.parse_fname(fname)
+            if parsed is None:
+                raise MissingLocalModelError(
+                    "Alias {} of model {} in local store points at {}, not "
+                    "at an instance of this model! (path={})".format(
+                        alias, self.name, fname, link_fpath))
+            version, tags, ext = parsed
+            return version, tags, ext
+        from .azure import read_model_alias
+        self._alias_fpath(alias)
+        pointer = read_model_alias(
+            model_name=self.name,
+            alias=alias,
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+        if pointer is None:
+            raise MissingRemoteModelError(
+                "No alias {} of model {} in model store!".format(
+                    alias, self.name))
+        return pointer['version'], pointer['tags'], pointer['ext']
+
+    def delete_alias(self, alias):
+        """Removes a named alias of this model, leaving its instance as is.
+
+        Parameters
+        ----------
+        alias : str
+            The name of the alias; see set_alias.
+        """
+        from .azure import upload_model_alias
+        upload_model_alias(
+            model_name=self.name,
+            alias=alias,
+            pointer=None,
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+        self._unlink_alias(alias)
+
+    def dump_and_upload(self, obj, version=None, tags=None, ext=None,
+                        write_through=False, update_index=True,
+                        block_size=None, max_connections=None, **kwargs):
+        """Serializes an instance of this model directly into model store.
+
+        Serialized bytes are uploaded in blocks as they are produced, so the
+        instance is never written to local disk unless write_through is set,
+        and memory use is bounded by block_size * (max_connections + 1).
+
+        Parameters
+        ----------
+        obj : object
+            The model object to dump and upload.
+        version: str, optional
+            The version of the given instance of this model.
+        tags : list of str, optional
+            The tags associated with the given instance of this model.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        write_through : bool, default False
+            If set to True, the instance is also written to local store.
+        update_index : bool, default True
+            If set to True, the uploaded instance is added to the index blob
+            of this model.
+        block_size : int, optional
+            The size, in bytes, of uploaded blocks. Defaults to
+            mlshed.azure.DEFAULT_BLOCK_SIZE.
+        max_connections : int, optional
+            The maximum number of blocks uploaded concurrently. Defaults to
+            mlshed.azure.DEFAULT_MAX_CONNECTIONS.
+        **kwargs : extra keyword arguments, optional
+            Extra keyword arguments are forwarded to the write method of the
+            SerializationFormat object corresponding to the extension used.
+
+        Returns
+        -------
+        int
+            The number of bytes uploaded.
+        """
+        from .azure import model_blob_writer
+        from .serialization import SerializationFormat
+        if ext is None:
+            ext = self.default_ext
+        fmt = SerializationFormat.by_name(ext)
+        fname = self.fname(version=version, tags=tags, ext=ext)
+        tee_path = None
+        if write_through:
+            tee_path = self.fpath(version=version, tags=tags, ext=ext)
+        with model_blob_writer(
+                model_name=self.name,
+                file_name=fname,
+                task=self.task,
+                model_attributes=self.kwargs,
+                tee_path=tee_path,
+                block_size=block_size,
+                max_connections=max_connections,
+        ) as writer:
+            fmt.write(obj, writer, **kwargs)
+        self._uploaded(
+            fname=fname,
+            version=version,
+            tags=tags,
+            ext=ext,
+            size=writer.tell(),
+            digest=writer.hexdigest(),
+            update_index=update_index,
+        )
+        return writer.tell()
 
     def download(self, overwrite=False, version=None, tags=None, ext=None,
-                 verbose=False, **kwargs):
+                 verbose=False, member=None, alias=None, **kwargs):
         """Downloads the given instance of this model from model store.
 
         Parameters
@@ -226,7 +922,8 @@ class Model(object):
             Otherwise, if a matching model is found localy, download is
             skipped.
         version: str, optional
-            The version of the instance of this model.
+            The version of the instance of this model. If 'latest', the
+            latest version found in model store is used.
         tags : list of str, optional
             The tags associated with the given instance of this model.
         ext : str, optional
@@ -234,17 +931,59 @@ class Model(object):
             used.
         verbose : bool, default False
             If set to True, informative messages are printed.
+        member : str, optional
+            Only for bundle instances. If given, only this member of the
+            bundle is downloaded, with range reads, and verified against its
+            hash in the bundle's index. A previously downloaded member is
+            downloaded again, regardless of overwrite, if the bundle's blob
+            has changed since.
+        alias : str, optional
+            If given, the instance this alias points at in model store is
+            downloaded - unless it is already in local store - and the local
+            symlink of the alias is pointed at it; see set_alias. The
+            version, tags and ext parameters are then ignored.
         **kwargs : extra keyword arguments
-            Extra keyword arguments are forwarded to
-            azure.storage.blob.BlockBlobService.get_blob_to_path.
+            Extra keyword arguments are forwarded to mlshed.azure.BlobReader,
+            or, for directory instances, to mlshed.azure.download_model_dir.
+
+        Returns
+        -------
+        str or None
+            If member is given, the local path of the downloaded member.
         """
+        if alias is not None:
+            version, tags, ext = self.resolve_alias(alias)
+        if version == LATEST:
+            version = self.latest_version(tags=tags, ext=ext)
+        if member is not None:
+            return self._download_member(
+                version=version, tags=tags, ext=ext, member=member,
+                overwrite=overwrite, **kwargs)
         fpath = self.fpath(version=version, tags=tags, ext=ext)
-        if os.path.isfile(fpath) and not overwrite:
+        if os.path.exists(fpath) and not overwrite:
             if verbose:
                 print(
                     "File exists and overwrite set to False, so not "
                     "downloading {} with version={} and tags={}".format(
                         self.name, version, tags))
+        else:
+            self._download_instance(fpath=fpath, ext=ext, **kwargs)
+        if alias is not None:
+            self._link_alias(alias, fpath)
+
+    def _download_instance(self, fpath, ext, **kwargs):
+        from .azure import (
+            download_model,
+            download_model_dir,
+        )
+        if (ext or self.default_ext) == DIRECTORY_EXT:
+            download_model_dir(
+                model_name=self.name,
+                dir_path=fpath,
+                task=self.task,
+                model_attributes=self.kwargs,
+                **kwargs,
+            )
             return
         download_model(
             model_name=self.name,
@@ -253,79 +992,456 @@ class Model(object):
             model_attributes=self.kwargs,
             **kwargs,
         )
-    #
-    # def load(self, tags=None, ext=None, **kwargs):
-    #     """Loads an instance of this model into a python object.
-    #
-    #     Parameters
-    #     ----------
-    #     tags : list of str, optional
-    #         The tags associated with the desired instance of this model.
-    #     ext : str, optional
-    #         The file extension to use. If not given, the default extension is
-    #         used.
-    #     **kwargs : extra keyword arguments, optional
-    #         Extra keyword arguments are forwarded to the deserialization
-    #         method of the SerializationFormat object corresponding to the
-    #         extension used.
-    #
-    #     Returns
-    #     -------
-    #     pandas.DataFrame
-    #         A dataframe containing the desired instance of this model.
-    #     """
-    #     ext = self._find_extension(tags=tags)
-    #     if ext is None:
-    #         if tags is None:
-    #             raise MissingLocalModelError(
-    #                 "No instance of {} model!".format(self.name))
-    #         raise MissingLocalModelError(
-    #             "No instance of model {} with tags: {}".format(
-    #                 self.name, tags))
-    #     fpath = self.fpath(tags=tags, ext=ext)
-    #     fmt = SerializationFormat.by_name(ext)
-    #     return fmt.deserialize(fpath, **kwargs)
-    #
-    # def dump_df(self, df, tags=None, ext=None, **kwargs):
-    #     """Dumps an instance of this model into a file.
-    #
-    #     Parameters
-    #     ----------
-    #     df : pandas.DataFrame
-    #         The dataframe to dump to file.
-    #     tags : list of str, optional
-    #         The tags associated with the given instance of this model.
-    #     ext : str, optional
-    #         The file extension to use. If not given, the default extension is
-    #         used.
-    #     **kwargs : extra keyword arguments, optional
-    #         Extra keyword arguments are forwarded to the serialization method
-    #         of the SerializationFormat object corresponding to the extension
-    #         used.
-    #     """
-    #     if ext is None:
-    #         ext = self.default_ext
-    #     fpath = self.fpath(tags=tags, ext=ext)
-    #     fmt = SerializationFormat.by_name(ext)
-    #     fmt.serialize(df, fpath, **kwargs)
-    #
-    # def upload_df(self, df, tags=None, ext=None, **kwargs):
-    #     """Dumps an instance of this model into a file and then uploads it
-    #     to model store.
-    #
-    #     Parameters
-    #     ----------
-    #     df : pandas.DataFrame
-    #         The dataframe to dump and upload.
-    #     tags : list of str, optional
-    #         The tags associated with the given instance of this model.
-    #     ext : str, optional
-    #         The file extension to use. If not given, the default extension is
-    #         used.
-    #     **kwargs : extra keyword arguments, optional
-    #         Extra keyword arguments are forwarded to the serialization method
-    #         of the SerializationFormat object corresponding to the extension
-    #         used.
-    #     """
-    #     self.dump_df(df=df, tags=tags, ext=ext, **kwargs)
-    #     self.upload(tags=tags, ext=ext)
+
+    def _member_fpath(self, version, tags, ext, member):
+        """Returns the local path of a single downloaded bundle member.
+
+        Member names are read from bundle indices in model store, so names
+        that could resolve outside of the directory of downloaded members -
+        absolute ones, and ones with empty, hidden or parent components -
+        are rejected with a ValueError.
+        """
+        parts = member.split('/')
+        if os.path.isabs(member) or os.path.splitdrive(member)[0] or \
+                '\\' in member or any(
+                    not part or part.startswith('.') for part in parts):
+            raise ValueError("Invalid bundle member name {}.".format(member))
+        return os.path.join(
+            self.dirpath(), '.members',
+            self.fname(version=version, tags=tags, ext=ext), *parts)
+
+    @staticmethod
+    def _member_etag_fpath(member_fpath):
+        """The path of the file holding the ETag of a member's bundle."""
+        dpath, fname = os.path.split(member_fpath)
+        return os.path.join(dpath, '.{}.etag'.format(fname))
+
+    def _member_is_current(self, member_fpath, etag):
+        """Returns True if a downloaded member came from a bundle's ETag."""
+        if not os.path.isfile(member_fpath):
+            return False
+        try:
+            with open(self._member_etag_fpath(member_fpath)) as efile:
+                return efile.read() == etag
+        except OSError:
+            return False
+
+    def _member_blob_properties(self, version, tags, ext):
+        from .azure import model_blob_properties
+        return model_blob_properties(
+            model_name=self.name,
+            file_name=self.fname(version=version, tags=tags, ext=ext),
+            task=self.task,
+            model_attributes=self.kwargs,
+        )
+
+    def _fetch_member(self, version, tags, ext, member, verify=True,
+                      properties=None):
+        """Fetches a member of a bundle instance from model store.
+
+        The index of the bundle is read off its end - usually with a single
+        range read - and the member is then read with another.
+        """
+        from .azure import read_model_blob_range
+        from .serialization import (
+            BundleFormat,
+            SerializationFormat,
+        )
+        fmt = SerializationFormat.by_name(ext or self.default_ext)
+        if not isinstance(fmt, BundleFormat):
+            raise UnsupportedFormatError(
+                "Only bundle instances have members, not {} ones.".format(
+                    fmt.name))
+        if properties is None:
+            properties = self._member_blob_properties(
+                version=version, tags=tags, ext=ext)
+        # condition all reads on the same ETag, so that a bundle replaced
+        # mid-way results in an error rather than in a wrong member
+        blob_kwargs = dict(
+            model_name=self.name,
+            file_name=self.fname(version=version, tags=tags, ext=ext),
+            task=self.task,
+            model_attributes=self.kwargs,
+            etag=properties.etag,
+        )
+        index = fmt.read_index(
+            lambda start, end: read_model_blob_range(
+                start=start, end=end, **blob_kwargs),
+            properties.content_length)
+        if member not in index:
+            raise KeyError("No member {} in bundle.".format(member))
+        entry = index[member]
+        content = read_model_blob_range(
+            start=entry['offset'], end=entry['offset'] + entry['size'],
+            **blob_kwargs)
+        algorithm, _, digest = entry['hash'].partition(':')
+        if verify and algorithm == 'blake2b' and \
+                hashlib.blake2b(content).hexdigest() != digest:
+            raise ModelIntegrityError(
+                "Member {} of {} has a wrong BLAKE2b digest.".format(
+                    member, blob_kwargs['file_name']))
+        return content
+
+    def _download_member(self, version, tags, ext, member, overwrite=False,
+                         verify=True):
+        """Downloads a member of a bundle instance into local store.
+
+        A previously downloaded member is kept only if the ETag of its
+        bundle's blob, stored next to it, is still current.
+        """
+        fpath = self._member_fpath(
+            version=version, tags=tags, ext=ext, member=member)
+        properties = self._member_blob_properties(
+            version=version, tags=tags, ext=ext)
+        if not overwrite and self._member_is_current(fpath, properties.etag):
+            return fpath
+        content = self._fetch_member(
+            version=version, tags=tags, ext=ext, member=member, verify=verify,
+            properties=properties)
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        etag_fpath = self._member_etag_fpath(fpath)
+        # a member being replaced never passes for a current one
+        if os.path.isfile(etag_fpath):
+            os.remove(etag_fpath)
+        for target_fpath, data in [
+                (fpath, content), (etag_fpath, properties.etag.encode())]:
+            partial_fpath = _partial_fpath(target_fpath)
+            with open(partial_fpath, 'wb') as mfile:
+                mfile.write(data)
+            os.replace(partial_fpath, target_fpath)
+        return fpath
+
+    def _load_member(self, fmt, version, tags, ext, member, mmap, source,
+                     persist, verify):
+        from .serialization import SerializationFormat
+        fpath = self.fpath(version=version, tags=tags, ext=ext)
+        if source != REMOTE and os.path.isfile(fpath):
+            return fmt.deserialize(fpath, mmap=mmap, members=[member])[member]
+        member_fpath = self._member_fpath(
+            version=version, tags=tags, ext=ext, member=member)
+        if source != LOCAL:
+            properties = self._member_blob_properties(
+                version=version, tags=tags, ext=ext)
+            if source == REMOTE or not self._member_is_current(
+                    member_fpath, properties.etag):
+                if not persist:
+                    return self._fetch_member(
+                        version=version, tags=tags, ext=ext, member=member,
+                        verify=verify, properties=properties)
+                self._download_member(
+                    version=version, tags=tags, ext=ext, member=member,
+                    overwrite=True, verify=verify)
+        if not os.path.isfile(member_fpath):
+            raise MissingLocalModelError(
+                "No member {} of instance {} in local store!".format(
+                    member, self.fname(version=version, tags=tags, ext=ext)))
+        raw = SerializationFormat.by_name('bin')
+        return raw.deserialize(member_fpath, mmap=mmap)
+
+    def load(self, version=None, tags=None, ext=None, mmap=False,
+             source='local', persist=True, verify=True, member=None,
+             alias=None, **kwargs):
+        """Loads an instance of this model into a python object.
+
+        Parameters
+        ----------
+        version: str, optional
+            The version of the desired instance of this model.
+        tags : list of str, optional
+            The tags associated with the desired instance of this model.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        mmap : bool, default False
+            If set to True, array data is memory-mapped read-only from the
+            file in local store instead of being read into memory. All
+            processes mapping the same instance then share its physical
+            memory through the OS page cache. Supported only by formats with
+            supports_mmap set, such as npy and joblib.
+        source : str, default 'local'
+            If 'local', the instance is loaded from local store. If 'remote',
+            it is fetched from model store. If 'auto', local store is used if
+            it holds the instance, and model store otherwise. With 'remote'
+            or 'auto', version can also be 'latest'.
+        persist : bool, default True
+            Only used when loading from model store. If set to True, the
+            instance is also written to local store. Formats that can consume
+            streams are fed blob bytes as they arrive, overlapping transfer
+            and deserialization. Other formats read from local store once
+            downloaded if persist is set, and from an anonymous memory buffer
+            the blob is downloaded into otherwise.
+        verify : bool, default True
+            Only used when loading from model store. If set to True, the
+            instance is verified while it is transferred against the hash
+            held for it by this model's index or, failing that, by its blob's
+            metadata.
+        member : str, optional
+            Only for bundle instances. If given, only the bytes of this member
+            of the bundle are loaded: from the bundle in local store if it is
+            there, and otherwise with range reads from model store; see
+            download. With source='auto', a previously downloaded member is
+            used only if the bundle's blob has not changed since.
+        alias : str, optional
+            If given, the instance this alias points at is loaded, and the
+            version, tags and ext parameters are ignored. With source='local'
+            the alias is resolved through its local symlink, and otherwise
+            through its pointer blob in model store; see resolve_alias.
+        **kwargs : extra keyword arguments, optional
+            Extra keyword arguments are forwarded to the deserialization
+            method of the SerializationFormat object corresponding to the
+            extension used.
+
+        Returns
+        -------
+        object
+            The desired instance of this model.
+        """
+        from .serialization import SerializationFormat
+        if alias is not None:
+            version, tags, ext = self.resolve_alias(
+                alias, source=LOCAL if source == LOCAL else REMOTE)
+        if ext is None:
+            ext = self.default_ext
+        if source not in (LOCAL, REMOTE, AUTO):
+            raise ValueError(
+                "source must be one of 'local', 'remote' or 'auto', not "
+                "{}".format(source))
+        fmt = SerializationFormat.by_name(ext)
+        if member is not None:
+            if version == LATEST and source != LOCAL:
+                version = self.latest_version(tags=tags, ext=ext)
+            return self._load_member(
+                fmt=fmt, version=version, tags=tags, ext=ext, member=member,
+                mmap=mmap, source=source, persist=persist, verify=verify)
+        if source == AUTO:
+            if version == LATEST:
+                version = self.latest_version(tags=tags, ext=ext)
+            source = REMOTE
+            if os.path.exists(self.fpath(version=version, tags=tags, ext=ext)):
+                source = LOCAL
+        if source == REMOTE:
+            if version == LATEST:
+                version = self.latest_version(tags=tags, ext=ext)
+            if mmap and not persist:
+                raise ValueError(
+                    "Memory-mapped loading requires a persisted instance.")
+            if not persist or (fmt.streamable and not mmap):
+                return self._load_remote(
+                    fmt=fmt, version=version, tags=tags, ext=ext,
+                    persist=persist, verify=verify, **kwargs)
+            expected_digest = None
+            if verify:
+                expected_digest = self._indexed_digest(
+                    self.fname(version=version, tags=tags, ext=ext))
+            self.download(
+                overwrite=True, version=version, tags=tags, ext=ext,
+                expected_digest=expected_digest, verify=verify)
+        fpath = self.fpath(version=version, tags=tags, ext=ext)
+        if not os.path.exists(fpath):
+            raise MissingLocalModelError(
+                "No instance of model {} with version={} and tags={} in "
+                "local store! (path={})".format(
+                    self.name, version, tags, fpath))
+        return fmt.deserialize(fpath, mmap=mmap, **kwargs)
+
+    def lazy_load(self, version=None, tags=None, ext=None, source=AUTO,
+                  **kwargs):
+        """Returns a proxy loading an instance of this model on first use.
+
+        The first attribute access or call of the returned proxy loads the
+        instance - fetching it from model store if needed - and is delegated
+        to it, as are all later ones. Loading is thread-safe and happens
+        exactly once.
+
+        Parameters
+        ----------
+        version: str, optional
+            The version of the desired instance of this model. Can be
+            'latest', in which case it is resolved on first use.
+        tags : list of str, optional
+            The tags associated with the desired instance of this model.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        source : str, default 'auto'
+            Where to load the instance from; see load for details.
+        **kwargs : extra keyword arguments, optional
+            Extra keyword arguments are forwarded to load.
+
+        Returns
+        -------
+        mlshed.lazy.LazyModel
+            A transparent proxy for the desired instance of this model.
+        """
+        from .lazy import LazyModel
+
+        def _loader():
+            return self.load(
+                version=version, tags=tags, ext=ext, source=source, **kwargs)
+        return LazyModel(
+            loader=_loader,
+            description=self.fname(version=version, tags=tags, ext=ext),
+        )
+
+    def _instance_name(self, version=None, tags=None, ext=None):
+        """Returns a store-wide unique name for an instance of this model."""
+        parts = [_snail_case(self.task)] if self.task else []
+        parts += ['{}_{}'.format(_snail_case(k), _snail_case(v))
+                  for k, v in sorted(self.kwargs.items())]
+        if not self.singleton:
+            parts.append(_snail_case(self.name))
+        parts.append(self.fname(version=version, tags=tags, ext=ext))
+        return '/'.join(parts)
+
+    def load_async(self, version=None, tags=None, ext=None, source=AUTO,
+                   **kwargs):
+        """Starts loading an instance of this model in the background.
+
+        Loads run on a shared, bounded thread pool, so a service can start
+        loading all of its models at once; see mlshed.background for
+        reporting which of them are still loading.
+
+        Parameters
+        ----------
+        version: str, optional
+            The version of the desired instance of this model.
+        tags : list of str, optional
+            The tags associated with the desired instance of this model.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        source : str, default 'auto'
+            Where to load the instance from; see load for details.
+        **kwargs : extra keyword arguments, optional
+            Extra keyword arguments are forwarded to load.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            A future for the loaded instance.
+        """
+        from .background import submit
+        return submit(
+            self._instance_name(version=version, tags=tags, ext=ext),
+            self.load,
+            version=version, tags=tags, ext=ext, source=source, **kwargs
+        )
+
+    async def aload(self, version=None, tags=None, ext=None, source=AUTO,
+                    **kwargs):
+        """Loads an instance of this model without blocking the event loop.
+
+        This is an awaitable variant of load_async, taking the same
+        arguments, and returning the loaded instance.
+        """
+        import asyncio
+        return await asyncio.wrap_future(self.load_async(
+            version=version, tags=tags, ext=ext, source=source, **kwargs))
+
+    def watch(self, version=LATEST, tags=None, ext=None, source=REMOTE,
+              interval=60, **kwargs):
+        """Loads an instance of this model, and reloads it when it changes.
+
+        Parameters
+        ----------
+        version: str, default 'latest'
+            The version of the watched instance.
+        tags : list of str, optional
+            The tags associated with the watched instance.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        source : str, default 'remote'
+            Whether to watch the instance in model store or in local store.
+        interval : float, default 60
+            The number of seconds between polls.
+        **kwargs : extra keyword arguments, optional
+            Extra keyword arguments are forwarded to
+            mlshed.watch.ModelWatcher.
+
+        Returns
+        -------
+        mlshed.watch.ModelWatcher
+            A started watcher, whose get method returns the currently loaded
+            object.
+        """
+        from .watch import ModelWatcher
+        return ModelWatcher(
+            model=self, version=version, tags=tags, ext=ext, source=source,
+            interval=interval, **kwargs).start()
+
+    def _indexed_digest(self, fname):
+        """Returns the indexed BLAKE2b hex digest of an instance, if any."""
+        index = self.remote_index()
+        if index is None:
+            return None
+        entry = index['instances'].get(fname) or {}
+        algorithm, _, digest = (entry.get('hash') or '').partition(':')
+        return digest if algorithm == 'blake2b' and digest else None
+
+    def _load_remote(self, fmt, version, tags, ext, persist, verify,
+                     **kwargs):
+        from .azure import (
+            open_model_blob,
+            download_model_to_buffer,
+        )
+        from .serialization import BufferFile
+        fname = self.fname(version=version, tags=tags, ext=ext)
+        blob_kwargs = dict(
+            model_name=self.name,
+            file_name=fname,
+            task=self.task,
+            model_attributes=self.kwargs,
+            expected_digest=self._indexed_digest(fname) if verify else None,
+            verify=verify,
+        )
+        if fmt.streamable:
+            tee_path = None
+            if persist:
+                tee_path = self.fpath(version=version, tags=tags, ext=ext)
+            with open_model_blob(tee_path=tee_path, **blob_kwargs) as stream:
+                return fmt.read(stream, **kwargs)
+        buffer = download_model_to_buffer(**blob_kwargs)
+        return fmt.read(BufferFile(buffer), **kwargs)
+
+    def dump(self, obj, version=None, tags=None, ext=None, **kwargs):
+        """Dumps an instance of this model into a file in local store.
+
+        Parameters
+        ----------
+        obj : object
+            The model object to dump to file.
+        version: str, optional
+            The version of the given instance of this model.
+        tags : list of str, optional
+            The tags associated with the given instance of this model.
+        ext : str, optional
+            The file extension to use. If not given, the default extension is
+            used.
+        **kwargs : extra keyword arguments, optional
+            Extra keyword arguments are forwarded to the serialization method
+            of the SerializationFormat object corresponding to the extension
+            used.
+
+        Returns
+        -------
+        str
+            The path of the file the instance was dumped to.
+        """
+        from .serialization import SerializationFormat
+        if ext is None:
+            ext = self.default_ext
+        fpath = self.fpath(version=version, tags=tags, ext=ext)
+        fmt = SerializationFormat.by_name(ext)
+        # instances are replaced atomically, so that processes which have the
+        # previous file memory-mapped never observe a partially written file
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        partial_fpath = _partial_fpath(fpath)
+        try:
+            fmt.serialize(obj, partial_fpath, **kwargs)
+            os.replace(partial_fpath, fpath)
+            forget(fpath)
+        finally:
+            if os.path.isfile(partial_fpath):
+                os.remove(partial_fpath)
+        return fpath
@@ -0,0 +1,140 @@
+"""A short-lived cache of blob names known to be missing from model store.
+
+Blob names are recorded as missing when a lookup of their blob fails with a
+404, and when a listing of their blob "folder" does not include them. For a
+configurable time-to-live - given in seconds by the 'negative_cache_ttl'
+configuration key, and 0 to disable the cache - lookups of recorded blob
+names then fail immediately, without a request to model store. Blobs written
+by this process are dropped from the cache right away.
+
+Blob names recorded after a failed lookup are also kept on disk, under the
+local store, and so shared by all processes, if the 'negative_cache_disk'
+configuration key is set.
+"""
+
+import os
+import time
+import hashlib
+import posixpath
+import threading
+
+from .cfg import (
+    SHED_CFG,
+    cache_dirpath,
+    _partial_fpath,
+)
+
+
+DEFAULT_NEGATIVE_CACHE_TTL = 30  # in seconds
+
+# maps each blob name to the time it was found missing at
+_MISSING = {}
+# maps each listed blob "folder" to a (listed_at, names) tuple
+_LISTINGS = {}
+_LOCK = threading.Lock()
+
+
+def _ttl():
+    return float(SHED_CFG.get(
+        'negative_cache_ttl', DEFAULT_NEGATIVE_CACHE_TTL))
+
+
+def _use_disk():
+    return str(SHED_CFG.get('negative_cache_disk', False)).lower() in (
+        '1', 'true', 'yes')
+
+
+def _cache_fpath(blob_name):
+    digest = hashlib.sha1(blob_name.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dirpath('missing'), digest)
+
+
+def add(blob_name):
+    """Records the given blob name as missing from model store."""
+    now = time.time()
+    with _LOCK:
+        _MISSING[blob_name] = now
+    if _use_disk():
+        fpath = _cache_fpath(blob_name)
+        partial_fpath = _partial_fpath(fpath)
+        with open(partial_fpath, 'w') as cfile:
+            cfile.write(blob_name)
+        os.replace(partial_fpath, fpath)
+
+
+def add_listing(prefix, names):
+    """Records all blobs directly under prefix but not in names as missing.
+
+    Parameters
+    ----------
+    prefix : str
+        The listed blob "folder", ending with a slash.
+    names : iterable of str
+        The names, relative to prefix, of all blobs directly under it.
+    """
+    with _LOCK:
+        _LISTINGS[prefix] = (time.time(), set(names))
+
+
+def discard(blob_name):
+    """Drops the given blob name from the cache, e.g. once it is written."""
+    prefix, name = posixpath.split(blob_name)
+    with _LOCK:
+        _MISSING.pop(blob_name, None)
+        listing = _LISTINGS.get(prefix + '/')
+        if listing is not None:
+            listing[1].add(name)
+    if _use_disk():
+        try:
+            os.remove(_cache_fpath(blob_name))
+        except FileNotFoundError:
+            pass
+
+
+def is_missing(blob_name):
+    """Returns True if the given blob name is known to be missing.
+
+    Parameters
+    ----------
+    blob_name : str
+        The name of a blob.
+
+    Returns
+    -------
+    bool
+        True if the blob was found missing less than the configured
+        time-to-live ago, and not written since by this process.
+    """
+    ttl = _ttl()
+    if ttl <= 0:
+        return False
+    now = time.time()
+    prefix, name = posixpath.split(blob_name)
+    with _LOCK:
+        missing_at = _MISSING.get(blob_name)
+        listing = _LISTINGS.get(prefix + '/')
+    if missing_at is not None and now - missing_at < ttl:
+        return True
+    if listing is not None and now - listing[0] < ttl and \
+            name not in listing[1]:
+        return True
+    if _use_disk():
+        try:
+            return now - os.stat(_cache_fpath(blob_name)).st_mtime < ttl
+        except OSError:
+            return False
+    return False
+
+
+def clear():
+    """Drops all blob names from the cache, in memory and on disk."""
+    with _LOCK:
+        _MISSING.clear()
+        _LISTINGS.clear()
+    if _use_disk():
+        dpath = cache_dirpath('missing')
+        for fname in os.listdir(dpath):
+            try:
+                os.remove(os.path.join(dpath, fname))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,242 @@
+"""Pack blobs holding many small model instances each.
+
+Uploading or downloading each of many tiny instances - e.g. one per
+customer, keyed by model attributes - costs a full round trip per instance.
+Instead, pack_instances uploads any number of instances from local store as
+the members of a single pack blob: a bundle (see
+mlshed.serialization.BundleFormat) whose members are named by the blob name
+each instance would have on its own. unpack_instances then lists all packs
+with a single request, reads the index off the end of each pack it needs,
+and fetches the wanted members with a few large range reads, coalescing
+members stored close to each other.
+
+Packed instances are not added to the index blobs of their models, and are
+fetched only through unpack_instances.
+"""
+
+import os
+import uuid
+import hashlib
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from . import catalog
+from .cfg import _partial_fpath
+from .exceptions import (
+    MissingLocalModelError,
+    MissingRemoteModelError,
+    ModelIntegrityError,
+)
+from .serialization import BundleFormat
+
+
+PACK_EXT = 'pack'
+DEFAULT_MAX_CONNECTIONS = 8
+# members at most this many bytes apart are fetched with a single read
+DEFAULT_MAX_GAP = 2 ** 20  # 1MB
+# coalesced reads are not extended beyond this size
+DEFAULT_MAX_READ_SIZE = 32 * 2 ** 20  # 32MB
+
+
+def _instance_spec(spec):
+    """Returns a (model, instance_kwargs) tuple for a model or such a tuple."""
+    if isinstance(spec, tuple):
+        model, instance_kwargs = spec
+    else:
+        model, instance_kwargs = spec, {}
+    return model, dict(instance_kwargs)
+
+
+def _member_name(model, instance_kwargs):
+    from .azure import _blob_name
+    return _blob_name(
+        model_name=model.name,
+        file_name=model.fname(**instance_kwargs),
+        task=model.task,
+        model_attributes=model.kwargs,
+    )
+
+
+def pack_instances(specs, task=None, pack_name=None, **kwargs):
+    """Uploads the given instances from local store as a single pack blob.
+
+    Parameters
+    ----------
+    specs : list
+        Each item is either an mlshed.Model, whose default instance is
+        packed, or a (model, instance_kwargs) tuple, where instance_kwargs
+        is a dict with any of the version, tags and ext keys.
+    task : str, optional
+        The task under which the pack is stored. If not given, the pack is
+        stored in the task-agnostic pack directory. Packs can hold instances
+        of models of any task.
+    pack_name : str, optional
+        The name of the pack. Defaults to a name made of the current UTC
+        time and a random suffix.
+    **kwargs : extra keyword arguments
+        Extra keyword arguments are forwarded to
+        mlshed.azure.BlockBlobWriter.
+
+    Returns
+    -------
+    str
+        The file name of the uploaded pack blob.
+    """
+    from .azure import pack_blob_writer
+    members = {}
+    for spec in specs:
+        model, instance_kwargs = _instance_spec(spec)
+        fpath = model.fpath(**instance_kwargs)
+        if not os.path.isfile(fpath):
+            raise MissingLocalModelError(
+                "No model instance to pack in local store! (path={})".format(
+                    fpath))
+        with open(fpath, 'rb') as mfile:
+            members[_member_name(model, instance_kwargs)] = mfile.read()
+    if pack_name is None:
+        pack_name = '{:%Y%m%dT%H%M%S}-{}'.format(
+            datetime.datetime.now(datetime.timezone.utc),
+            uuid.uuid4().hex[:8])
+    pack_fname = '{}.{}'.format(pack_name, PACK_EXT)
+    with pack_blob_writer(pack_fname, task=task, **kwargs) as writer:
+        BundleFormat().write(members, writer)
+    return pack_fname
+
+
+def _coalesce(entries, max_gap, max_read_size):
+    """Groups (entry, fpath) tuples sorted by offset into reads.
+
+    Yields (start, end, members) tuples, where members is a list of the
+    (entry, fpath) tuples of members within bytes [start, end).
+    """
+    start = end = None
+    members = []
+    for entry, fpath in entries:
+        entry_end = entry['offset'] + entry['size']
+        if members and (entry['offset'] - end > max_gap or
+                        entry_end - start > max_read_size):
+            yield start, end, members
+            members = []
+        if not members:
+            start = entry['offset']
+        end = entry_end
+        members.append((entry, fpath))
+    if members:
+        yield start, end, members
+
+
+def _write_member(content, entry, fpath, verify):
+    digest = hashlib.blake2b(content).hexdigest()
+    algorithm, _, expected = entry['hash'].partition(':')
+    if verify and algorithm == 'blake2b' and digest != expected:
+        raise ModelIntegrityError(
+            "Packed instance {} has BLAKE2b digest {}, expected {}.".format(
+                fpath, digest, expected))
+    os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    partial_fpath = _partial_fpath(fpath)
+    with open(partial_fpath, 'wb') as mfile:
+        mfile.write(content)
+    os.replace(partial_fpath, fpath)
+    catalog.record(fpath, digest)
+
+
+def unpack_instances(specs, task=None, overwrite=False, verify=True,
+                     max_connections=None, max_gap=None,
+                     max_read_size=None):
+    """Downloads the given instances from pack blobs into local store.
+
+    Pack blobs are listed once, and the index of each pack is read off its
+    end, newest pack first, until all instances are located; an instance
+    held by several packs is thus taken from the newest one. Members of a
+    pack lying at most max_gap bytes apart are then fetched with a single
+    range read, and all reads are made concurrently. Each instance is
+    verified against its digest in the pack's index, and written to local
+    store atomically.
+
+    Parameters
+    ----------
+    specs : list
+        Each item is either an mlshed.Model, whose default instance is
+        unpacked, or a (model, instance_kwargs) tuple, where instance_kwargs
+        is a dict with any of the version, tags and ext keys.
+    task : str, optional
+        The task under which the packs are stored.
+    overwrite : bool, default False
+        If set to True, instances already in local store are unpacked as
+        well, overwriting them.
+    verify : bool, default True
+        If set to True, a ModelIntegrityError is raised for any instance not
+        matching its digest.
+    max_connections : int, optional
+        The maximum number of concurrent range reads. Defaults to
+        DEFAULT_MAX_CONNECTIONS.
+    max_gap : int, optional
+        The maximum number of unwanted bytes between two members fetched
+        with the same read. Defaults to DEFAULT_MAX_GAP.
+    max_read_size : int, optional
+        The maximum size of a coalesced read. Defaults to
+        DEFAULT_MAX_READ_SIZE.
+
+    Returns
+    -------
+    list of str
+        The local paths of the given instances, in the order of specs.
+    """
+    from .azure import (
+        list_pack_blobs,
+        read_pack_blob_range,
+    )
+    if max_gap is None:
+        max_gap = DEFAULT_MAX_GAP
+    if max_read_size is None:
+        max_read_size = DEFAULT_MAX_READ_SIZE
+    fpaths = []
+    wanted = {}
+    for spec in specs:
+        model, instance_kwargs = _instance_spec(spec)
+        fpath = model.fpath(**instance_kwargs)
+        fpaths.append(fpath)
+        if overwrite or not os.path.isfile(fpath):
+            wanted[_member_name(model, instance_kwargs)] = fpath
+    fmt = BundleFormat()
+    reads = []
+    packs = sorted(
+        list_pack_blobs(task=task),
+        key=lambda pack: pack['last_modified'], reverse=True)
+    for pack in packs:
+        if not wanted:
+            break
+        if not pack['name'].endswith('.' + PACK_EXT):
+            continue
+        # condition all reads on the listed ETag, so that a pack replaced
+        # mid-way results in an error rather than in wrong instances
+        read_kwargs = dict(
+            pack_fname=pack['name'], task=task, etag=pack['etag'])
+        index = fmt.read_index(
+            lambda start, end: read_pack_blob_range(
+                start=start, end=end, **read_kwargs),
+            pack['size'])
+        entries = sorted(
+            ((index[name], wanted.pop(name))
+             for name in list(wanted) if name in index),
+            key=lambda member: member[0]['offset'])
+        for start, end, members in _coalesce(
+                entries, max_gap, max_read_size):
+            reads.append((read_kwargs, start, end, members))
+    if wanted:
+        raise MissingRemoteModelError(
+            "No pack holds the instances {}.".format(sorted(wanted)))
+
+    def _unpack(read):
+        read_kwargs, start, end, members = read
+        data = read_pack_blob_range(start=start, end=end, **read_kwargs)
+        for entry, fpath in members:
+            offset = entry['offset'] - start
+            _write_member(
+                data[offset:offset + entry['size']], entry, fpath, verify)
+
+    with ThreadPoolExecutor(
+            max_workers=max_connections or DEFAULT_MAX_CONNECTIONS
+    ) as executor:
+        list(executor.map(_unpack, reads))
+    return fpaths
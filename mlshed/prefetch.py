@@ -0,0 +1,309 @@
+"""Declarative model manifests and background prefetching of models.
+
+A manifest lists the model instances a process needs. For example, in YAML:
+
+    defaults:
+      task: vision
+    models:
+      - name: dog detect
+        attributes: {lang: en}
+        versions: ['3', '4']
+        tags: [prod]
+        priority: 10
+      - name: cat detect
+        version: '1'
+
+JSON manifests use the same structure, and TOML manifests use a [defaults]
+table and a [[models]] array of tables.
+"""
+
+import os
+import json
+import queue
+import threading
+import itertools
+from concurrent.futures import (
+    Future,
+    wait as wait_futures,
+)
+
+from .model import (
+    LATEST,
+    Model,
+)
+from .exceptions import InvalidManifestError
+
+
+DEFAULT_MAX_WORKERS = 8
+_MODEL_FIELDS = ['task', 'default_ext', 'fname_base', 'singleton']
+
+
+def _read_manifest_file(fpath):
+    ext = os.path.splitext(fpath)[1].lower()
+    if ext == '.json':
+        with open(fpath, 'r') as mfile:
+            return json.load(mfile)
+    if ext in ('.yml', '.yaml'):
+        import yaml
+        with open(fpath, 'r') as mfile:
+            return yaml.safe_load(mfile)
+    if ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # pragma: no cover
+            import tomli as tomllib
+        with open(fpath, 'rb') as mfile:
+            return tomllib.load(mfile)
+    raise InvalidManifestError(
+        "Unsupported manifest format {} (path={})".format(ext, fpath))
+
+
+class ManifestEntry(object):
+    """A single model instance listed in a manifest.
+
+    Parameters
+    ----------
+    model : mlshed.Model
+        The model the instance belongs to.
+    version: str, optional
+        The version of the instance. Can be 'latest', in which case the
+        latest version is resolved once the instance is fetched; see
+        resolved_version.
+    tags : list of str, optional
+        The tags associated with the instance.
+    ext : str, optional
+        The file extension of the instance.
+    priority : int, default 0
+        Instances with higher priority are fetched first.
+    """
+
+    def __init__(self, model, version=None, tags=None, ext=None, priority=0):
+        self.model = model
+        self.version = version
+        self.tags = tags
+        self.ext = ext
+        self.priority = priority
+        # the concrete version; that of 'latest' is set once resolved
+        self.resolved_version = None if version == LATEST else version
+
+    def __repr__(self):
+        return '<ManifestEntry {}>'.format(self.model.fname(
+            version=self.version, tags=self.tags, ext=self.ext))
+
+    def matches(self, name=None, version=None, tags=None):
+        """Returns True if this entry matches all given selectors.
+
+        Entries of the latest version match both 'latest' and, once it is
+        resolved, their concrete version.
+        """
+        if name is not None and name != self.model.name:
+            return False
+        if version is not None and str(version) not in (
+                str(self.version), str(self.resolved_version)):
+            return False
+        if tags is not None and sorted(tags) != sorted(self.tags or []):
+            return False
+        return True
+
+
+def load_manifest(manifest):
+    """Loads a model manifest.
+
+    Parameters
+    ----------
+    manifest : str, dict or list
+        The path to a JSON, YAML or TOML manifest file, a dict with 'models'
+        and optional 'defaults' keys, or a list of model entry dicts.
+
+    Returns
+    -------
+    list of ManifestEntry
+        An entry for each model instance listed in the manifest.
+    """
+    if isinstance(manifest, str):
+        manifest = _read_manifest_file(manifest)
+    if isinstance(manifest, list):
+        manifest = {'models': manifest}
+    if not isinstance(manifest, dict) or 'models' not in manifest:
+        raise InvalidManifestError("A manifest must list models.")
+    defaults = manifest.get('defaults', {})
+    entries = []
+    for raw_entry in manifest['models']:
+        spec = dict(defaults)
+        spec.update(raw_entry)
+        try:
+            name = spec['name']
+        except KeyError:
+            raise InvalidManifestError(
+                "Manifest entry with no model name: {}".format(raw_entry))
+        model_kwargs = {
+            field: spec[field] for field in _MODEL_FIELDS if field in spec}
+        model = Model(name=name, **model_kwargs, **spec.get('attributes', {}))
+        if 'version' in spec and 'versions' in spec:
+            raise InvalidManifestError(
+                "Manifest entry for {} sets both version and versions.".format(
+                    name))
+        versions = spec.get('versions', [spec.get('version')])
+        for version in versions:
+            entries.append(ManifestEntry(
+                model=model,
+                version=None if version is None else str(version),
+                tags=spec.get('tags'),
+                ext=spec.get('ext'),
+                priority=spec.get('priority', 0),
+            ))
+    return entries
+
+
+class Prefetcher(object):
+    """Fetches the model instances of a manifest in background threads.
+
+    Parameters
+    ----------
+    entries : list of ManifestEntry
+        The model instances to fetch.
+    max_workers : int, optional
+        The number of concurrent downloads. Defaults to DEFAULT_MAX_WORKERS.
+    overwrite : bool, default False
+        If set to True, instances are downloaded even if they exist in the
+        local store.
+    """
+
+    def __init__(self, entries, max_workers=None, overwrite=False):
+        if max_workers is None:
+            max_workers = DEFAULT_MAX_WORKERS
+        self.entries = list(entries)
+        self.max_workers = max_workers
+        self.overwrite = overwrite
+        self._futures = [Future() for _ in self.entries]
+        self._queue = queue.PriorityQueue()
+        counter = itertools.count()
+        for entry, future in zip(self.entries, self._futures):
+            # the counter keeps FIFO order between entries of equal priority
+            self._queue.put((-entry.priority, next(counter), entry, future))
+        self._threads = []
+
+    def start(self):
+        """Starts fetching in background threads. Returns this prefetcher."""
+        n_threads = min(self.max_workers, len(self.entries))
+        for _ in range(n_threads):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _work(self):
+        while True:
+            try:
+                _, _, entry, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if entry.version == LATEST:
+                    entry.resolved_version = entry.model.latest_version(
+                        tags=entry.tags, ext=entry.ext)
+                entry.model.download(
+                    overwrite=self.overwrite,
+                    version=entry.resolved_version,
+                    tags=entry.tags,
+                    ext=entry.ext,
+                )
+                future.set_result(entry.model.fpath(
+                    version=entry.resolved_version, tags=entry.tags,
+                    ext=entry.ext))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def futures(self, name=None, version=None, tags=None):
+        """Returns the futures of all entries matching the given selectors.
+
+        The result of each future is the local path of the fetched instance.
+        A KeyError is raised if no entry matches the given selectors, so
+        that a misspelled selector is never taken for a fetched instance.
+        """
+        futures = [
+            future for entry, future in zip(self.entries, self._futures)
+            if entry.matches(name=name, version=version, tags=tags)
+        ]
+        if not futures:
+            raise KeyError(
+                "No manifest entry matches name={}, version={} and "
+                "tags={}.".format(name, version, tags))
+        return futures
+
+    def wait(self, name=None, version=None, tags=None, timeout=None):
+        """Blocks until all matching instances are fetched.
+
+        Parameters
+        ----------
+        name : str, optional
+            The name of the model to wait for. If not given, all models in
+            the manifest are waited for.
+        version: str, optional
+            The version of the instance to wait for.
+        tags : list of str, optional
+            The tags of the instance to wait for.
+        timeout : float, optional
+            The maximum number of seconds to wait.
+
+        Returns
+        -------
+        list of str
+            The local paths of the matching instances. A KeyError is raised
+            if no entry matches the given selectors.
+        """
+        futures = self.futures(name=name, version=version, tags=tags)
+        _, not_done = wait_futures(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError(
+                "{} model instances were not fetched in time.".format(
+                    len(not_done)))
+        return [future.result() for future in futures]
+
+    def ready(self, name=None, version=None, tags=None):
+        """Returns True if all matching instances were fetched successfully.
+
+        A KeyError is raised if no entry matches the given selectors.
+        """
+        return all(
+            future.done() and future.exception() is None
+            for future in self.futures(name=name, version=version, tags=tags)
+        )
+
+    def pending(self):
+        """Returns the entries that are still queued or being fetched."""
+        return [
+            entry for entry, future in zip(self.entries, self._futures)
+            if not future.done()
+        ]
+
+
+def prefetch(manifest, max_workers=None, overwrite=False):
+    """Starts fetching all model instances listed in a manifest.
+
+    Fetching happens concurrently in background threads, in descending order
+    of entry priority, so a process can block only on the models it needs.
+
+    Parameters
+    ----------
+    manifest : str, dict or list
+        The path to a JSON, YAML or TOML manifest file, or an already loaded
+        manifest. See load_manifest for details.
+    max_workers : int, optional
+        The number of concurrent downloads. Defaults to DEFAULT_MAX_WORKERS.
+    overwrite : bool, default False
+        If set to True, instances are downloaded even if they exist in the
+        local store.
+
+    Returns
+    -------
+    Prefetcher
+        A started prefetcher, which can be used to wait on specific models.
+    """
+    return Prefetcher(
+        entries=load_manifest(manifest),
+        max_workers=max_workers,
+        overwrite=overwrite,
+    ).start()
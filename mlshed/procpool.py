@@ -0,0 +1,265 @@
+"""Loading model instances in worker processes.
+
+Deserializing large object graphs - e.g. tree ensembles - is CPU-bound and
+holds the GIL, so loading many models from threads is no faster than
+loading them serially. bulk_load deserializes in a process pool instead,
+and hands loaded objects back to the calling process through shared memory:
+each worker dumps its object in the pickle5-oob format to a shared memory
+file, so array buffers are mapped, rather than copied, by the caller.
+Shared memory files are written to /dev/shm, or to the directory set by the
+'procpool_tmp_dir' configuration key; objects not fitting there - e.g. as
+/dev/shm is limited to 64MB in Docker containers by default - are written to
+the default temporary directory instead.
+Alternatively, ResidentModelPool keeps models loaded in worker processes
+and proxies method calls - such as predict - to them.
+"""
+
+import os
+import errno
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .cfg import SHED_CFG
+from .model import AUTO
+from .serialization import OutOfBandPickleFormat
+
+
+_SHM_DIR = '/dev/shm'
+
+
+def _load_spec(spec):
+    """Returns a (model, load_kwargs) tuple for a model or such a tuple."""
+    if isinstance(spec, tuple):
+        model, load_kwargs = spec
+    else:
+        model, load_kwargs = spec, {}
+    load_kwargs = dict(load_kwargs)
+    load_kwargs.setdefault('source', AUTO)
+    return model, load_kwargs
+
+
+def _shared_tmp_dir():
+    dpath = SHED_CFG.get('procpool_tmp_dir')
+    if dpath:
+        return dpath
+    # tmpfs-backed, so dumped objects never hit the disk on Linux
+    return _SHM_DIR if os.path.isdir(_SHM_DIR) else None
+
+
+def _dump_to_tmp_file(obj, dpath):
+    fd, fpath = tempfile.mkstemp(prefix='mlshed_', suffix='.pkl5', dir=dpath)
+    os.close(fd)
+    try:
+        OutOfBandPickleFormat().serialize(obj, fpath)
+    except BaseException:
+        os.remove(fpath)
+        raise
+    return fpath
+
+
+def _load_to_shared_file(model, load_kwargs, dpath):
+    obj = model.load(**load_kwargs)
+    try:
+        return _dump_to_tmp_file(obj, dpath)
+    except OSError as e:
+        fallback = tempfile.gettempdir()
+        if e.errno != errno.ENOSPC or dpath in (None, fallback):
+            raise
+    # the shared memory filesystem is full; use the default temporary
+    # directory, mapped through the page cache all the same
+    return _dump_to_tmp_file(obj, fallback)
+
+
+def bulk_load(specs, max_workers=None, mp_context=None, tmp_dir=None):
+    """Loads many model instances in parallel worker processes.
+
+    Array buffers of loaded objects are returned as zero-copy, read-only
+    views over shared memory.
+
+    Parameters
+    ----------
+    specs : list
+        Each item is either an mlshed.Model, whose default instance is
+        loaded, or a (model, load_kwargs) tuple, where load_kwargs is a dict
+        of keyword arguments for Model.load; e.g. {'version': '3'}. Unless
+        given, source is set to 'auto'.
+    max_workers : int, optional
+        The number of worker processes. Defaults to the number of CPUs.
+    mp_context : multiprocessing.context.BaseContext, optional
+        The multiprocessing context used to start worker processes.
+    tmp_dir : str, optional
+        The directory loaded objects are handed back through. Defaults to
+        the 'procpool_tmp_dir' key of the mlshed configuration, or to
+        /dev/shm. Objects which do not fit in it are written to the default
+        temporary directory instead.
+
+    Returns
+    -------
+    list
+        The loaded objects, in the order of the given specs.
+    """
+    fmt = OutOfBandPickleFormat()
+    dpath = tmp_dir or _shared_tmp_dir()
+    with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=mp_context) as executor:
+        futures = [
+            executor.submit(_load_to_shared_file, *_load_spec(spec), dpath)
+            for spec in specs
+        ]
+        try:
+            objects = []
+            for future in futures:
+                fpath = future.result()
+                try:
+                    objects.append(fmt.deserialize(fpath, mmap=True))
+                finally:
+                    # existing maps outlive the file's directory entry
+                    os.remove(fpath)
+            return objects
+        except BaseException:
+            for future in futures:
+                if not future.cancel() and future.exception() is None:
+                    if os.path.isfile(future.result()):
+                        os.remove(future.result())
+            raise
+
+
+def _resident_worker(conn, specs):
+    models = {}
+    errors = {}
+    for key, spec in specs.items():
+        model, load_kwargs = _load_spec(spec)
+        try:
+            models[key] = model.load(**load_kwargs)
+        except Exception as e:
+            errors[key] = e
+    conn.send(errors)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        key, method, args, kwargs = message
+        try:
+            conn.send((True, getattr(models[key], method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+class ResidentModel(object):
+    """A handle for a model object resident in a worker process.
+
+    Method calls on the handle - e.g. handle.predict(X) - are run by the
+    worker process holding the model, and their results returned.
+    """
+
+    def __init__(self, pool, key):
+        self._pool = pool
+        self._key = key
+
+    def __repr__(self):
+        return '<ResidentModel: {}>'.format(self._key)
+
+    def __getattr__(self, method):
+        if method.startswith('__'):
+            raise AttributeError(method)
+
+        def _call(*args, **kwargs):
+            return self._pool.call(self._key, method, *args, **kwargs)
+        return _call
+
+
+class ResidentModelPool(object):
+    """Keeps model instances loaded in worker processes.
+
+    Models are spread across worker processes, which load them in parallel
+    when the pool is created. Calls to a model are proxied to the worker
+    holding it; calls to models held by different workers run in parallel.
+
+    Parameters
+    ----------
+    specs : dict
+        Maps a key for each model to either an mlshed.Model or a
+        (model, load_kwargs) tuple; see bulk_load for details.
+    processes : int, optional
+        The number of worker processes. Defaults to the number of CPUs,
+        and is capped by the number of models.
+    mp_context : multiprocessing.context.BaseContext, optional
+        The multiprocessing context used to start worker processes.
+    """
+
+    def __init__(self, specs, processes=None, mp_context=None):
+        if mp_context is None:
+            mp_context = multiprocessing.get_context()
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = max(1, min(processes, len(specs)))
+        assignments = [{} for _ in range(processes)]
+        for i, (key, spec) in enumerate(sorted(specs.items())):
+            assignments[i % processes][key] = spec
+        self._workers = {}
+        self._processes = []
+        for assigned in assignments:
+            conn, child_conn = mp_context.Pipe()
+            process = mp_context.Process(
+                target=_resident_worker, args=(child_conn, assigned),
+                daemon=True)
+            process.start()
+            child_conn.close()
+            self._processes.append((process, conn))
+            worker = (conn, threading.Lock())
+            for key in assigned:
+                self._workers[key] = worker
+        self.errors = {}
+        for _, conn in self._processes:
+            self.errors.update(conn.recv())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getitem__(self, key):
+        if key not in self._workers:
+            raise KeyError(key)
+        return ResidentModel(self, key)
+
+    def keys(self):
+        """Returns the keys of all models in this pool."""
+        return sorted(self._workers)
+
+    def call(self, key, method, *args, **kwargs):
+        """Calls a method of a resident model and returns its result.
+
+        Parameters
+        ----------
+        key : str
+            The key of the model.
+        method : str
+            The name of the method to call; e.g. 'predict'.
+        *args, **kwargs
+            Arguments the method is called with.
+        """
+        if key in self.errors:
+            raise self.errors[key]
+        conn, lock = self._workers[key]
+        with lock:
+            conn.send((key, method, args, kwargs))
+            succeeded, result = conn.recv()
+        if not succeeded:
+            raise result
+        return result
+
+    def close(self):
+        """Stops all worker processes."""
+        for process, conn in self._processes:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join()
+            conn.close()
+        self._processes = []
@@ -0,0 +1,592 @@
+"""Serialization formats for model instances.
+
+Formats are looked up by file extension, so the extension of a model
+instance (see Model.default_ext) determines how it is serialized. Formats
+with supports_mmap set can load instances as read-only memory maps, in
+which case array data is paged in from the file lazily instead of being
+read fully into memory.
+"""
+
+import io
+import os
+import json
+import mmap
+import struct
+import pickle
+import hashlib
+
+from .exceptions import UnsupportedFormatError
+
+if pickle.HIGHEST_PROTOCOL >= 5:
+    _pickle5 = pickle
+else:  # pragma: no cover
+    try:
+        import pickle5 as _pickle5
+    except ImportError:
+        _pickle5 = None
+
+
+PICKLE_PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+
+
+class SerializationFormat(object):
+    """A serialization format for model instances.
+
+    Subclasses implement serialize and deserialize, and are registered for
+    the file extensions they handle with SerializationFormat.register.
+
+    Parameters
+    ----------
+    name : str
+        The name of the format.
+    extensions : list of str
+        The file extensions, without a dot, handled by this format.
+    supports_mmap : bool, default False
+        Whether this format can load instances as read-only memory maps.
+    streamable : bool, default False
+        Whether this format can read instances from non-seekable streams,
+        consuming them sequentially.
+    """
+
+    _BY_EXT = {}
+
+    def __init__(self, name, extensions, supports_mmap=False,
+                 streamable=False):
+        self.name = name
+        self.extensions = extensions
+        self.supports_mmap = supports_mmap
+        self.streamable = streamable
+
+    def __repr__(self):
+        return '<SerializationFormat: {}>'.format(self.name)
+
+    @classmethod
+    def register(cls, fmt):
+        """Registers the given format for all of its extensions.
+
+        Formats registered later replace earlier formats registered for the
+        same extensions.
+        """
+        for ext in fmt.extensions:
+            cls._BY_EXT[ext.lower()] = fmt
+        return fmt
+
+    @classmethod
+    def by_name(cls, ext):
+        """Returns the format registered for the given file extension.
+
+        Parameters
+        ----------
+        ext : str
+            A file extension, with or without a leading dot. E.g. 'pkl'.
+
+        Returns
+        -------
+        SerializationFormat
+            The format registered for the given extension.
+        """
+        try:
+            return cls._BY_EXT[ext.lower().lstrip('.')]
+        except KeyError:
+            raise UnsupportedFormatError(
+                "No serialization format is registered for extension "
+                "{}.".format(ext))
+
+    @classmethod
+    def extensions_supported(cls):
+        """Returns a sorted list of all supported file extensions."""
+        return sorted(cls._BY_EXT)
+
+    def serialize(self, obj, fpath, **kwargs):
+        """Serializes the given object into the given file path."""
+        with open(fpath, 'wb') as mfile:
+            self.write(obj, mfile, **kwargs)
+
+    def write(self, obj, fileobj, **kwargs):
+        """Serializes the given object into the given binary file object.
+
+        Formats only ever call write and tell on the given file object, so
+        it need not be seekable; e.g. it can stream directly to model store.
+        """
+        raise NotImplementedError
+
+    def read(self, fileobj, **kwargs):
+        """Deserializes an object from the given binary file object.
+
+        Unless streamable is set, the given file object must be seekable.
+        """
+        raise NotImplementedError
+
+    def deserialize(self, fpath, mmap=False, **kwargs):
+        """Deserializes an object from the given file path.
+
+        Parameters
+        ----------
+        fpath : str
+            The path of the file to deserialize.
+        mmap : bool, default False
+            If set to True, the file is memory-mapped read-only instead of
+            being read into memory. Only supported if supports_mmap is set.
+        **kwargs : extra keyword arguments
+            Extra keyword arguments are forwarded to the underlying
+            deserialization function.
+        """
+        self._check_mmap(mmap)
+        with open(fpath, 'rb') as mfile:
+            return self.read(mfile, **kwargs)
+
+    def _check_mmap(self, mmap):
+        if mmap and not self.supports_mmap:
+            raise UnsupportedFormatError(
+                "The {} format does not support memory-mapped loading.".format(
+                    self.name))
+
+
+class PickleFormat(SerializationFormat):
+    """Pickle, using protocol 5 where available."""
+
+    def __init__(self):
+        super().__init__(
+            name='pickle', extensions=['pkl', 'pickle'], streamable=True)
+
+    def write(self, obj, fileobj, protocol=PICKLE_PROTOCOL, **kwargs):
+        pickle.dump(obj, fileobj, protocol=protocol, **kwargs)
+
+    def read(self, fileobj, **kwargs):
+        return pickle.load(fileobj, **kwargs)
+
+
+class JoblibFormat(SerializationFormat):
+    """joblib, which stores numpy arrays in a memory-mappable layout."""
+
+    def __init__(self):
+        super().__init__(
+            name='joblib', extensions=['joblib'], supports_mmap=True)
+
+    def write(self, obj, fileobj, **kwargs):
+        import joblib
+        joblib.dump(obj, fileobj, **kwargs)
+
+    def read(self, fileobj, **kwargs):
+        import joblib
+        return joblib.load(fileobj, **kwargs)
+
+    def deserialize(self, fpath, mmap=False, **kwargs):
+        import joblib
+        if mmap:
+            kwargs['mmap_mode'] = 'r'
+        return joblib.load(fpath, **kwargs)
+
+
+class NpyFormat(SerializationFormat):
+    """A single numpy array in the .npy format."""
+
+    def __init__(self):
+        super().__init__(name='npy', extensions=['npy'], supports_mmap=True)
+
+    def write(self, obj, fileobj, **kwargs):
+        import numpy as np
+        np.save(fileobj, obj, **kwargs)
+
+    def read(self, fileobj, **kwargs):
+        import numpy as np
+        return np.load(fileobj, **kwargs)
+
+    def deserialize(self, fpath, mmap=False, **kwargs):
+        import numpy as np
+        if mmap:
+            kwargs['mmap_mode'] = 'r'
+        return np.load(fpath, **kwargs)
+
+
+class NpzFormat(SerializationFormat):
+    """A dict of named numpy arrays in the .npz format."""
+
+    def __init__(self):
+        super().__init__(name='npz', extensions=['npz'])
+
+    def write(self, obj, fileobj, compress=False, **kwargs):
+        # numpy.savez only accepts file objects that can also be read, so
+        # the archive is written as savez would, with zipfile, which also
+        # writes to non-seekable streams
+        import zipfile
+        import numpy as np
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with zipfile.ZipFile(fileobj, mode='w', compression=compression,
+                             allowZip64=True) as zfile:
+            for name, array in dict(obj, **kwargs).items():
+                with zfile.open(name + '.npy', mode='w',
+                                force_zip64=True) as afile:
+                    np.lib.format.write_array(
+                        afile, np.asanyarray(array), allow_pickle=True)
+
+    def read(self, fileobj, **kwargs):
+        import numpy as np
+        with np.load(fileobj, **kwargs) as npz:
+            return dict(npz)
+
+
+class RawFormat(SerializationFormat):
+    """Raw bytes, written and read as is."""
+
+    def __init__(self):
+        super().__init__(
+            name='raw', extensions=['bin', 'raw'], supports_mmap=True,
+            streamable=True)
+
+    def write(self, obj, fileobj, **kwargs):
+        fileobj.write(obj)
+
+    def read(self, fileobj, **kwargs):
+        return fileobj.read()
+
+    def deserialize(self, fpath, mmap=False, **kwargs):
+        with open(fpath, 'rb') as mfile:
+            if mmap:
+                return _mmap_file(mfile)
+            return mfile.read()
+
+
+class DirectoryFormat(SerializationFormat):
+    """Directory instances, made of any number of files.
+
+    Directory instances are added to local store with Model.add_local, and
+    are loaded as the path of their local directory, to be consumed by
+    whatever library reads the files in it.
+    """
+
+    def __init__(self):
+        super().__init__(name='directory', extensions=['dir'])
+
+    def write(self, obj, fileobj, **kwargs):
+        raise UnsupportedFormatError(
+            "Directory instances cannot be dumped; add them to local store "
+            "with Model.add_local instead.")
+
+    def read(self, fileobj, **kwargs):
+        raise UnsupportedFormatError(
+            "Directory instances can only be loaded from local store.")
+
+    def deserialize(self, fpath, mmap=False, **kwargs):
+        self._check_mmap(mmap)
+        return fpath
+
+
+class OutOfBandPickleFormat(SerializationFormat):
+    """Pickle protocol 5, with large buffers stored out-of-band.
+
+    Buffers exposed through pickle protocol 5 - e.g. the data of numpy
+    arrays - are written after the pickle stream rather than inside it, each
+    aligned to BUFFER_ALIGNMENT bytes. On load, these buffers are handed to
+    pickle as views over the file contents, so arrays are reconstructed
+    without copying their data; with mmap set, they are zero-copy, read-only
+    views over a memory map of the file.
+
+    The file layout is: the MAGIC bytes, a header of (n_buffers,
+    pickle_offset, pickle_length) followed by an (offset, length) pair per
+    buffer, the pickle stream, and finally the aligned buffers.
+    """
+
+    MAGIC = b'MLSHEDP5'
+    BUFFER_ALIGNMENT = 64
+    _HEADER = struct.Struct('<QQQ')
+    _BUFFER_ENTRY = struct.Struct('<QQ')
+
+    def __init__(self):
+        super().__init__(
+            name='pickle5-oob', extensions=['pkl5'], supports_mmap=True)
+
+    @staticmethod
+    def _check_pickle5():
+        if _pickle5 is None:  # pragma: no cover
+            raise UnsupportedFormatError(
+                "The pickle5-oob format requires Python 3.8+ or the pickle5 "
+                "package.")
+
+    def _aligned(self, offset):
+        return -(-offset // self.BUFFER_ALIGNMENT) * self.BUFFER_ALIGNMENT
+
+    def write(self, obj, fileobj, **kwargs):
+        self._check_pickle5()
+        raw_buffers = []
+
+        def _buffer_callback(pickle_buffer):
+            try:
+                raw_buffers.append(pickle_buffer.raw())
+            except BufferError:
+                return True  # non-contiguous buffers are pickled in-band
+            return False
+        payload = _pickle5.dumps(
+            obj, protocol=5, buffer_callback=_buffer_callback, **kwargs)
+        pickle_offset = len(self.MAGIC) + self._HEADER.size + \
+            self._BUFFER_ENTRY.size * len(raw_buffers)
+        buffer_entries = []
+        offset = pickle_offset + len(payload)
+        for raw in raw_buffers:
+            offset = self._aligned(offset)
+            buffer_entries.append((offset, raw.nbytes))
+            offset += raw.nbytes
+        fileobj.write(self.MAGIC)
+        fileobj.write(self._HEADER.pack(
+            len(raw_buffers), pickle_offset, len(payload)))
+        for entry in buffer_entries:
+            fileobj.write(self._BUFFER_ENTRY.pack(*entry))
+        fileobj.write(payload)
+        position = pickle_offset + len(payload)
+        for (offset, length), raw in zip(buffer_entries, raw_buffers):
+            fileobj.write(b'\0' * (offset - position))
+            fileobj.write(raw)
+            position = offset + length
+
+    def read(self, fileobj, **kwargs):
+        if isinstance(fileobj, BufferFile):
+            # buffers are already in memory, so use them in place
+            return self._loads(fileobj.getbuffer(), **kwargs)
+        content = fileobj.read()
+        aligned = mmap.mmap(-1, max(len(content), 1))
+        aligned.write(content)
+        return self._loads(memoryview(aligned)[:len(content)], **kwargs)
+
+    def deserialize(self, fpath, mmap=False, **kwargs):
+        with open(fpath, 'rb') as mfile:
+            if mmap:
+                content = _mmap_file(mfile)
+            else:
+                content = _read_aligned(mfile)
+        return self._loads(memoryview(content), **kwargs)
+
+    def _loads(self, view, **kwargs):
+        self._check_pickle5()
+        magic_len = len(self.MAGIC)
+        if bytes(view[:magic_len]) != self.MAGIC:
+            raise UnsupportedFormatError("Not a pickle5-oob file.")
+        n_buffers, pickle_offset, pickle_len = self._HEADER.unpack_from(
+            view, magic_len)
+        entries_offset = magic_len + self._HEADER.size
+        buffers = []
+        for i in range(n_buffers):
+            offset, length = self._BUFFER_ENTRY.unpack_from(
+                view, entries_offset + i * self._BUFFER_ENTRY.size)
+            buffers.append(view[offset:offset + length])
+        return _pickle5.loads(
+            view[pickle_offset:pickle_offset + pickle_len],
+            buffers=buffers, **kwargs)
+
+
+class BundleFormat(SerializationFormat):
+    """Bundles of named members, with a trailing index of member offsets.
+
+    A bundle is dumped from a dict mapping member names to bytes-like
+    objects, and loaded as such a dict. Members are written back to back,
+    each aligned to MEMBER_ALIGNMENT bytes, followed by a JSON index mapping
+    each member name to its offset, size and BLAKE2b digest, and finally by
+    a fixed-size trailer holding the size of the index and the MAGIC bytes.
+    Any single member can thus be located by reading the end of a bundle
+    only, and then read - or fetched with a range request - on its own.
+    With mmap set, members are loaded as read-only views over a memory map
+    of the bundle.
+    """
+
+    MAGIC = b'MLSHEDB1'
+    MEMBER_ALIGNMENT = 64
+    TRAILER = struct.Struct('<Q8s')  # index size, MAGIC
+    # remote readers fetch this many bytes off the end of a bundle at once,
+    # which holds the index of all but very large bundles
+    TAIL_READ_SIZE = 64 * 2 ** 10
+
+    def __init__(self):
+        super().__init__(
+            name='bundle', extensions=['bundle'], supports_mmap=True)
+
+    def write(self, obj, fileobj, **kwargs):
+        index = {}
+        position = 0
+        for name, content in sorted(obj.items()):
+            view = memoryview(content).cast('B')
+            padding = -position % self.MEMBER_ALIGNMENT
+            fileobj.write(b'\0' * padding)
+            position += padding
+            fileobj.write(view)
+            index[name] = {
+                'offset': position,
+                'size': view.nbytes,
+                'hash': 'blake2b:{}'.format(
+                    hashlib.blake2b(view).hexdigest()),
+            }
+            position += view.nbytes
+        index_bytes = json.dumps(
+            {'members': index}, sort_keys=True).encode('utf-8')
+        fileobj.write(index_bytes)
+        fileobj.write(self.TRAILER.pack(len(index_bytes), self.MAGIC))
+
+    def index_size(self, trailer):
+        """Returns the size of the index given the trailer of a bundle."""
+        index_size, magic = self.TRAILER.unpack(trailer)
+        if magic != self.MAGIC:
+            raise UnsupportedFormatError("Not a bundle file.")
+        return index_size
+
+    def parse_index(self, index_bytes):
+        """Returns the member entries of a bundle given its index bytes.
+
+        Returns
+        -------
+        dict
+            Maps each member name to a dict with offset, size and hash keys.
+        """
+        return json.loads(bytes(index_bytes).decode('utf-8'))['members']
+
+    def read_index(self, read_range, size):
+        """Reads the index of a bundle off its end with range reads.
+
+        The last TAIL_READ_SIZE bytes are read first, which usually hold the
+        whole index; otherwise, the rest of it is read with a second read.
+
+        Parameters
+        ----------
+        read_range : callable
+            Called with (start, end) and returning bytes [start, end) of the
+            bundle; e.g. a ranged download of a blob.
+        size : int
+            The size of the bundle, in bytes.
+
+        Returns
+        -------
+        dict
+            Maps each member name to a dict with offset, size and hash keys.
+        """
+        tail_start = max(0, size - self.TAIL_READ_SIZE)
+        tail = read_range(tail_start, size)
+        index_size = self.index_size(tail[-self.TRAILER.size:])
+        index_start = size - self.TRAILER.size - index_size
+        if index_start < tail_start:
+            tail = read_range(index_start, tail_start) + tail
+            tail_start = index_start
+        return self.parse_index(
+            tail[index_start - tail_start:len(tail) - self.TRAILER.size])
+
+    def _index_of(self, view):
+        index_size = self.index_size(view[-self.TRAILER.size:])
+        index_end = len(view) - self.TRAILER.size
+        return self.parse_index(view[index_end - index_size:index_end])
+
+    def _members(self, view, members=None):
+        index = self._index_of(view)
+        if members is None:
+            members = list(index)
+        try:
+            return {
+                name: view[index[name]['offset']:
+                           index[name]['offset'] + index[name]['size']]
+                for name in members
+            }
+        except KeyError as e:
+            raise KeyError("No member {} in bundle.".format(e)) from None
+
+    def read(self, fileobj, **kwargs):
+        if isinstance(fileobj, BufferFile):
+            view = fileobj.getbuffer()
+        else:
+            view = memoryview(fileobj.read())
+        return {name: bytes(member)
+                for name, member in self._members(view).items()}
+
+    def deserialize(self, fpath, mmap=False, members=None, **kwargs):
+        """Deserializes a bundle from the given file path.
+
+        Parameters
+        ----------
+        fpath : str
+            The path of the bundle.
+        mmap : bool, default False
+            If set to True, members are loaded as read-only memoryview
+            objects over a memory map of the bundle, which are paged in
+            lazily.
+        members : list of str, optional
+            If given, only these members are loaded.
+        """
+        with open(fpath, 'rb') as mfile:
+            if mmap:
+                return self._members(memoryview(_mmap_file(mfile)), members)
+            if members is None:
+                return self.read(mfile)
+            mfile.seek(-self.TRAILER.size, io.SEEK_END)
+            index_size = self.index_size(mfile.read(self.TRAILER.size))
+            mfile.seek(-self.TRAILER.size - index_size, io.SEEK_END)
+            index = self.parse_index(mfile.read(index_size))
+            loaded = {}
+            for name in members:
+                if name not in index:
+                    raise KeyError("No member {} in bundle.".format(name))
+                mfile.seek(index[name]['offset'])
+                loaded[name] = mfile.read(index[name]['size'])
+            return loaded
+
+
+class BufferFile(io.RawIOBase):
+    """A read-only, seekable file object over an in-memory buffer.
+
+    Unlike io.BytesIO, the given buffer - e.g. an anonymous memory map - is
+    used in place rather than copied, and is exposed through getbuffer.
+
+    Parameters
+    ----------
+    buffer : bytes-like object
+        The buffer to read from.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def getbuffer(self):
+        """Returns a memoryview over the underlying buffer."""
+        return self._view
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer):
+        chunk = self._view[self._position:self._position + len(buffer)]
+        memoryview(buffer).cast('B')[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+def _read_aligned(fileobj):
+    """Reads the given open file into a writable, page-aligned buffer."""
+    size = os.fstat(fileobj.fileno()).st_size
+    # anonymous maps are page-aligned, unlike bytearrays
+    buffer = mmap.mmap(-1, max(size, 1))
+    fileobj.readinto(buffer)
+    return buffer
+
+
+def _mmap_file(fileobj):
+    """Maps the given open file read-only; empty files map to b''."""
+    try:
+        return mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # mmap cannot map empty files
+        return b''
+
+
+for _fmt in [PickleFormat(), OutOfBandPickleFormat(), JoblibFormat(),
+             NpyFormat(), NpzFormat(), RawFormat(), DirectoryFormat(),
+             BundleFormat()]:
+    SerializationFormat.register(_fmt)
+del _fmt
@@ -0,0 +1,199 @@
+"""Hot reloading of model instances in long-running processes."""
+
+import os
+import warnings
+import threading
+
+from .model import (
+    LATEST,
+    LOCAL,
+    REMOTE,
+)
+
+
+class ModelWatcher(object):
+    """Keeps an instance of a model loaded, reloading it when it changes.
+
+    The watched instance is polled on an interval - through its blob's ETag
+    in model store, or its file's inode in local store - by a background
+    thread. A changed instance is downloaded and deserialized by that thread,
+    off the request path, and then swapped in with a single reference
+    assignment, so callers of get always receive a fully loaded object. The
+    previously loaded object is kept for an instant rollback.
+
+    Parameters
+    ----------
+    model : mlshed.Model
+        The model to watch an instance of.
+    version: str, optional
+        The version of the watched instance. With source='remote', it can be
+        'latest', in which case the latest version is resolved on every poll.
+    tags : list of str, optional
+        The tags associated with the watched instance.
+    ext : str, optional
+        The file extension to use. If not given, the default extension is
+        used.
+    source : str, default 'remote'
+        If 'remote', the instance's blob in model store is watched, and new
+        contents are downloaded into local store before being loaded. If
+        'local', the instance's file in local store is watched; as files are
+        replaced atomically, a new file has a new inode.
+    interval : float, default 60
+        The number of seconds between polls.
+    on_swap : callable, optional
+        Called with the new and the previous object after each swap,
+        including ones made by rollback.
+    **kwargs : extra keyword arguments, optional
+        Extra keyword arguments are forwarded to Model.load.
+    """
+
+    def __init__(self, model, version=None, tags=None, ext=None,
+                 source=REMOTE, interval=60, on_swap=None, **kwargs):
+        if source not in (LOCAL, REMOTE):
+            raise ValueError(
+                "source must be either 'local' or 'remote', not {}".format(
+                    source))
+        if version == LATEST and source == LOCAL:
+            raise ValueError(
+                "Watching the latest version requires source='remote'.")
+        self.model = model
+        self.version = version
+        self.tags = tags
+        self.ext = ext or model.default_ext
+        self.source = source
+        self.interval = interval
+        self.on_swap = on_swap
+        self.load_kwargs = kwargs
+        self.last_error = None
+        # a (fingerprint, object) tuple each; swapped, never mutated
+        self._current = None
+        self._previous = None
+        self._rolled_back = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _fingerprint(self):
+        """Returns a (version, token) tuple identifying current contents."""
+        version = self.version
+        if self.source == LOCAL:
+            stat = os.stat(self.model.fpath(
+                version=version, tags=self.tags, ext=self.ext))
+            return version, (stat.st_dev, stat.st_ino, stat.st_mtime_ns,
+                             stat.st_size)
+        from .azure import model_blob_properties
+        if version == LATEST:
+            version = self.model.latest_version(
+                tags=self.tags, ext=self.ext, refresh=True)
+        properties = model_blob_properties(
+            model_name=self.model.name,
+            file_name=self.model.fname(
+                version=version, tags=self.tags, ext=self.ext),
+            task=self.model.task,
+            model_attributes=self.model.kwargs,
+        )
+        return version, properties.etag
+
+    def check(self):
+        """Polls the watched instance once, reloading it if it changed.
+
+        Returns
+        -------
+        bool
+            True if a new object was loaded and swapped in.
+        """
+        fingerprint = self._fingerprint()
+        if not self._is_new(fingerprint):
+            return False
+        # loaded without holding the lock, so rollback and concurrent checks
+        # are not blocked for the duration of a download
+        obj = self.model.load(
+            version=fingerprint[0], tags=self.tags, ext=self.ext,
+            source=self.source, **self.load_kwargs)
+        with self._lock:
+            # contents may have been swapped or rolled back meanwhile
+            if not self._is_new(fingerprint):
+                return False
+            self._swap((fingerprint, obj))
+            return True
+
+    def _is_new(self, fingerprint):
+        current = self._current
+        if current is not None and current[0] == fingerprint:
+            return False
+        return fingerprint != self._rolled_back
+
+    def _swap(self, new):
+        self._previous, self._current = self._current, new
+        if self.on_swap is not None:
+            self.on_swap(
+                new[1], self._previous[1] if self._previous else None)
+
+    def get(self):
+        """Returns the currently loaded object, loading it if needed."""
+        current = self._current
+        if current is None:
+            self.check()
+            current = self._current
+        return current[1]
+
+    def previous(self):
+        """Returns the previously loaded object, or None if there is none."""
+        previous = self._previous
+        return previous[1] if previous else None
+
+    def rollback(self):
+        """Swaps the previously loaded object back in.
+
+        The rolled back contents are not reloaded by later polls; only
+        newer contents are.
+        """
+        with self._lock:
+            if self._previous is None:
+                raise ValueError(
+                    "No previously loaded object to roll back to.")
+            self._rolled_back = self._current[0]
+            self._swap(self._previous)
+
+    def _poll(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                warnings.warn(
+                    "Failed reloading {}; keeping the loaded object: "
+                    "{}".format(self.model.fname(
+                        version=self.version, tags=self.tags, ext=self.ext),
+                        e))
+
+    def start(self):
+        """Loads the watched instance and starts polling it for changes.
+
+        Returns
+        -------
+        ModelWatcher
+            This watcher.
+        """
+        if self._current is None:
+            self.check()
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._poll, name='mlshed-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops polling the watched instance."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
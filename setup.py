@@ -16,6 +16,7 @@ TEST_REQUIRES = [
     'pytest', 'coverage', 'pytest-cov',
     # unmandatory dependencies of the package itself
     # 'azure-storage',
+    'numpy', 'joblib', 'pyyaml', 'tomli; python_version < "3.11"',
     # to be able to run `python setup.py checkdocs`
     'collective.checkdocs', 'pygments',
 ]
@@ -34,12 +35,20 @@ setuptools.setup(
     url='https://github.com/shaypal5/mlshed',
     packages=setuptools.find_packages(),
     include_package_data=True,
-    python_requires=">=3.5",
+    python_requires=">=3.7",
     install_requires=[
         INSTALL_REQUIRES
     ],
+    entry_points={
+        'console_scripts': [
+            'mlshed=mlshed.cli:main',
+        ],
+    },
     extras_require={
         'test': TEST_REQUIRES + INSTALL_REQUIRES,
+        # for YAML and TOML prefetch manifests
+        'yaml': ['PyYAML'],
+        'toml': ['tomli; python_version < "3.11"'],
         # 'azure': AZURE_REQUIRES + INSTALL_REQUIRES,
     },
     classifiers=[
@@ -51,9 +60,8 @@ setuptools.setup(
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
         'Topic :: Software Development :: Libraries',
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
@@ -0,0 +1,173 @@
+"""Shared fixtures for mlshed tests."""
+
+import types
+import datetime
+import itertools
+
+import pytest
+from azure.common import (
+    AzureHttpError,
+    AzureMissingResourceHttpError,
+)
+
+import mlshed.cfg
+import mlshed.azure
+import mlshed.negcache
+
+
+@pytest.fixture
+def base_dir(tmpdir, monkeypatch):
+    """Points the mlshed local store at a temporary directory."""
+    dpath = str(tmpdir.mkdir('mlshed_base_dir'))
+    monkeypatch.setattr(mlshed.cfg, '_base_dir', lambda: dpath)
+    return dpath
+
+
+class FakeBlobService(object):
+    """An in-memory stand-in for azure's BlockBlobService."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.blocks = {}
+        self.range_requests = []
+        # the number of polls server-side copies remain pending for
+        self.copy_polls = 1
+        self._pending_copies = {}
+        self._etags = itertools.count()
+
+    def _get(self, blob_name):
+        try:
+            return self.blobs[blob_name]
+        except KeyError:
+            raise AzureMissingResourceHttpError('Not found', 404)
+
+    def _put(self, blob_name, content, if_match=None, if_none_match=None,
+             metadata=None, **kwargs):
+        current = self.blobs.get(blob_name)
+        if if_none_match == '*' and current is not None:
+            raise AzureHttpError('Blob exists', 409)
+        if if_match is not None and (
+                current is None or current.properties.etag != if_match):
+            raise AzureHttpError('Condition not met', 412)
+        serial = next(self._etags)
+        self.blobs[blob_name] = types.SimpleNamespace(
+            name=blob_name,
+            content=content,
+            metadata=metadata or {},
+            properties=types.SimpleNamespace(
+                etag='0x{}'.format(serial),
+                content_length=len(content),
+                last_modified=datetime.datetime(
+                    2026, 1, 1, tzinfo=datetime.timezone.utc
+                ) + datetime.timedelta(seconds=serial),
+            ),
+        )
+
+    def list_blobs(self, container_name, prefix=None, delimiter=None,
+                   **kwargs):
+        prefix = prefix or ''
+        subfolders = set()
+        for name in sorted(self.blobs):
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                subfolder = prefix + rest.split(delimiter)[0] + delimiter
+                if subfolder not in subfolders:
+                    subfolders.add(subfolder)
+                    yield types.SimpleNamespace(name=subfolder)
+                continue
+            yield self.blobs[name]
+
+    def get_blob_to_text(self, container_name, blob_name, **kwargs):
+        blob = self._get(blob_name)
+        return types.SimpleNamespace(
+            content=blob.content.decode('utf-8'), properties=blob.properties)
+
+    def create_blob_from_text(self, container_name, blob_name, text,
+                              **kwargs):
+        self._put(blob_name, text.encode('utf-8'), **kwargs)
+
+    def get_blob_properties(self, container_name, blob_name, **kwargs):
+        blob = self._get(blob_name)
+        copy = getattr(blob.properties, 'copy', None)
+        if copy is not None and copy.status == 'pending':
+            self._pending_copies[blob_name] -= 1
+            if not self._pending_copies[blob_name]:
+                copy.status = 'success'
+        return blob
+
+    def make_blob_url(self, container_name, blob_name, **kwargs):
+        return 'https://fake.blob/{}/{}'.format(container_name, blob_name)
+
+    def copy_blob(self, container_name, blob_name, copy_source,
+                  source_if_match=None, **kwargs):
+        source = self._get(copy_source.split('/', 4)[-1])
+        if source_if_match is not None and \
+                source.properties.etag != source_if_match:
+            raise AzureHttpError('Condition not met', 412)
+        self._put(blob_name, source.content, metadata=dict(source.metadata))
+        copy = types.SimpleNamespace(
+            id='copy-{}'.format(blob_name),
+            status='pending' if self.copy_polls else 'success',
+            status_description=None,
+        )
+        self.blobs[blob_name].properties.copy = copy
+        self._pending_copies[blob_name] = self.copy_polls
+        return copy
+
+    def abort_copy_blob(self, container_name, blob_name, copy_id,
+                        **kwargs):
+        blob = self._get(blob_name)
+        if blob.properties.copy.id == copy_id:
+            blob.properties.copy.status = 'aborted'
+
+    def delete_blob(self, container_name, blob_name, **kwargs):
+        self._get(blob_name)
+        del self.blobs[blob_name]
+
+    def get_blob_to_bytes(self, container_name, blob_name, start_range=None,
+                          end_range=None, if_match=None, **kwargs):
+        blob = self._get(blob_name)
+        if if_match is not None and blob.properties.etag != if_match:
+            raise AzureHttpError('Condition not met', 412)
+        content = blob.content
+        if start_range is not None:
+            content = content[start_range:end_range + 1]
+        self.range_requests.append((blob_name, start_range, end_range))
+        return types.SimpleNamespace(
+            content=content, properties=blob.properties)
+
+    def get_blob_to_path(self, container_name, blob_name, file_path,
+                         **kwargs):
+        blob = self._get(blob_name)
+        with open(file_path, 'wb') as bfile:
+            bfile.write(blob.content)
+        return blob
+
+    def create_blob_from_path(self, container_name, blob_name, file_path,
+                              **kwargs):
+        with open(file_path, 'rb') as bfile:
+            self._put(blob_name, bfile.read(), **kwargs)
+
+    def put_block(self, container_name, blob_name, block, block_id,
+                  **kwargs):
+        self.blocks[(blob_name, block_id)] = block
+
+    def put_block_list(self, container_name, blob_name, block_list,
+                       **kwargs):
+        content = b''.join(
+            self.blocks.pop((blob_name, block.id)) for block in block_list)
+        self._put(blob_name, content, **kwargs)
+
+
+@pytest.fixture
+def blob_service(base_dir, monkeypatch):
+    """Replaces remote model store with an in-memory fake."""
+    service = FakeBlobService()
+    monkeypatch.setattr(mlshed.azure, '_blob_service', lambda: service)
+    monkeypatch.setattr(
+        mlshed.azure, 'SHED_CFG', {'azure': {'container_name': 'test'}})
+    monkeypatch.setattr(mlshed.negcache, '_MISSING', {})
+    monkeypatch.setattr(mlshed.negcache, '_LISTINGS', {})
+    return service
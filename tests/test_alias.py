@@ -0,0 +1,117 @@
+"""Test mutable aliases of model instances."""
+
+import os
+import errno
+
+import pytest
+
+from mlshed import Model
+from mlshed.cfg import _partial_fpath
+from mlshed.exceptions import (
+    MissingLocalModelError,
+    MissingRemoteModelError,
+)
+
+
+def test_aliases(blob_service):
+    model = Model(name='aliased', task='testing', default_ext='bin')
+    for version in ['1', '2']:
+        model.dump(version.encode() * 1000, version=version)
+        model.upload(version=version)
+    pointer = model.set_alias('prod', version='1')
+    assert pointer['fname'] == 'aliased_1.bin'
+    link = os.path.join(model.dirpath(), '.aliases', 'aliased', 'prod')
+    assert os.path.realpath(link) == os.path.realpath(
+        model.fpath(version='1'))
+    assert model.resolve_alias('prod') == ('1', None, 'bin')
+    assert model.load(alias='prod', source='local') == b'1' * 1000
+    # flipping the alias writes a single pointer blob
+    blobs_before = set(blob_service.blobs)
+    model.set_alias('prod', version='latest')
+    assert set(blob_service.blobs) == blobs_before
+    assert model.resolve_alias('prod') == ('2', None, 'bin')
+    assert model.resolve_alias('prod', source='local')[0] == '2'
+    # the aliased instance is in local store, so nothing is downloaded
+    del blob_service.range_requests[:]
+    model.download(alias='prod')
+    assert blob_service.range_requests == []
+    assert model.load(alias='prod', source='auto') == b'2' * 1000
+    # flipped while its instance is missing locally, the local symlink is
+    # removed rather than left pointing at the previous instance
+    model.set_alias('prod', version='1')
+    os.remove(model.fpath(version='2'))
+    model.set_alias('prod', version='2')
+    with pytest.raises(MissingLocalModelError):
+        model.resolve_alias('prod', source='local')
+    with pytest.raises(MissingLocalModelError):
+        model.load(alias='prod', source='local')
+    model.download(alias='prod')
+    assert model.load(alias='prod', source='local') == b'2' * 1000
+    assert [i.version for i in model.local_instances()] == ['1', '2']
+    model.delete_alias('prod')
+    with pytest.raises(MissingRemoteModelError):
+        model.resolve_alias('prod')
+    with pytest.raises(MissingLocalModelError):
+        model.resolve_alias('prod', source='local')
+    with pytest.raises(MissingRemoteModelError):
+        model.set_alias('prod', version='3')
+    with pytest.raises(ValueError):
+        model.set_alias('../prod', version='1')
+
+
+def test_alias_leftover_partial_link(blob_service):
+    model = Model(name='aliased', task='testing', default_ext='bin')
+    model.dump(b'1', version='1')
+    model.upload(version='1')
+    link = os.path.join(model.dirpath(), '.aliases', 'aliased', 'prod')
+    os.makedirs(os.path.dirname(link))
+    # a partial symlink left behind by an interrupted call
+    os.symlink('nowhere', _partial_fpath(link))
+    model.set_alias('prod', version='1')
+    assert os.path.realpath(link) == os.path.realpath(
+        model.fpath(version='1'))
+
+
+def test_alias_without_symlinks(blob_service, monkeypatch):
+    model = Model(name='aliased', task='testing', default_ext='bin')
+    model.dump(b'1', version='1')
+    model.upload(version='1')
+    model.set_alias('prod', version='1')
+
+    def _symlink(error_number):
+        def symlink(src, dst):
+            raise OSError(error_number, os.strerror(error_number))
+        return symlink
+
+    monkeypatch.setattr(os, 'symlink', _symlink(errno.EPERM))
+    model.set_alias('prod', version='1')
+    with pytest.raises(MissingLocalModelError):
+        model.resolve_alias('prod', source='local')
+    assert model.resolve_alias('prod') == ('1', None, 'bin')
+    monkeypatch.setattr(os, 'symlink', _symlink(errno.ENOSPC))
+    with pytest.raises(OSError):
+        model.set_alias('prod', version='1')
+
+
+def test_singleton_aliases(blob_service):
+    first = Model(name='first', task='testing', default_ext='bin',
+                  singleton=True)
+    second = Model(name='second', task='testing', default_ext='bin',
+                   singleton=True)
+    assert first.dirpath() == second.dirpath()
+    for model in [first, second]:
+        model.dump(model.name.encode(), version='1')
+        model.upload(version='1')
+        model.set_alias('prod', version='1')
+    for model in [first, second]:
+        assert model.resolve_alias('prod', source='local') == (
+            '1', None, 'bin')
+        assert model.load(alias='prod', source='local') == \
+            model.name.encode()
+    # a link to an instance of another model is never taken for one
+    link = os.path.join(first.dirpath(), '.aliases', 'first', 'prod')
+    os.remove(link)
+    os.symlink(os.path.relpath(second.fpath(version='1'),
+                               os.path.dirname(link)), link)
+    with pytest.raises(MissingLocalModelError):
+        first.resolve_alias('prod', source='local')
@@ -0,0 +1,51 @@
+"""Test background loading."""
+
+import asyncio
+import threading
+
+import pytest
+
+import mlshed.background
+from mlshed import Model
+from mlshed.exceptions import MissingLocalModelError
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    monkeypatch.setattr(mlshed.background, '_LOADS', {})
+    return mlshed.background
+
+
+def test_load_async(base_dir, loads):
+    model = Model(name='background', task='testing', lang='en')
+    model.dump({'a': 1}, version='1')
+    future = model.load_async(version='1')
+    assert future.result(timeout=10) == {'a': 1}
+    assert loads.status() == {
+        'testing/lang_en/background/background_1.pkl': 'ready'}
+    assert loads.all_ready()
+
+
+def test_loading_and_failed(base_dir, loads):
+    release = threading.Event()
+    loads.submit('blocked', release.wait)
+    failed = Model(name='missing', task='testing').load_async(
+        version='1', source='local')
+    with pytest.raises(MissingLocalModelError):
+        failed.result(timeout=10)
+    assert loads.loading() == ['blocked']
+    assert not loads.wait_all(timeout=0.01)
+    release.set()
+    assert loads.wait_all(timeout=10)
+    assert loads.status()['testing/missing/missing_1.pkl'] == 'failed'
+    assert not loads.all_ready()
+
+
+def test_aload(base_dir, loads):
+    model = Model(name='background', task='testing')
+    model.dump([1, 2], version='2')
+
+    async def _load_both():
+        return await asyncio.gather(
+            model.aload(version='2'), model.aload(version='2'))
+    assert asyncio.run(_load_both()) == [[1, 2], [1, 2]]
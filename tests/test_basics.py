@@ -15,3 +15,12 @@ def test_fname():
     name_with_tag = test_model1.fname(tags=[tag1])
     assert name_with_tag.endswith('.pkl')
     assert tag1 in name_with_tag
+
+
+def test_parse_fname():
+    assert test_model1.parse_fname('test1.pkl') == (None, None, 'pkl')
+    assert test_model1.parse_fname('test1_v2.pkl') == ('v2', None, 'pkl')
+    assert test_model1.parse_fname(
+        test_model1.fname(version='1.0', tags=['b', 'a'], ext='npy')
+    ) == ('1.0', ['a', 'b'], 'npy')
+    assert test_model1.parse_fname('test12.pkl') is None
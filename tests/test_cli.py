@@ -0,0 +1,97 @@
+"""Test the mlshed command-line interface."""
+
+import os
+
+from mlshed import Model
+from mlshed.cfg import _resource_dirpath
+from mlshed.cli import main
+
+
+def _add_instances(tmpdir, model, versions):
+    for version in versions:
+        source = tmpdir.join('source_{}.pkl'.format(version))
+        source.write('x' * 10)
+        model.add_local(str(source), version=version)
+
+
+def test_ls_and_du(base_dir, tmpdir, capsys):
+    model = Model(name='cli model', task='testing')
+    _add_instances(tmpdir, model, ['1', '2'])
+    assert main(['ls', 'cli model', '--task', 'testing']) == 0
+    out = capsys.readouterr().out
+    assert 'cli_model_1.pkl' in out
+    assert 'cli_model_2.pkl' in out
+    # partially written files are not counted
+    with open(os.path.join(model.dirpath(), '.cli_model_3.pkl.part'),
+              'w') as pfile:
+        pfile.write('x' * 10)
+    assert main(['du', '--task', 'testing']) == 0
+    assert '20.0B' in capsys.readouterr().out
+    assert main(['ls', '--task', 'missing']) == 1
+    assert 'No such directory' in capsys.readouterr().err
+    assert main(['du', '--task', 'missing']) == 1
+    assert not os.path.exists(_resource_dirpath(task='missing'))
+
+
+def test_prune(base_dir, tmpdir):
+    model = Model(name='cli model', task='testing')
+    _add_instances(tmpdir, model, ['1', '2', '3'])
+    for i, instance in enumerate(model.local_instances()):
+        os.utime(instance.fpath, (i, i))
+    assert main(['prune', 'cli model', '--task', 'testing', '-n']) == 0
+    assert len(model.local_instances()) == 3
+    assert main(['prune', 'cli model', '--task', 'testing']) == 0
+    assert [i.version for i in model.local_instances()] == ['3']
+
+
+def test_verify_and_repair(blob_service, capsys):
+    model = Model(name='verified', task='testing', default_ext='bin')
+    for version in ['1', '2', '3']:
+        model.dump(version.encode('utf-8') * 100, version=version)
+        model.upload(version=version)
+    model.dump(b'local only', version='4')
+    # rot a byte, truncate a file and leave a third one intact
+    with open(model.fpath(version='1'), 'r+b') as bfile:
+        bfile.write(b'!')
+    with open(model.fpath(version='2'), 'r+b') as bfile:
+        bfile.truncate(10)
+    assert main(['verify', '--task', 'testing']) == 1
+    err = capsys.readouterr().err
+    assert 'corrupted' in err
+    assert 'truncated' in err
+    assert 'no recorded checksum' in err
+    assert main(['verify', 'verified', '--task', 'testing', '--ext', 'bin',
+                 '-v', '1', '-v', '2', '-v', '3', '--repair']) == 0
+    assert 'repaired' in capsys.readouterr().err
+    assert model.load(version='1') == b'1' * 100
+    assert model.load(version='2') == b'2' * 100
+    assert main(['verify', '--task', 'testing']) == 0
+
+
+def test_verify_and_repair_dir(blob_service, tmpdir, capsys, monkeypatch):
+    model = Model(name='dm', task='testing')
+    source = tmpdir.mkdir('source_dir')
+    for i in range(6):
+        source.join('part_{}.bin'.format(i)).write(str(i) * 100)
+    model.upload(version='1', source_fpath=str(source))
+    dpath = model.fpath(version='1', ext='dir')
+    for i in range(4):
+        with open(os.path.join(dpath, 'part_{}.bin'.format(i)),
+                  'r+b') as bfile:
+            bfile.write(b'!')
+    downloads = []
+    download = Model.download
+
+    def _download(self, **kwargs):
+        downloads.append(kwargs)
+        return download(self, **kwargs)
+    monkeypatch.setattr(Model, 'download', _download)
+    assert main(['verify', 'dm', '--task', 'testing', '--ext', 'dir',
+                 '--repair', '-j', '6']) == 0
+    err = capsys.readouterr().err
+    assert err.count('repaired') == 1
+    assert err.count('corrupted') == 4
+    # the corrupted directory instance is downloaded once
+    assert len(downloads) == 1
+    assert sorted(os.listdir(model.dirpath())) == ['dm_1.dir']
+    assert main(['verify', 'dm', '--task', 'testing', '--ext', 'dir']) == 0
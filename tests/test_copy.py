@@ -0,0 +1,91 @@
+"""Test server-side copies of model instances."""
+
+import os
+
+import pytest
+
+import mlshed.azure
+from mlshed import Model
+from mlshed.exceptions import ModelCopyError
+
+
+def test_promote_and_copy_to(blob_service, monkeypatch):
+    monkeypatch.setattr(mlshed.azure, 'COPY_POLL_INTERVAL', 0)
+    model = Model(name='promoted', task='testing', default_ext='bin')
+    model.dump(b'v17 weights', version='v17')
+    model.upload(version='v17')
+    blob_service.copy_polls = 3
+    del blob_service.range_requests[:]
+    assert model.promote(['prod'], version='latest') == 'promoted_prod.bin'
+    # nothing was downloaded through this machine
+    assert blob_service.range_requests == []
+    entry = model.remote_index()['instances']['promoted_prod.bin']
+    assert entry['tags'] == ['prod']
+    assert entry['version'] is None
+    assert entry['hash'] == model.remote_index()['instances'][
+        'promoted_v17.bin']['hash']
+    assert model.load(tags=['prod'], source='remote') == b'v17 weights'
+    model.promote(['stable'], version='v17', keep_version=True)
+    assert model.load(
+        version='v17', tags=['stable'], source='remote') == b'v17 weights'
+    other = Model(name='promoted', task='serving', default_ext='bin',
+                  lang='en')
+    assert model.copy_to(other, version='v17') == 'promoted_v17.bin'
+    assert other.latest_version() == 'v17'
+    assert other.load(version='v17', source='remote') == b'v17 weights'
+
+
+def test_promote_sharded(blob_service, monkeypatch):
+    monkeypatch.setitem(mlshed.azure.SHED_CFG, 'shard_size', 1000)
+    blob_service.copy_polls = 0
+    model = Model(name='promoted', task='testing', default_ext='bin')
+    first = os.urandom(2500)
+    model.dump(first, version='1')
+    model.upload(version='1')
+    model.promote(['prod'], version='1')
+
+    def _shards(fname):
+        return {name for name in blob_service.blobs
+                if '/{}.shards/'.format(fname) in name}
+
+    # the copy owns shards of its own
+    assert len(_shards('promoted_prod.bin')) == 3
+    assert len(_shards('promoted_1.bin')) == 3
+    # so replacing the source, deleting its shards, leaves the copy intact
+    second = os.urandom(2500)
+    model.dump(second, version='1')
+    model.upload(version='1')
+    assert model.load(
+        tags=['prod'], source='remote', persist=False) == first
+    # and replacing the copy deletes the shards it owned
+    copied = _shards('promoted_prod.bin')
+    model.promote(['prod'], version='1')
+    assert len(_shards('promoted_prod.bin')) == 3
+    assert not copied & _shards('promoted_prod.bin')
+    assert model.load(
+        tags=['prod'], source='remote', persist=False) == second
+
+
+def test_copy_dir_to(blob_service, tmpdir):
+    blob_service.copy_polls = 0
+    model = Model(name='copied', task='testing')
+    source = tmpdir.mkdir('source_dir')
+    source.join('weights.bin').write('w')
+    source.mkdir('sub').join('config.json').write('{}')
+    model.upload(version='1', source_fpath=str(source))
+    other = Model(name='copied', task='serving')
+    other_fname = model.copy_to(other, version='1', ext='dir')
+    assert other_fname == 'copied_1.dir'
+    other.download(version='1', ext='dir')
+    dpath = other.fpath(version='1', ext='dir')
+    with open(os.path.join(dpath, 'sub', 'config.json')) as cfile:
+        assert cfile.read() == '{}'
+
+
+def test_copy_timeout(blob_service):
+    model = Model(name='stuck', task='testing', default_ext='bin')
+    model.dump(b'x', version='1')
+    model.upload(version='1')
+    blob_service.copy_polls = 10 ** 6
+    with pytest.raises(ModelCopyError):
+        model.promote(['prod'], version='1', timeout=0, poll_interval=0)
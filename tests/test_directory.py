@@ -0,0 +1,97 @@
+"""Test directory model instances."""
+
+import os
+
+import pytest
+
+from mlshed import Model
+from mlshed import catalog
+from mlshed.exceptions import ModelIntegrityError
+
+
+def _make_dir(tmpdir, contents):
+    source = tmpdir.mkdir('source')
+    for relpath, content in contents.items():
+        source.join(relpath).write_binary(content, ensure=True)
+    return str(source)
+
+
+def _read_dir(dpath):
+    contents = {}
+    for dirpath, _, fnames in os.walk(dpath):
+        for fname in fnames:
+            fpath = os.path.join(dirpath, fname)
+            with open(fpath, 'rb') as bfile:
+                contents[os.path.relpath(fpath, dpath)] = bfile.read()
+    return contents
+
+
+CONTENTS = {
+    'config.json': b'{}',
+    'tokenizer/vocab.txt': b'a\nb\n',
+    'weights/shard_0.bin': b'0' * 5000,
+    'weights/shard_1.bin': b'1' * 5000,
+}
+
+
+def test_add_local_dir(base_dir, tmpdir):
+    model = Model(name='bert', task='testing')
+    assert model.add_local(_make_dir(tmpdir, CONTENTS), version='1') == 'dir'
+    instances = model.local_instances()
+    assert [(i.version, i.ext) for i in instances] == [('1', 'dir')]
+    dpath = model.load(version='1', ext='dir')
+    assert dpath == model.fpath(version='1', ext='dir')
+    assert _read_dir(dpath) == CONTENTS
+
+
+def test_upload_and_download_dir(blob_service, tmpdir):
+    model = Model(name='bert', task='testing', default_ext='dir')
+    model.upload(source_fpath=_make_dir(tmpdir, CONTENTS), version='1',
+                 block_size=1024)
+    # one blob per file, plus the manifest publishing them
+    assert len([name for name in blob_service.blobs
+                if '/bert_1.dir' in name]) == len(CONTENTS) + 1
+    assert model.latest_version() == '1'
+    dpath = model.fpath(version='1')
+    os.rename(dpath, str(tmpdir.join('moved')))
+    dpath = model.load(version='latest', source='auto')
+    assert _read_dir(dpath) == CONTENTS
+    assert catalog.lookup(os.path.join(dpath, 'config.json')) is not None
+    assert os.listdir(model.dirpath()) == ['bert_1.dir']
+    # a corrupted file fails the download, leaving the local copy intact
+    shard = [blob for name, blob in blob_service.blobs.items()
+             if name.endswith('shard_1.bin')][0]
+    shard.content = b'2' + shard.content[1:]
+    with pytest.raises(ModelIntegrityError):
+        model.download(version='1', overwrite=True)
+    assert _read_dir(dpath) == CONTENTS
+    assert os.listdir(model.dirpath()) == ['bert_1.dir']
+
+
+def test_reupload_dir_deletes_replaced_files(blob_service, tmpdir):
+    blob_service.copy_polls = 0
+    model = Model(name='dirmodel', task='testing')
+    model.upload(version='1', source_fpath=_make_dir(tmpdir, CONTENTS))
+    model.promote(['prod'], version='1', ext='dir')
+
+    def _file_blobs(dname):
+        return sorted(
+            name for name in blob_service.blobs
+            if '/{}.files/'.format(dname) in name)
+    first_blobs = _file_blobs('dirmodel_1.dir')
+    assert len(first_blobs) == len(CONTENTS)
+    # the promoted copy owns file blobs of its own
+    assert len(_file_blobs('dirmodel_prod.dir')) == len(CONTENTS)
+    dpath = model.fpath(version='1', ext='dir')
+    with open(os.path.join(dpath, 'config.json'), 'wb') as cfile:
+        cfile.write(b'{"new": 1}')
+    model.upload(version='1', ext='dir')
+    second_blobs = _file_blobs('dirmodel_1.dir')
+    assert len(second_blobs) == len(CONTENTS)
+    assert not set(first_blobs) & set(second_blobs)
+    model.download(version='1', ext='dir', overwrite=True)
+    assert _read_dir(dpath)['config.json'] == b'{"new": 1}'
+    # replacing the source leaves the promoted copy intact
+    prod_dpath = model.fpath(tags=['prod'], ext='dir')
+    model.download(tags=['prod'], ext='dir')
+    assert _read_dir(prod_dpath) == CONTENTS
@@ -0,0 +1,40 @@
+"""Test that importing mlshed is lazy."""
+
+import sys
+import json
+import subprocess
+
+
+# modules only needed once a remote operation or (de)serialization takes
+# place; packages stand for all of their sub-modules
+HEAVY_MODULES = [
+    'azure', 'decore', 'numpy', 'joblib', 'tomli', 'mlshed.azure',
+    'mlshed._version',
+]
+
+_IMPORT_SCRIPT = """
+import sys
+import json
+import mlshed
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _imported_modules():
+    # a fresh interpreter, as other tests import everything
+    output = subprocess.check_output([sys.executable, '-c', _IMPORT_SCRIPT])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    imported = [
+        name for name in _imported_modules()
+        if any(name == heavy or name.startswith(heavy + '.')
+               for heavy in HEAVY_MODULES)
+    ]
+    assert imported == []
+
+
+def test_lazy_version():
+    import mlshed
+    assert isinstance(mlshed.__version__, str)
@@ -0,0 +1,89 @@
+"""Test the fanned out local layout and migrations between layouts."""
+
+import os
+
+import mlshed.cfg
+from mlshed import Model
+from mlshed import catalog
+from mlshed.cli import main
+from mlshed.cfg import fanout_dirname
+from mlshed.layout import migrate_layout
+
+
+def _set_layout(monkeypatch, layout):
+    monkeypatch.setattr(mlshed.cfg, 'SHED_CFG', {'local_layout': layout})
+
+
+def test_fanned_out_layout(base_dir, tmpdir, monkeypatch):
+    model = Model(name='fanned', task='testing', default_ext='bin')
+    model.dump(b'flat', version='1')
+    _set_layout(monkeypatch, 2)
+    fpath = model.dump(b'fanned', version='2')
+    fname = model.fname(version='2')
+    assert fpath == os.path.join(
+        model.dirpath(), fanout_dirname(fname), fname)
+    source = tmpdir.mkdir('source_dir')
+    source.join('weights.bin').write('w')
+    model.add_local(str(source), version='3')
+    # both layouts are read transparently
+    assert [i.version for i in model.local_instances()] == ['1', '2', '3']
+    assert model.load(version='1') == b'flat'
+    assert model.load(version='2') == b'fanned'
+    _set_layout(monkeypatch, 1)
+    assert model.load(version='2') == b'fanned'
+
+
+def test_migrate_layout(base_dir, tmpdir, monkeypatch, capsys):
+    model = Model(name='migrated', task='testing', default_ext='bin')
+    for version in ['1', '2']:
+        model.dump(version.encode(), version=version)
+    source = tmpdir.mkdir('source_dir')
+    source.join('weights.bin').write('w')
+    model.add_local(str(source), version='3')
+    catalog.record(model.fpath(version='1'), 'digest')
+    assert main(['migrate-layout', '--to', '2', '-n']) == 0
+    assert capsys.readouterr().out.count('(dry run) moving') == 3
+    assert not any(os.path.isdir(os.path.join(model.dirpath(), dname))
+                   for dname in os.listdir(model.dirpath())
+                   if not dname.endswith('.dir'))
+    moves = migrate_layout(2)
+    assert len(moves) == 3
+    _set_layout(monkeypatch, 2)
+    for version in ['1', '2']:
+        fname = model.fname(version=version)
+        assert model.fpath(version=version) == os.path.join(
+            model.dirpath(), fanout_dirname(fname), fname)
+        assert model.load(version=version) == version.encode()
+    assert catalog.lookup(model.fpath(version='1')) == 'digest'
+    assert os.path.isfile(os.path.join(
+        model.fpath(version='3', ext='dir'), 'weights.bin'))
+    assert migrate_layout(2) == []
+    assert len(migrate_layout(1)) == 3
+    assert sorted(os.listdir(model.dirpath())) == [
+        model.fname(version='1'), model.fname(version='2'),
+        model.fname(version='3', ext='dir')]
+    assert catalog.lookup(model.fpath(version='1')) == 'digest'
+
+
+def test_hex_named_directories(base_dir, monkeypatch):
+    # task, model and attribute directories named like fan-out directories
+    model = Model(name='ab', task='10', default_ext='bin', size='ff')
+    model.dump(b'1', version='1')
+    assert [i.version for i in model.local_instances()] == ['1']
+    assert len(migrate_layout(2)) == 1
+    _set_layout(monkeypatch, 2)
+    assert model.load(version='1') == b'1'
+    assert len(migrate_layout(1)) == 1
+    _set_layout(monkeypatch, 1)
+    assert model.fpath(version='1') == os.path.join(
+        model.dirpath(), model.fname(version='1'))
+
+
+def test_paths_are_not_created(base_dir, monkeypatch):
+    _set_layout(monkeypatch, 2)
+    model = Model(name='probed', task='testing', default_ext='bin')
+    fpath = model.fpath(version='1')
+    assert not os.path.exists(os.path.dirname(fpath))
+    assert os.listdir(model.dirpath()) == []
+    model.dump(b'1', version='1')
+    assert os.path.isfile(fpath)
@@ -0,0 +1,99 @@
+"""Test lazy model proxies."""
+
+import threading
+
+import pytest
+
+from mlshed import Model
+from mlshed.lazy import (
+    LazyModel,
+    is_loaded,
+    resolve,
+)
+
+
+class Predictor(object):
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, x):
+        return [w * x for w in self.weights]
+
+    def __call__(self, x):
+        return self.predict(x)
+
+
+def test_lazy_load(base_dir):
+    model = Model(name='lazy', task='testing')
+    model.dump(Predictor([1, 2]), version='1')
+    proxy = model.lazy_load(version='1')
+    assert not is_loaded(proxy)
+    assert 'not loaded' in repr(proxy)
+    assert proxy.predict(2) == [2, 4]
+    assert is_loaded(proxy)
+    assert proxy(3) == [3, 6]
+    assert isinstance(resolve(proxy), Predictor)
+
+
+def test_loads_exactly_once():
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def _loader():
+        calls.append(1)
+        return [1, 2, 3]
+    proxy = LazyModel(_loader)
+
+    def _use():
+        barrier.wait()
+        assert len(proxy) == 3
+    threads = [threading.Thread(target=_use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert proxy[1] == 2
+    assert 3 in proxy
+    assert list(proxy) == [1, 2, 3]
+
+
+def test_failed_load_is_retried():
+    attempts = []
+
+    def _loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise IOError()
+        return {'a': 1}
+    proxy = LazyModel(_loader)
+    with pytest.raises(IOError):
+        proxy['a']
+    assert proxy['a'] == 1
+    assert len(attempts) == 2
+
+
+def test_operators():
+    np = pytest.importorskip('numpy')
+    weights = np.arange(4)
+    proxy = LazyModel(lambda: weights)
+    assert not is_loaded(proxy)
+    assert ((proxy + 1) == weights + 1).all()
+    assert is_loaded(proxy)
+    assert ((1 - proxy) == 1 - weights).all()
+    assert ((2 * proxy) == 2 * weights).all()
+    assert proxy @ weights == weights @ weights
+    assert weights @ proxy == weights @ weights
+    assert ((proxy > 1) == (weights > 1)).all()
+    assert ((-proxy) == -weights).all()
+    assert len(proxy) == 4
+    scalar = LazyModel(lambda: 3)
+    assert scalar ** 2 == 9 and 2 ** scalar == 8
+    assert divmod(7, scalar) == (2, 1)
+    assert int(scalar) == 3 and float(scalar) == 3.0
+    assert [0, 1, 2, 3, 4][scalar] == 3
+    assert bool(LazyModel(lambda: Predictor([]))) is True
+    assert not LazyModel(lambda: [])
+    with pytest.raises(TypeError):
+        LazyModel(lambda: Predictor([])) + 1
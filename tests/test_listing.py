@@ -0,0 +1,126 @@
+"""Test remote listing and version discovery."""
+
+import threading
+
+import pytest
+
+import mlshed.azure
+import mlshed.listing
+from mlshed import Model
+from mlshed.exceptions import MissingRemoteModelError
+
+
+BLOBS = [
+    {'name': name, 'size': 3, 'etag': '0x1',
+     'last_modified': '2026-01-01T00:00:00+00:00'}
+    for name in [
+        'listed_v2.pkl', 'listed_v10.pkl', 'listed_prod_v11.pkl',
+        'listed_v12.npy', 'listed.pkl', 'unrelated_v99.pkl',
+    ]
+]
+
+
+@pytest.fixture
+def listing_calls(blob_service, monkeypatch):
+    calls = []
+
+    def _list_model_blobs(**kwargs):
+        calls.append(kwargs)
+        return BLOBS
+    monkeypatch.setattr(mlshed.listing, '_MEMORY_CACHE', {})
+    monkeypatch.setattr(mlshed.listing, 'list_model_blobs', _list_model_blobs)
+    return calls
+
+
+def test_remote_instances(listing_calls):
+    model = Model(name='listed', task='testing')
+    instances = model.remote_instances()
+    assert len(instances) == 5
+    prod = model.remote_instances(tags=['prod'])
+    assert [(i.version, i.fname) for i in prod] == [
+        ('v11', 'listed_prod_v11.pkl')]
+    assert len(listing_calls) == 1
+
+
+def test_latest_version(listing_calls):
+    model = Model(name='listed', task='testing')
+    assert model.latest_version() == 'v10'
+    assert model.latest_version(tags=['prod']) == 'v11'
+    assert model.latest_version(ext='npy') == 'v12'
+    with pytest.raises(MissingRemoteModelError):
+        model.latest_version(tags=['canary'])
+    assert len(listing_calls) == 1
+
+
+def test_listing_ttl(listing_calls, monkeypatch):
+    model = Model(name='listed', task='testing')
+    model.remote_instances()
+    # a new process reads the listing from the disk cache
+    monkeypatch.setattr(mlshed.listing, '_MEMORY_CACHE', {})
+    model.remote_instances()
+    assert len(listing_calls) == 1
+    model.remote_instances(refresh=True)
+    assert len(listing_calls) == 2
+    mlshed.listing.invalidate(model_name='listed', task='testing')
+    model.remote_instances()
+    assert len(listing_calls) == 3
+
+
+def test_index_resolution(listing_calls, blob_service, monkeypatch):
+    model = Model(name='indexed', task='testing')
+    for fname, version, tags in [
+            ('indexed_v9.pkl', 'v9', None),
+            ('indexed_v10.pkl', 'v10', None),
+            ('indexed_prod_v8.pkl', 'v8', ['prod'])]:
+        mlshed.azure.upload_model_index_entry(
+            model_name='indexed', file_name=fname, task='testing',
+            entry={'version': version, 'tags': tags, 'ext': 'pkl'})
+    assert model.latest_version() == 'v10'
+    assert model.latest_version(tags=['prod']) == 'v8'
+    assert listing_calls == []
+    # instances uploaded without indexing are found only on request
+    BLOBS.append({'name': 'indexed_v11.pkl', 'size': 3, 'etag': '0x1',
+                  'last_modified': '2026-01-01T00:00:00+00:00'})
+    try:
+        assert model.latest_version(refresh=True) == 'v10'
+        assert listing_calls == []
+        assert model.latest_version(include_unindexed=True) == 'v11'
+        assert len(listing_calls) == 1
+    finally:
+        BLOBS.pop()
+
+
+def test_index_optimistic_concurrency(blob_service, monkeypatch):
+    read_model_index = mlshed.azure.read_model_index
+    raced = []
+
+    def _racing_read(**kwargs):
+        index, etag = read_model_index(**kwargs)
+        if not raced:
+            # another writer updates the index right after our first read
+            raced.append(True)
+            mlshed.azure.upload_model_index_entry(
+                file_name='other.pkl', entry={'version': None}, **kwargs)
+        return index, etag
+    monkeypatch.setattr(mlshed.azure, 'read_model_index', _racing_read)
+    index = mlshed.azure.upload_model_index_entry(
+        model_name='raced', file_name='raced_v1.pkl', entry={'version': 'v1'})
+    assert sorted(index['instances']) == ['other.pkl', 'raced_v1.pkl']
+
+
+def test_concurrent_refreshes(listing_calls):
+    model = Model(name='listed', task='testing')
+    errors = []
+
+    def _refresh():
+        try:
+            model.remote_instances(refresh=True)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=_refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(listing_calls) == 8
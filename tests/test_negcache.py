@@ -0,0 +1,73 @@
+"""Test the negative cache of blobs missing from model store."""
+
+import pytest
+
+import mlshed.negcache
+from mlshed import Model
+from mlshed.exceptions import MissingRemoteModelError
+
+
+@pytest.fixture
+def head_calls(blob_service, monkeypatch):
+    calls = []
+    original = blob_service.get_blob_properties
+
+    def _get_blob_properties(container_name, blob_name, **kwargs):
+        calls.append(blob_name)
+        return original(container_name, blob_name, **kwargs)
+    monkeypatch.setattr(
+        blob_service, 'get_blob_properties', _get_blob_properties)
+    return calls
+
+
+def test_missing_blobs_are_cached(head_calls, monkeypatch):
+    model = Model(name='probed', task='testing', default_ext='bin')
+    for _ in range(3):
+        with pytest.raises(MissingRemoteModelError):
+            model.download(version='1')
+    assert len(head_calls) == 1
+    # blobs written by this process are dropped from the cache
+    model.dump(b'x', version='1')
+    model.upload(version='1')
+    model.download(version='1', overwrite=True)
+    assert model.load(version='1', source='remote') == b'x'
+    # with a time-to-live of 0, the cache is disabled
+    monkeypatch.setattr(
+        mlshed.negcache, 'SHED_CFG', {'negative_cache_ttl': 0})
+    del head_calls[:]
+    for _ in range(2):
+        with pytest.raises(MissingRemoteModelError):
+            model.download(version='2')
+    assert len(head_calls) == 2
+
+
+def test_listings_feed_the_cache(head_calls):
+    model = Model(name='listed', task='testing', default_ext='bin')
+    model.dump(b'x', version='1')
+    model.upload(version='1')
+    assert [i.version for i in model.remote_instances(refresh=True)] == [
+        '1']
+    del head_calls[:]
+    for version in ['2', '3']:
+        with pytest.raises(MissingRemoteModelError):
+            model.download(version=version)
+    assert head_calls == []
+    model.download(version='1', overwrite=True)
+    assert set(head_calls) == {'mlshed/testing/listed/listed_1.bin'}
+
+
+def test_disk_cache(head_calls, monkeypatch):
+    monkeypatch.setattr(
+        mlshed.negcache, 'SHED_CFG', {'negative_cache_disk': 'true'})
+    model = Model(name='probed', task='testing', default_ext='bin')
+    with pytest.raises(MissingRemoteModelError):
+        model.download(version='1')
+    # a new process reads the cache from disk
+    monkeypatch.setattr(mlshed.negcache, '_MISSING', {})
+    with pytest.raises(MissingRemoteModelError):
+        model.download(version='1')
+    assert len(head_calls) == 1
+    mlshed.negcache.clear()
+    with pytest.raises(MissingRemoteModelError):
+        model.download(version='1')
+    assert len(head_calls) == 2
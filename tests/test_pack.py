@@ -0,0 +1,72 @@
+"""Test packing many small model instances into few blobs."""
+
+import os
+
+import pytest
+
+from mlshed import Model
+from mlshed import catalog
+from mlshed.pack import (
+    pack_instances,
+    unpack_instances,
+)
+from mlshed.exceptions import (
+    MissingRemoteModelError,
+    ModelIntegrityError,
+)
+
+
+def _customer_models(n):
+    return [Model(name='churn', task='testing', default_ext='bin',
+                  customer='c{}'.format(i)) for i in range(n)]
+
+
+def test_pack_and_unpack(blob_service):
+    models = _customer_models(50)
+    for i, model in enumerate(models):
+        model.dump('model {}'.format(i).encode() * 10, version='1')
+    specs = [(model, {'version': '1'}) for model in models]
+    pack_fname = pack_instances(specs[:30], task='testing')
+    assert pack_fname.endswith('.pack')
+    pack_instances(specs[30:], task='testing', pack_name='second')
+    # a newer pack holding an updated instance takes precedence
+    models[0].dump(b'updated', version='1')
+    pack_instances(specs[:1], task='testing', pack_name='third')
+    for model in models:
+        os.remove(model.fpath(version='1'))
+    del blob_service.range_requests[:]
+    fpaths = unpack_instances(specs, task='testing', max_gap=1024)
+    assert fpaths == [model.fpath(version='1') for model in models]
+    # an index read and a member read per pack
+    assert len(blob_service.range_requests) == 6
+    with open(fpaths[0], 'rb') as mfile:
+        assert mfile.read() == b'updated'
+    for i, model in enumerate(models[1:], 1):
+        assert model.load(version='1') == 'model {}'.format(i).encode() * 10
+        assert catalog.lookup(model.fpath(version='1')) is not None
+    # instances in local store are not fetched again
+    del blob_service.range_requests[:]
+    unpack_instances(specs, task='testing')
+    assert blob_service.range_requests == []
+    with pytest.raises(MissingRemoteModelError):
+        unpack_instances([(models[0], {'version': '2'})], task='testing')
+
+
+def test_unpack_coalescing_and_verification(blob_service):
+    models = _customer_models(10)
+    for model in models:
+        model.dump(os.urandom(1000))
+    pack_fname = pack_instances(models)
+    for model in models:
+        os.remove(model.fpath())
+    del blob_service.range_requests[:]
+    # every other member, with gaps of about 1KB between them
+    unpack_instances(models[::2], max_gap=0)
+    assert len(blob_service.range_requests) == 1 + 5
+    del blob_service.range_requests[:]
+    unpack_instances(models[1::2], max_gap=2048)
+    assert len(blob_service.range_requests) == 1 + 1
+    blob = blob_service.blobs['mlshed/.packs/' + pack_fname]
+    blob.content = b'x' * 100 + blob.content[100:]
+    with pytest.raises(ModelIntegrityError):
+        unpack_instances(models[:1], overwrite=True)
@@ -0,0 +1,77 @@
+"""Test manifests and prefetching."""
+
+import json
+
+import pytest
+
+from mlshed import Model, prefetch
+from mlshed.prefetch import load_manifest
+from mlshed.exceptions import InvalidManifestError
+
+
+MANIFEST = {
+    'defaults': {'task': 'testing'},
+    'models': [
+        {'name': 'prefetched', 'versions': [1, 2], 'priority': 5},
+        {'name': 'other', 'version': 'v3', 'tags': ['prod'],
+         'attributes': {'lang': 'en'}},
+    ],
+}
+
+
+def test_load_manifest(tmpdir):
+    for fname, content in [
+            ('manifest.json', json.dumps(MANIFEST)),
+            ('manifest.toml', (
+                "[defaults]\ntask = 'testing'\n"
+                "[[models]]\nname = 'prefetched'\nversions = [1, 2]\n"
+                "priority = 5\n"
+                "[[models]]\nname = 'other'\nversion = 'v3'\n"
+                "tags = ['prod']\nattributes = {lang = 'en'}\n"))]:
+        fpath = tmpdir.join(fname)
+        fpath.write(content)
+        entries = load_manifest(str(fpath))
+        assert [e.version for e in entries] == ['1', '2', 'v3']
+        assert entries[0].priority == 5
+        assert entries[2].model.kwargs == {'lang': 'en'}
+        assert entries[2].model.task == 'testing'
+
+
+def test_bad_manifest():
+    with pytest.raises(InvalidManifestError):
+        load_manifest({'defaults': {}})
+    with pytest.raises(InvalidManifestError):
+        load_manifest([{'version': '1'}])
+
+
+def test_prefetch_local(base_dir, tmpdir):
+    source = tmpdir.join('source.pkl')
+    source.write('x')
+    model = Model(name='prefetched', task='testing')
+    for version in ['1', '2']:
+        model.add_local(str(source), version=version)
+    manifest = {'defaults': MANIFEST['defaults'],
+                'models': MANIFEST['models'][:1]}
+    prefetcher = prefetch(manifest, max_workers=2)
+    paths = prefetcher.wait(name='prefetched', timeout=10)
+    assert paths == [model.fpath(version='1'), model.fpath(version='2')]
+    assert prefetcher.ready()
+    assert prefetcher.pending() == []
+    with pytest.raises(KeyError):
+        prefetcher.ready(name='misspelled')
+    with pytest.raises(KeyError):
+        prefetcher.wait(name='prefetched', version='3')
+
+
+def test_prefetch_latest(blob_service):
+    model = Model(name='prefetched', task='testing', default_ext='bin')
+    for version in ['1', '2']:
+        model.dump(version.encode(), version=version)
+        model.upload(version=version)
+    prefetcher = prefetch({'defaults': {'task': 'testing', 'ext': 'bin'},
+                           'models': [{'name': 'prefetched',
+                                       'version': 'latest'}]})
+    assert prefetcher.wait(version='latest', timeout=10) == [
+        model.fpath(version='2')]
+    assert prefetcher.ready(version='2')
+    assert prefetcher.entries[0].resolved_version == '2'
@@ -0,0 +1,105 @@
+"""Test loading model instances in worker processes."""
+
+import os
+import errno
+import tempfile
+import multiprocessing
+
+import pytest
+
+import mlshed.procpool
+from mlshed import Model
+from mlshed.procpool import (
+    bulk_load,
+    ResidentModelPool,
+)
+from mlshed.serialization import OutOfBandPickleFormat
+from mlshed.exceptions import MissingLocalModelError
+
+np = pytest.importorskip('numpy')
+
+# worker processes must inherit the patched local store directory
+FORK = multiprocessing.get_context('fork')
+
+
+class Doubler(object):
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, x):
+        return self.weights * x
+
+
+def test_bulk_load(base_dir):
+    first = Model(name='first', task='testing')
+    second = Model(name='second', task='testing')
+    first.dump({'weights': np.arange(1000)}, version='1')
+    second.dump([1, 2], version='1')
+    second.dump([3, 4], version='2')
+    specs = [
+        (first, {'version': '1'}),
+        (second, {'version': '1'}),
+        (second, {'version': '2'}),
+    ]
+    loaded = bulk_load(specs, max_workers=2, mp_context=FORK)
+    assert np.array_equal(loaded[0]['weights'], np.arange(1000))
+    assert not loaded[0]['weights'].flags.writeable
+    assert loaded[1:] == [[1, 2], [3, 4]]
+    with pytest.raises(MissingLocalModelError):
+        bulk_load([(first, {'version': '7', 'source': 'local'})],
+                  mp_context=FORK)
+
+
+def test_bulk_load_tmp_dir(base_dir, tmpdir, monkeypatch):
+    model = Model(name='large', task='testing')
+    model.dump({'weights': np.arange(1000)}, version='1')
+    shm_dir = str(tmpdir.mkdir('shm'))
+    monkeypatch.setattr(mlshed.procpool, 'SHED_CFG',
+                        {'procpool_tmp_dir': shm_dir})
+    assert mlshed.procpool._shared_tmp_dir() == shm_dir
+    dumped = []
+    serialize = OutOfBandPickleFormat.serialize
+
+    # the shared memory directory is full
+    def _serialize(self, obj, fpath, **kwargs):
+        dumped.append(os.path.dirname(fpath))
+        if fpath.startswith(shm_dir):
+            raise OSError(errno.ENOSPC, "No space left on device.")
+        return serialize(self, obj, fpath, **kwargs)
+
+    monkeypatch.setattr(OutOfBandPickleFormat, 'serialize', _serialize)
+    loaded = bulk_load([(model, {'version': '1'})], mp_context=FORK)
+    assert np.array_equal(loaded[0]['weights'], np.arange(1000))
+    assert os.listdir(shm_dir) == []
+    # other errors are raised
+    with pytest.raises(OSError):
+        mlshed.procpool._load_to_shared_file(
+            model, {'version': '1'}, str(tmpdir.join('missing')))
+    # the fallback applies in the worker; check it in this process too
+    del dumped[:]
+    fpath = mlshed.procpool._load_to_shared_file(
+        model, {'version': '1'}, shm_dir)
+    os.remove(fpath)
+    assert dumped == [shm_dir, tempfile.gettempdir()]
+
+
+def test_resident_pool(base_dir):
+    model = Model(name='doubler', task='testing')
+    model.dump(Doubler(2), version='1')
+    model.dump(Doubler(3), version='2')
+    specs = {
+        'v1': (model, {'version': '1'}),
+        'v2': (model, {'version': '2'}),
+        'missing': (model, {'version': '3', 'source': 'local'}),
+    }
+    with ResidentModelPool(specs, processes=2, mp_context=FORK) as pool:
+        assert pool.keys() == ['missing', 'v1', 'v2']
+        assert pool['v1'].predict(5) == 10
+        assert pool['v2'].predict(x=5) == 15
+        with pytest.raises(AttributeError):
+            pool['v1'].transform(5)
+        with pytest.raises(MissingLocalModelError):
+            pool['missing'].predict(5)
+        with pytest.raises(KeyError):
+            pool['v3']
@@ -0,0 +1,104 @@
+"""Test serialization formats."""
+
+import pytest
+
+from mlshed import Model
+from mlshed.serialization import SerializationFormat
+from mlshed.exceptions import (
+    MissingLocalModelError,
+    UnsupportedFormatError,
+)
+
+
+def test_by_name():
+    assert SerializationFormat.by_name('pkl').name == 'pickle'
+    assert SerializationFormat.by_name('.NPY').supports_mmap
+    assert not SerializationFormat.by_name('npz').supports_mmap
+    with pytest.raises(UnsupportedFormatError):
+        SerializationFormat.by_name('docx')
+
+
+def test_pickle_dump_load(base_dir):
+    model = Model(name='serialized', task='testing')
+    obj = {'weights': [1, 2, 3]}
+    fpath = model.dump(obj, version='1')
+    assert fpath == model.fpath(version='1')
+    assert model.load(version='1') == obj
+    with pytest.raises(UnsupportedFormatError):
+        model.load(version='1', mmap=True)
+    with pytest.raises(MissingLocalModelError):
+        model.load(version='2')
+
+
+def test_raw_mmap(base_dir):
+    model = Model(name='serialized', task='testing', default_ext='bin')
+    model.dump(b'abc')
+    assert model.load() == b'abc'
+    assert model.load(mmap=True)[:] == b'abc'
+
+
+def test_numpy_formats(base_dir):
+    np = pytest.importorskip('numpy')
+    model = Model(name='serialized', task='testing')
+    array = np.arange(10)
+    model.dump(array, ext='npy')
+    loaded = model.load(ext='npy', mmap=True)
+    assert isinstance(loaded, np.memmap)
+    assert (loaded == array).all()
+    model.dump({'a': array}, ext='npz')
+    assert (model.load(ext='npz')['a'] == array).all()
+
+
+def test_joblib_format(base_dir):
+    np = pytest.importorskip('numpy')
+    pytest.importorskip('joblib')
+    model = Model(name='serialized', task='testing', default_ext='joblib')
+    model.dump({'w': np.ones(5)})
+    loaded = model.load(mmap=True)
+    assert isinstance(loaded['w'], np.memmap)
+
+
+def test_mmap_survives_replace(base_dir):
+    np = pytest.importorskip('numpy')
+    model = Model(name='mapped', task='testing', default_ext='npy')
+    model.dump(np.zeros(1000))
+    mapped = model.load(mmap=True)
+    assert not mapped.flags.writeable
+    # replacing the instance leaves existing maps of the old file intact
+    model.dump(np.ones(10))
+    assert mapped.shape == (1000,)
+    assert mapped.sum() == 0
+    assert model.load().shape == (10,)
+    assert [i.ext for i in model.local_instances()] == ['npy']
+
+
+def test_out_of_band_pickle(base_dir):
+    np = pytest.importorskip('numpy')
+    model = Model(name='oob', task='testing', default_ext='pkl5')
+    obj = {
+        'weights': np.arange(1000, dtype='float64'),
+        'strided': np.arange(20)[::2],
+        'meta': {'name': 'oob'},
+    }
+    model.dump(obj)
+    for mmap in [False, True]:
+        loaded = model.load(mmap=mmap)
+        assert loaded['meta'] == obj['meta']
+        assert (loaded['weights'] == obj['weights']).all()
+        assert (loaded['strided'] == obj['strided']).all()
+        assert loaded['weights'].ctypes.data % 64 == 0
+        assert loaded['weights'].flags.writeable != mmap
+
+
+def test_bundle(base_dir):
+    model = Model(name='bundled', task='testing', default_ext='bundle')
+    members = {'vocab.json': b'{"a": 1}', 'weights.bin': b'w' * 1000}
+    model.dump(members, version='1')
+    assert model.load(version='1') == members
+    loaded = model.load(version='1', mmap=True)
+    assert isinstance(loaded['weights.bin'], memoryview)
+    assert loaded['weights.bin'].readonly
+    assert loaded['weights.bin'] == members['weights.bin']
+    assert model.load(version='1', member='vocab.json') == b'{"a": 1}'
+    with pytest.raises(KeyError):
+        model.load(version='1', member='missing.txt')
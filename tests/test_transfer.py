@@ -0,0 +1,313 @@
+"""Test streaming transfers to and from model store."""
+
+import os
+import pickle
+import hashlib
+
+import pytest
+
+import mlshed.azure
+
+from mlshed import Model
+from mlshed import catalog
+from mlshed.azure import model_blob_writer
+from mlshed.exceptions import (
+    ModelIntegrityError,
+    UnsupportedFormatError,
+)
+from mlshed.serialization import SerializationFormat
+
+
+def _blob(blob_service, fname):
+    for name, blob in blob_service.blobs.items():
+        if name.endswith('/' + fname):
+            return blob
+    raise KeyError(fname)
+
+
+def test_dump_and_upload(blob_service):
+    model = Model(name='streamed', task='testing')
+    obj = {'weights': list(range(10000))}
+    nbytes = model.dump_and_upload(
+        obj, version='1', block_size=1024, max_connections=2)
+    blob = _blob(blob_service, 'streamed_1.pkl')
+    assert len(blob.content) == nbytes
+    assert pickle.loads(blob.content) == obj
+    assert not os.path.exists(model.fpath(version='1'))
+    index = model.remote_index()
+    assert index['instances']['streamed_1.pkl']['size'] == nbytes
+    assert model.latest_version() == '1'
+
+
+def test_dump_and_upload_write_through(blob_service):
+    model = Model(name='streamed', task='testing')
+    model.dump_and_upload(b'x' * 5000, ext='bin', write_through=True,
+                          block_size=1000)
+    assert model.load(ext='bin') == b'x' * 5000
+    assert _blob(blob_service, 'streamed.bin').content == b'x' * 5000
+
+
+def test_aborted_writer(blob_service, tmpdir):
+    tee_path = str(tmpdir.join('tee.bin'))
+    with pytest.raises(RuntimeError):
+        with model_blob_writer(
+                model_name='aborted', file_name='aborted.bin',
+                tee_path=tee_path, block_size=10) as writer:
+            writer.write(b'y' * 25)
+            raise RuntimeError()
+    assert blob_service.blobs == {}
+    assert os.listdir(str(tmpdir)) == ['mlshed_base_dir']
+
+
+def test_load_remote_streaming(blob_service, tmpdir):
+    model = Model(name='remote', task='testing')
+    obj = {'weights': list(range(1000))}
+    model.dump_and_upload(obj, version='v1')
+    model.dump_and_upload(obj, version='v2')
+    assert model.load(source='remote', version='latest', persist=False) == obj
+    assert model.local_instances() == []
+    assert model.load(source='remote', version='v1') == obj
+    assert [i.version for i in model.local_instances()] == ['v1']
+
+
+def test_load_remote_buffered(blob_service, monkeypatch):
+    np = pytest.importorskip('numpy')
+    monkeypatch.setattr(mlshed.azure, 'DEFAULT_BLOCK_SIZE', 256)
+    for ext in ['npy', 'pkl5']:
+        model = Model(name='remote', task='testing', default_ext=ext)
+        model.dump_and_upload(np.arange(1000))
+        del blob_service.range_requests[:]
+        loaded = model.load(source='remote', persist=False)
+        assert (loaded == np.arange(1000)).all()
+        assert len(blob_service.range_requests) > 1
+    assert model.local_instances() == []
+
+
+def test_pipelined_load_and_verify(blob_service, monkeypatch):
+    monkeypatch.setattr(mlshed.azure, 'DEFAULT_BLOCK_SIZE', 512)
+    model = Model(name='pipelined', task='testing')
+    obj = {'weights': bytes(20000)}
+    model.dump_and_upload(obj, version='1')
+    assert model.load(source='remote', version='1') == obj
+    assert [i.version for i in model.local_instances()] == ['1']
+    blob = _blob(blob_service, 'pipelined_1.pkl')
+    assert len(blob_service.range_requests) == -(-len(blob.content) // 512)
+    # corrupt the blob behind the index's back
+    os.remove(model.fpath(version='1'))
+    middle = len(blob.content) // 2
+    blob.content = blob.content[:middle] + b'\1' + blob.content[middle + 1:]
+    for persist in [True, False]:
+        with pytest.raises(ModelIntegrityError):
+            model.load(source='remote', version='1', persist=persist)
+    assert model.local_instances() == []
+    assert model.load(
+        source='remote', version='1', persist=False, verify=False) != obj
+
+
+def test_inline_checksums(blob_service):
+    model = Model(name='checked', task='testing', default_ext='bin')
+    fpath = model.dump(b'z' * 3000, version='1')
+    model.upload(version='1', update_index=False, block_size=1000)
+    digest = catalog.lookup(fpath)
+    assert digest == hashlib.blake2b(b'z' * 3000).hexdigest()
+    blob = _blob(blob_service, 'checked_1.bin')
+    assert blob.metadata == {'blake2b': digest}
+    # without an index, downloads are verified against blob metadata
+    os.remove(fpath)
+    model.download(version='1')
+    assert catalog.lookup(fpath) == digest
+    blob.content = b'y' + blob.content[1:]
+    with pytest.raises(ModelIntegrityError):
+        model.download(version='1', overwrite=True)
+    assert catalog.lookup(fpath) == digest
+    model.download(version='1', overwrite=True, verify=False)
+    assert catalog.lookup(fpath) != digest
+    # a modified file no longer matches its record
+    model.dump(b'x', version='2')
+    model.upload(version='2', update_index=False)
+    os.utime(model.fpath(version='2'), ns=(0, 0))
+    assert catalog.lookup(model.fpath(version='2')) is None
+
+
+def test_fetch_bundle_member(blob_service):
+    model = Model(name='bundled', task='testing', default_ext='bundle')
+    members = {'vocab.json': b'{"a": 1}', 'weights.bin': b'w' * 100000}
+    model.dump_and_upload(members, version='1')
+    del blob_service.range_requests[:]
+    fpath = model.download(version='latest', member='vocab.json')
+    with open(fpath, 'rb') as mfile:
+        assert mfile.read() == b'{"a": 1}'
+    # one range read for the index, and one for the member
+    assert len(blob_service.range_requests) == 2
+    assert model.local_instances() == []
+    assert model.load(
+        version='1', member='weights.bin', source='remote',
+        persist=False) == members['weights.bin']
+    _blob(blob_service, 'bundled_1.bundle').content = b'v' * 100000 + \
+        _blob(blob_service, 'bundled_1.bundle').content[100000:]
+    with pytest.raises(ModelIntegrityError):
+        model.load(version='1', member='weights.bin', source='remote')
+
+
+def test_sharded_upload_and_download(blob_service, monkeypatch):
+    monkeypatch.setitem(mlshed.azure.SHED_CFG, 'shard_size', 1000)
+    model = Model(name='sharded', task='testing', default_ext='bin')
+    content = os.urandom(3500)
+    fpath = model.dump(content, version='1')
+    model.upload(version='1', block_size=300)
+    digest = hashlib.blake2b(content).hexdigest()
+    assert catalog.lookup(fpath) == digest
+    shards = sorted(
+        name for name in blob_service.blobs if '.shards/' in name)
+    assert len(shards) == 4
+    assert b''.join(
+        blob_service.blobs[name].content for name in shards) == content
+    index = model.remote_index()
+    assert index['instances']['sharded_1.bin']['size'] == 3500
+    # the first download of each shard fails, and is retried on its own
+    failed = set()
+    original = blob_service.get_blob_to_bytes
+
+    def _flaky(container_name, blob_name, **kwargs):
+        if '.shards/' in blob_name and blob_name not in failed:
+            failed.add(blob_name)
+            raise IOError("Connection reset.")
+        return original(container_name, blob_name, **kwargs)
+
+    monkeypatch.setattr(blob_service, 'get_blob_to_bytes', _flaky)
+    os.remove(fpath)
+    model.download(version='1', chunk_size=256)
+    assert failed == set(shards)
+    with open(fpath, 'rb') as mfile:
+        assert mfile.read() == content
+    assert catalog.lookup(fpath) == digest
+    # streamed loads read the shards in order
+    assert model.load(
+        version='1', source='remote', persist=False) == content
+    # a corrupted shard fails verification on every attempt
+    blob_service.blobs[shards[2]].content = b'x' * 1000
+    with pytest.raises(ModelIntegrityError):
+        model.download(version='1', overwrite=True)
+    with open(fpath, 'rb') as mfile:
+        assert mfile.read() == content
+
+
+def test_sharded_reupload(blob_service, monkeypatch):
+    monkeypatch.setitem(mlshed.azure.SHED_CFG, 'shard_size', 1000)
+    model = Model(name='resharded', task='testing', default_ext='bin')
+    model.dump(os.urandom(2500), version='1')
+    model.upload(version='1')
+    first = {name for name in blob_service.blobs if '.shards/' in name}
+    assert len(first) == 3
+    content = os.urandom(2500)
+    model.dump(content, version='1')
+    model.upload(version='1')
+    # the shards of the replaced instance are deleted
+    second = {name for name in blob_service.blobs if '.shards/' in name}
+    assert len(second) == 3
+    assert not first & second
+    assert model.load(
+        version='1', source='remote', persist=False) == content
+    # unless asked to keep them
+    model.upload(version='1', delete_previous=False)
+    assert second < {
+        name for name in blob_service.blobs if '.shards/' in name}
+
+
+def test_failed_streaming_load(blob_service, monkeypatch):
+    monkeypatch.setattr(mlshed.azure, 'DEFAULT_BLOCK_SIZE', 512)
+    monkeypatch.setattr(mlshed.azure, 'DEFAULT_MAX_CONNECTIONS', 1)
+    model = Model(name='failing', task='testing')
+    model.dump_and_upload(list(range(5000)), version='1')
+    blob = _blob(blob_service, 'failing_1.pkl')
+    # corrupted both in content and in its tail
+    blob.content = b'\0' + blob.content[1:-1] + b'\0'
+    del blob_service.range_requests[:]
+    with pytest.raises(pickle.UnpicklingError):
+        model.load(source='remote', version='1')
+    # the rest of the blob is neither downloaded nor verified
+    assert len(blob_service.range_requests) < len(blob.content) // 512
+    assert model.local_instances() == []
+    assert os.listdir(model.dirpath()) == []
+
+
+def test_downloaded_member_follows_bundle(blob_service):
+    model = Model(name='bundled', task='testing', default_ext='bundle')
+    model.dump_and_upload({'vocab.json': b'1'}, version='1')
+    fpath = model.download(version='1', member='vocab.json')
+    assert model.load(version='1', member='vocab.json', source='auto') == b'1'
+    del blob_service.range_requests[:]
+    assert model.download(version='1', member='vocab.json') == fpath
+    assert blob_service.range_requests == []
+    # the bundle is replaced, so the downloaded member is stale
+    model.dump_and_upload({'vocab.json': b'2'}, version='1')
+    assert model.load(version='1', member='vocab.json', source='auto') == b'2'
+    model.dump_and_upload({'vocab.json': b'3'}, version='1')
+    with open(model.download(version='1', member='vocab.json'), 'rb') as f:
+        assert f.read() == b'3'
+    for member in ['../../escaped', '/etc/passwd', 'a/../../b', '.hidden']:
+        with pytest.raises(ValueError):
+            model.download(version='1', member=member)
+
+
+def test_upload_indexes_digest(blob_service, monkeypatch):
+    model = Model(name='indexed', task='testing', default_ext='bin')
+    fpath = model.dump(b'i' * 1000, version='1')
+    # the index does not depend on the local catalog
+    monkeypatch.setattr(catalog, 'lookup', lambda fpath: None)
+    model.upload(version='1')
+    digest = hashlib.blake2b(b'i' * 1000).hexdigest()
+    assert model.remote_index()['instances']['indexed_1.bin']['hash'] == \
+        'blake2b:{}'.format(digest)
+    blob_name, uploaded_digest = mlshed.azure.upload_model_with_digest(
+        model_name='indexed', file_path=fpath, task='testing')
+    assert blob_name.endswith('/indexed_1.bin')
+    assert uploaded_digest == digest
+    # upload_model returns the blob name alone, as it always has
+    assert mlshed.azure.upload_model(
+        model_name='indexed', file_path=fpath, task='testing') == blob_name
+
+
+def _format_samples():
+    np = pytest.importorskip('numpy')
+    pytest.importorskip('joblib')
+    return {
+        'pickle': {'weights': list(range(100))},
+        'pickle5-oob': {'weights': np.arange(1000)},
+        'joblib': {'weights': np.arange(1000)},
+        'npy': np.arange(1000),
+        'npz': {'weights': np.arange(1000), 'bias': np.zeros(3)},
+        'raw': b'r' * 1000,
+        'bundle': {'vocab.json': b'{}', 'weights.bin': b'w' * 1000},
+    }
+
+
+def _assert_equal(loaded, obj):
+    if isinstance(obj, dict):
+        assert sorted(loaded) == sorted(obj)
+        for key in obj:
+            _assert_equal(loaded[key], obj[key])
+    elif hasattr(obj, 'shape'):
+        assert (loaded == obj).all()
+    else:
+        assert loaded == obj
+
+
+def test_dump_and_upload_every_format(blob_service):
+    samples = _format_samples()
+    formats = {
+        fmt.name: fmt
+        for fmt in SerializationFormat._BY_EXT.values()}
+    # every registered format is either covered or rejected
+    assert set(formats) == set(samples) | {'directory'}
+    for name, obj in samples.items():
+        ext = formats[name].extensions[0]
+        model = Model(name='formats', task='testing', default_ext=ext)
+        model.dump_and_upload(obj, version='1', block_size=256)
+        _assert_equal(
+            model.load(version='1', source='remote', persist=False), obj)
+        model.download(version='1')
+        _assert_equal(model.load(version='1'), obj)
+    with pytest.raises(UnsupportedFormatError):
+        Model(name='formats', task='testing', default_ext='dir') \
+            .dump_and_upload(None, version='1')
@@ -0,0 +1,85 @@
+"""Test hot reloading of model instances."""
+
+import threading
+
+import pytest
+
+from mlshed import Model
+from mlshed.watch import ModelWatcher
+
+
+def test_watch_remote_latest(blob_service):
+    model = Model(name='watched', task='testing')
+    model.dump_and_upload({'v': 1}, version='1')
+    swaps = []
+    watcher = model.watch(
+        interval=3600, on_swap=lambda new, old: swaps.append((new, old)))
+    try:
+        assert watcher.get() == {'v': 1}
+        assert not watcher.check()
+        model.dump_and_upload({'v': 2}, version='2')
+        assert watcher.check()
+        assert watcher.get() == {'v': 2}
+        assert watcher.previous() == {'v': 1}
+        watcher.rollback()
+        assert watcher.get() == {'v': 1}
+        # rolled back contents are not reloaded, but newer ones are
+        assert not watcher.check()
+        model.dump_and_upload({'v': 3}, version='3')
+        assert watcher.check()
+        assert watcher.get() == {'v': 3}
+    finally:
+        watcher.stop()
+    assert swaps[0] == ({'v': 1}, None)
+    assert len(swaps) == 4
+
+
+def test_watch_local(base_dir):
+    model = Model(name='watched', task='testing')
+    model.dump([1], version='1')
+    with ModelWatcher(model, version='1', source='local',
+                      interval=3600) as watcher:
+        assert watcher.get() == [1]
+        assert not watcher.check()
+        model.dump([2], version='1')
+        assert watcher.check()
+        assert watcher.get() == [2]
+    with pytest.raises(ValueError):
+        ModelWatcher(model, version='latest', source='local')
+    with pytest.raises(ValueError):
+        ModelWatcher(model).rollback()
+
+
+def test_rollback_during_slow_load(blob_service):
+    model = Model(name='watched', task='testing')
+    model.dump_and_upload({'v': 1}, version='1')
+    watcher = ModelWatcher(model, version='latest', interval=3600)
+    assert watcher.get() == {'v': 1}
+    model.dump_and_upload({'v': 2}, version='2')
+    assert watcher.check()
+    model.dump_and_upload({'v': 3}, version='3')
+
+    loading = threading.Event()
+    release = threading.Event()
+    load = model.load
+
+    def slow_load(**kwargs):
+        loading.set()
+        assert release.wait(5)
+        return load(**kwargs)
+
+    model.load = slow_load
+    results = []
+    checker = threading.Thread(target=lambda: results.append(watcher.check()))
+    checker.start()
+    try:
+        assert loading.wait(5)
+        # does not wait for the load in progress
+        watcher.rollback()
+        assert watcher.get() == {'v': 1}
+    finally:
+        release.set()
+        checker.join()
+    assert results == [True]
+    assert watcher.get() == {'v': 3}
+    assert watcher.previous() == {'v': 1}